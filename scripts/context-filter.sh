@@ -395,6 +395,8 @@ if [ -n "$PROJECT_CONTEXT_CONTENT" ] && [ "$PROJECT_CONTEXT_INJECT_BEFORE" = "tr
   echo ""
 fi
 
+RAG_CHANGED_ARGS=()
+
 for idx in "${SORTED_INDICES[@]}"; do
   filepath="${MATCHED_FILES[$idx]}"
   est_lines="${MATCHED_LINES[$idx]}"
@@ -421,6 +423,19 @@ for idx in "${SORTED_INDICES[@]}"; do
   echo "$FILTERED_OUTPUT"
   LINES_EMITTED_THIS_FILE=$(echo "$FILTERED_OUTPUT" | wc -l | tr -d ' ')
 
+  # Line ranges now in the prompt (nl / grep -n prefixes), so RAG skips them
+  _emitted_ranges=$(echo "$FILTERED_OUTPUT" | awk '
+    match($0, /^ *[0-9]+/) {
+      n = substr($0, RSTART, RLENGTH) + 0
+      if (start && n == prev + 1) { prev = n; next }
+      if (start) { printf "%s%d-%d", sep, start, prev; sep = "," }
+      start = n; prev = n
+    }
+    END { if (start) printf "%s%d-%d", sep, start, prev }')
+  if [ -n "$_emitted_ranges" ]; then
+    RAG_CHANGED_ARGS+=(--changed-file "$filepath" --changed-lines "$_emitted_ranges")
+  fi
+
   echo "=== END FILE ==="
   echo ""
 
@@ -463,7 +478,8 @@ if [ "$RAG_ENABLED_CFG" = "true" ] && [ -f "$SCRIPT_DIR/rag-retrieve.sh" ]; then
   _rag_top_k=3  # Fewer results to stay within budget
   _rag_budget_lines=20  # Max lines from RAG
 
-  RAG_RESULT=$("$SCRIPT_DIR/rag-retrieve.sh" "$_project_root" "$ROLE" "$_rag_query" --top-k "$_rag_top_k" 2>/dev/null) || RAG_RESULT=""
+  RAG_RESULT=$("$SCRIPT_DIR/rag-retrieve.sh" "$_project_root" "$ROLE" "$_rag_query" --top-k "$_rag_top_k" \
+    "${RAG_CHANGED_ARGS[@]}" 2>/dev/null) || RAG_RESULT=""
 
   if [ -n "$RAG_RESULT" ]; then
     _rag_lines=0
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Debate load harness for AI Review Arena (offline).
+
+Drives N concurrent debates through openai-ws-debate.py (its connection
+pool, sharding, streaming verdicts, retries and HTTP fallback) against the
+mock Responses server (scripts/mock-responses-server.py), started in-process
+unless --ws-url/--http-url name a running one. Nothing leaves the machine
+and no API key is needed.
+
+Reports throughput (debates and findings per second), p50/p95/p99 latency
+per debate round as seen by the client, pool reconnect counters, and the
+server's view: requests per round, injected failures and disconnects,
+compaction calls and previous_response_not_found errors.
+
+Usage: python3 debate-load-test.py [--debates 20] [--findings 8] [--concurrency 8]
+           [--pool-size 4] [--max-shard-findings 8] [--config <config.json>]
+           [--ws-url ws://127.0.0.1:<port>/v1/responses --http-url http://127.0.0.1:<port>/v1]
+           [mock options: --latency-ms --tokens-per-second --fail-rate --disconnect-rate
+            --reject-rate --seed] [--json]
+
+Requires: websocket-client (the debate client's WebSocket transport);
+          openai for the HTTP fallback and compaction (optional)
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+ROUNDS = ("round1", "round2", "round3")
+
+
+def _load(name, filename):
+    spec = importlib.util.spec_from_file_location(name, SCRIPT_DIR / filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def percentile(values, q):
+    """q-th percentile (0-100) of sorted values, linearly interpolated."""
+    if not values:
+        return None
+    rank = (len(values) - 1) * q / 100.0
+    low = int(rank)
+    high = min(low + 1, len(values) - 1)
+    return round(values[low] + (values[high] - values[low]) * (rank - low), 1)
+
+
+class RoundTimer:
+    """Client-side latency of every debate round, by round."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {name: [] for name in ROUNDS}
+        self.errors = 0
+
+    def wrap(self, send, prompt_of):
+        def timed(*args, **kwargs):
+            prompt = prompt_of(args)
+            kind = ("round1" if "code review challenger" in prompt else
+                    "round2" if "reviewers defend" in prompt else "round3")
+            start = time.perf_counter()
+            try:
+                return send(*args, **kwargs)
+            except Exception:
+                with self.lock:
+                    self.errors += 1
+                raise
+            finally:
+                elapsed = (time.perf_counter() - start) * 1000.0
+                with self.lock:
+                    self.samples[kind].append(elapsed)
+        return timed
+
+    def summary(self):
+        with self.lock:
+            samples = {name: sorted(values) for name, values in self.samples.items()}
+        every = sorted(v for values in samples.values() for v in values)
+        rows = {}
+        for name, values in list(samples.items()) + [("all", every)]:
+            rows[name] = {"n": len(values), **{f"p{q}_ms": percentile(values, q) for q in (50, 95, 99)}}
+        return rows
+
+
+def _payload_prompt(payload):
+    value = payload.get("input", "")
+    if isinstance(value, list):
+        return " ".join(str(m.get("content", "")) for m in value if isinstance(m, dict))
+    return str(value)
+
+
+def synthetic_findings(debate, count):
+    """`count` single-model findings spread over a few files."""
+    return [{
+        "file": f"src/module_{debate}_{i % 3}.py",
+        "line": 10 + i * 7,
+        "title": f"Finding {i}: unchecked input reaches query builder",
+        "description": "User-controlled value flows into a string-built query without escaping.",
+        "severity": ("critical", "high", "medium", "low")[i % 4],
+        "models": ["codex"],
+        "confidence": 55 + (i * 13) % 30,
+    } for i in range(count)]
+
+
+def run_load(args, ws_url, http_url):
+    """Run the debates and return the report dict (mock stats added by the caller)."""
+    os.environ["DEBATE_ALLOW_LOCAL_URL"] = "1"
+    os.environ["OPENAI_BASE_URL"] = http_url
+    for name in ("SESSION_DIR", "DEBATE_CACHE_DIR"):
+        os.environ.pop(name, None)
+    debate = _load("openai_ws_debate", "openai-ws-debate.py")
+
+    timer = RoundTimer()
+    debate.ws_send_and_receive = timer.wrap(debate.ws_send_and_receive, lambda a: _payload_prompt(a[1]))
+    debate.http_send_and_receive = timer.wrap(debate.http_send_and_receive, lambda a: _payload_prompt(a[1]))
+
+    config = {}
+    if args.config:
+        with open(args.config) as f:
+            config = json.load(f)
+    ws_config = dict(config.get("websocket", {}), url=ws_url, model=args.model,
+                     pool_size=args.pool_size)
+    debate_config = dict(config.get("debate", {}), max_shard_findings=args.max_shard_findings)
+    config = dict(config, websocket=ws_config, debate=debate_config)
+    settings = debate.debate_settings(config)
+    if settings["ws_url"] != ws_url:
+        raise SystemExit(f"Refusing to run: {ws_url} is not a loopback ws:// URL")
+
+    pool = debate.open_pool(settings, "mock-key")
+    results = []
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=pool.size) as shards, \
+                ThreadPoolExecutor(max_workers=args.concurrency) as debates:
+            futures = [debates.submit(debate.debate_findings, synthetic_findings(n, args.findings), {},
+                                      settings, "mock-key", pool, shards)
+                       for n in range(args.debates)]
+            for future in futures:
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    results.append({"error": f"Debate raised: {e}"})
+    finally:
+        pool.close()
+    wall = time.perf_counter() - start
+
+    findings = args.debates * args.findings
+    return {
+        "debates": args.debates,
+        "findings": findings,
+        "shards": sum(r.get("debates", 0) for r in results),
+        "wall_seconds": round(wall, 3),
+        "debates_per_second": round(args.debates / wall, 2) if wall else None,
+        "findings_per_second": round(findings / wall, 1) if wall else None,
+        "failed_debates": sum(1 for r in results if r.get("error")),
+        "http_fallbacks": sum(1 for r in results if r.get("ws_fallback")),
+        "early_committed": sum(r.get("early_committed", 0) for r in results),
+        "rounds": timer.summary(),
+        "round_errors": timer.errors,
+        "pool": dict(pool.stats, reconnects=max(0, pool.stats["opened"] - pool.size)),
+    }
+
+
+def print_report(report):
+    print(f"{report['debates']} debates ({report['findings']} findings, {report['shards']} shards) "
+          f"in {report['wall_seconds']}s: {report['debates_per_second']} debates/s, "
+          f"{report['findings_per_second']} findings/s")
+    print(f"  failed debates {report['failed_debates']}, HTTP fallbacks {report['http_fallbacks']}, "
+          f"early commits {report['early_committed']}, round errors {report['round_errors']}")
+    print(f"  {'round':<10}{'n':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, row in report["rounds"].items():
+        cells = "".join(f"{'-' if row[q] is None else row[q]:>10}" for q in ("p50_ms", "p95_ms", "p99_ms"))
+        print(f"  {name:<10}{row['n']:>8}{cells}")
+    pool = report["pool"]
+    print(f"  pool: opened {pool['opened']} (reconnects {pool['reconnects']}), reused {pool['reused']}, "
+          f"recycled {pool['recycled']}, discarded {pool['discarded']}")
+    server = report.get("server")
+    if server:
+        print(f"  server: {server['ws_requests']} ws + {server['http_requests']} http requests "
+              f"over {server['connections']} connections; injected {server['failures_injected']} failures, "
+              f"{server['disconnects_injected']} disconnects; {server['compactions']} compactions, "
+              f"{server['previous_response_not_found']} previous_response_not_found")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test for openai-ws-debate.py")
+    parser.add_argument("--debates", type=int, default=20, help="Debates to run (default: 20)")
+    parser.add_argument("--findings", type=int, default=8, help="Findings per debate (default: 8)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Debates in flight (default: 8)")
+    parser.add_argument("--pool-size", type=int, default=4, help="websocket.pool_size (default: 4)")
+    parser.add_argument("--max-shard-findings", type=int, default=8,
+                        help="debate.max_shard_findings (default: 8)")
+    parser.add_argument("--model", default="mock-model")
+    parser.add_argument("--config", default=str(SCRIPT_DIR.parent / "config" / "default-config.json"),
+                        help="Arena config for the remaining debate settings")
+    parser.add_argument("--ws-url", help="Use a running mock server instead of starting one")
+    parser.add_argument("--http-url", help="HTTP base URL of that server (for /stats and the fallback)")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    mock = _load("mock_responses_server", "mock-responses-server.py")
+    mock.add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        import websocket  # noqa: F401
+    except ImportError:
+        print("websocket-client package not installed. Run: pip install websocket-client", file=sys.stderr)
+        sys.exit(2)
+
+    server = None
+    if args.ws_url:
+        ws_url, http_url = args.ws_url, args.http_url or args.ws_url.replace("ws://", "http://", 1).rsplit("/", 1)[0]
+    else:
+        server = mock.start_server(**mock.fault_options(args))
+        ws_url, http_url = server.ws_url, server.http_url
+    try:
+        report = run_load(args, ws_url, http_url)
+        if server:
+            report["server"] = server.snapshot()
+        else:
+            try:
+                from urllib.request import urlopen
+                with urlopen(http_url.rsplit("/", 1)[0] + "/stats", timeout=5) as response:
+                    report["server"] = json.load(response)
+            except (OSError, ValueError):
+                pass
+    finally:
+        if server:
+            server.shutdown()
+            server.server_close()
+
+    if args.json:
+        print(json.dumps(report))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
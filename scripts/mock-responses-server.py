@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""
+Offline mock of the OpenAI Responses API for AI Review Arena (stdlib only).
+
+Speaks the two transports openai-ws-debate.py uses, so debates run end to
+end without network access, an API key or API spend:
+
+  WebSocket  GET /v1/responses with an RFC 6455 upgrade; each
+             response.create event is answered with response.created,
+             response.output_text.delta events and response.completed
+             (or response.failed). As in the real WebSocket mode, with
+             store=false previous_response_id must name the connection's
+             most recent response, else an error event is sent.
+  HTTP       POST /v1/responses, JSON or (stream=true) server-sent events;
+             used by the HTTP fallback and context compaction.
+  Stats      GET /stats returns the counters below as JSON.
+
+Answers are canned debate JSON derived from the prompt: round 1 challenges
+the listed indices, round 2 assesses the challenged findings, round 3
+synthesizes the open ones. Which findings are disputed depends only on
+their index and --seed, so runs are reproducible.
+
+Usage: python3 mock-responses-server.py [--host 127.0.0.1] [--port 0]
+           [--latency-ms 50] [--tokens-per-second 0] [--fail-rate 0]
+           [--disconnect-rate 0] [--reject-rate 0.3] [--seed 0]
+Prints "listening <ws-url> <http-base-url>" once ready, then serves until
+interrupted. Point the debate client at it with websocket.url = <ws-url>,
+DEBATE_ALLOW_LOCAL_URL=1 and OPENAI_BASE_URL=<http-base-url>.
+
+Fault injection applies per response: --fail-rate answers with
+response.failed (or HTTP 500), --disconnect-rate drops the connection
+after half of the deltas (HTTP: closes the stream early).
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import random
+import re
+import socket
+import struct
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OP_CONTINUATION, OP_TEXT, OP_BINARY, OP_CLOSE, OP_PING, OP_PONG = 0x0, 0x1, 0x2, 0x8, 0x9, 0xA
+CHARS_PER_TOKEN = 4
+
+
+# --- Canned debate answers ---
+
+def _disputed(index, seed, reject_rate):
+    """Whether the mock disagrees with finding `index` (stable per seed)."""
+    digest = hashlib.sha256(f"{seed}:{index}".encode()).digest()
+    return int.from_bytes(digest[:4], "big") / 2 ** 32 < reject_rate
+
+
+def _listed_indices(prompt):
+    match = re.search(r"indices: (\[[^\]]*\])", prompt)
+    try:
+        return [int(i) for i in json.loads(match.group(1))] if match else []
+    except (ValueError, TypeError):
+        return []
+
+
+def answer_for(prompt, seed=0, reject_rate=0.3):
+    """(kind, answer text) for a debate prompt; kind is round1-3, compaction or other."""
+    if "code review challenger" in prompt:
+        challenges = []
+        for i in _listed_indices(prompt):
+            disputed = _disputed(i, seed, reject_rate)
+            challenges.append({"finding_index": i, "agree": not disputed,
+                               "confidence_adjustment": -15 if disputed else 10,
+                               "evidence": "mock: " + ("unsupported by the code" if disputed else "confirmed")})
+        return "round1", json.dumps({"challenges": challenges})
+    if "reviewers defend" in prompt:
+        indices = sorted({int(i) for i in re.findall(r'"finding_index":\s*(\d+)', prompt)})
+        return "round2", json.dumps({"final_assessments": [
+            {"finding_index": i, "final_agree": False, "confidence_adjustment": -5,
+             "reasoning": "mock: defense not convincing"} for i in indices]})
+    if "final synthesis" in prompt:
+        return "round3", json.dumps({"synthesis": [
+            {"finding_index": i,
+             "final_confidence": 25 if _disputed(i, seed, reject_rate) else 85,
+             "verdict": "rejected" if _disputed(i, seed, reject_rate) else "accepted"}
+            for i in _listed_indices(prompt)]})
+    if "compacted summary" in prompt:
+        return "compaction", "mock: compacted debate state"
+    return "other", json.dumps({"text": "mock response"})
+
+
+def _prompt_text(request):
+    """The prompt of a response.create / POST body (string or message list input)."""
+    value = request.get("input", "")
+    if isinstance(value, str):
+        return value
+    parts = []
+    for message in value if isinstance(value, list) else []:
+        content = message.get("content", "") if isinstance(message, dict) else ""
+        if isinstance(content, str):
+            parts.append(content)
+        else:
+            parts.extend(c.get("text", "") for c in content if isinstance(c, dict))
+    return "\n".join(parts)
+
+
+def _response_object(response_id, model, text, status="completed"):
+    return {
+        "id": response_id, "object": "response", "created_at": int(time.time()),
+        "model": model, "status": status,
+        "output": [{"type": "message", "id": f"msg_{response_id}", "role": "assistant",
+                    "status": status,
+                    "content": [{"type": "output_text", "text": text, "annotations": []}]}],
+        "usage": {"input_tokens": 0, "output_tokens": len(text) // CHARS_PER_TOKEN,
+                  "total_tokens": len(text) // CHARS_PER_TOKEN},
+    }
+
+
+# --- Server ---
+
+class MockResponsesServer(ThreadingHTTPServer):
+    """Threaded HTTP/WebSocket server holding the options, counters and stored responses."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, latency_ms=50, tokens_per_second=0, fail_rate=0.0,
+                 disconnect_rate=0.0, reject_rate=0.3, seed=0):
+        if ":" in address[0]:
+            self.address_family = socket.AF_INET6
+        super().__init__(address, MockResponsesHandler)
+        self.latency = latency_ms / 1000.0
+        self.tokens_per_second = tokens_per_second
+        self.fail_rate = fail_rate
+        self.disconnect_rate = disconnect_rate
+        self.reject_rate = reject_rate
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stored = set()
+        self.ids = 0
+        self.stats = {"connections": 0, "open_connections": 0, "ws_requests": 0, "http_requests": 0,
+                      "round1": 0, "round2": 0, "round3": 0, "compactions": 0, "deltas": 0,
+                      "failures_injected": 0, "disconnects_injected": 0,
+                      "previous_response_not_found": 0}
+
+    @property
+    def netloc(self):
+        """host:port clients should use (wildcard binds map to loopback, IPv6 is bracketed)."""
+        host = {"0.0.0.0": "127.0.0.1", "::": "::1"}.get(self.server_address[0], self.server_address[0])
+        if ":" in host:
+            host = f"[{host}]"
+        return f"{host}:{self.server_address[1]}"
+
+    @property
+    def ws_url(self):
+        return f"ws://{self.netloc}/v1/responses"
+
+    @property
+    def http_url(self):
+        return f"http://{self.netloc}/v1"
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.stats[name] = self.stats.get(name, 0) + amount
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.stats)
+
+    def next_id(self, store):
+        with self.lock:
+            self.ids += 1
+            response_id = f"resp_mock_{self.ids}"
+            if store:
+                self.stored.add(response_id)
+            return response_id
+
+    def is_stored(self, response_id):
+        with self.lock:
+            return response_id in self.stored
+
+    def fault(self):
+        """None, "fail" or "disconnect" for the next response."""
+        with self.lock:
+            roll = self.rng.random()
+        if roll < self.fail_rate:
+            return "fail"
+        if roll < self.fail_rate + self.disconnect_rate:
+            return "disconnect"
+        return None
+
+    def plan(self, request):
+        """(answer text, fault) for a request, counting its round."""
+        kind, text = answer_for(_prompt_text(request), self.seed, self.reject_rate)
+        if kind == "compaction":
+            self.count("compactions")
+        elif kind.startswith("round"):
+            self.count(kind)
+        return text, self.fault()
+
+    def pace(self, text):
+        """Answer text as token-sized deltas with the delay before each one."""
+        tokens = [text[i:i + CHARS_PER_TOKEN] for i in range(0, len(text), CHARS_PER_TOKEN)] or [""]
+        gap = 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        return [(self.latency if n == 0 else gap, token) for n, token in enumerate(tokens)]
+
+
+class MockResponsesHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "MockResponses/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    # -- HTTP -----------------------------------------------------------------
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.headers.get("Upgrade", "").lower() == "websocket":
+            self._serve_websocket()
+        elif self.path.rstrip("/") == "/stats":
+            self._send_json(200, self.server.snapshot())
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        if self.path.rstrip("/") not in ("/v1/responses", "/responses"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0) or 0)))
+        except ValueError:
+            self._send_json(400, {"error": {"message": "invalid JSON body"}})
+            return
+        server = self.server
+        server.count("http_requests")
+        previous = request.get("previous_response_id")
+        if previous and not server.is_stored(previous):
+            server.count("previous_response_not_found")
+            self._send_json(400, {"error": {"message": f"Previous response with id '{previous}' not found.",
+                                            "type": "invalid_request_error",
+                                            "code": "previous_response_not_found"}})
+            return
+        text, fault = server.plan(request)
+        if fault == "fail":
+            server.count("failures_injected")
+            self._send_json(500, {"error": {"message": "mock injected failure", "type": "server_error"}})
+            return
+        response_id = server.next_id(request.get("store", True))
+        model = request.get("model", "mock-model")
+        if not request.get("stream"):
+            time.sleep(sum(delay for delay, _ in server.pace(text)))
+            self._send_json(200, _response_object(response_id, model, text))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        for event in self._events(response_id, model, text, fault):
+            if event is None:
+                server.count("disconnects_injected")
+                return
+            self.wfile.write(f"event: {event['type']}\ndata: {json.dumps(event)}\n\n".encode())
+            self.wfile.flush()
+
+    def _events(self, response_id, model, text, fault):
+        """Response events for one answer; a None marks an injected disconnect."""
+        sequence = 0
+        response = _response_object(response_id, model, "", status="in_progress")
+        yield {"type": "response.created", "sequence_number": sequence, "response": response}
+        deltas = self.server.pace(text)
+        for n, (delay, token) in enumerate(deltas):
+            if fault == "disconnect" and n >= len(deltas) // 2:
+                yield None
+                return
+            if delay:
+                time.sleep(delay)
+            sequence += 1
+            self.server.count("deltas")
+            yield {"type": "response.output_text.delta", "sequence_number": sequence,
+                   "item_id": f"msg_{response_id}", "output_index": 0, "content_index": 0,
+                   "delta": token, "logprobs": []}
+        sequence += 1
+        if fault == "fail":
+            self.server.count("failures_injected")
+            failed = _response_object(response_id, model, "", status="failed")
+            failed["error"] = {"code": "server_error", "message": "mock injected failure"}
+            yield {"type": "response.failed", "sequence_number": sequence, "response": failed}
+            return
+        yield {"type": "response.completed", "sequence_number": sequence,
+               "response": _response_object(response_id, model, text)}
+
+    # -- WebSocket --------------------------------------------------------------
+
+    def _serve_websocket(self):
+        key = self.headers.get("Sec-WebSocket-Key", "")
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        self.send_response(101, "Switching Protocols")
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept)
+        self.end_headers()
+        self.wfile.flush()
+        self.close_connection = True
+
+        server = self.server
+        server.count("connections")
+        server.count("open_connections")
+        last_response_id = None
+        try:
+            while True:
+                message = self._read_message()
+                if message is None:
+                    return
+                try:
+                    event = json.loads(message)
+                except ValueError:
+                    self._send_ws_json({"type": "error", "error": {"message": "invalid JSON"}})
+                    continue
+                if event.get("type") != "response.create":
+                    self._send_ws_json({"type": "error", "error": {"message": "unsupported event type"}})
+                    continue
+                request = event.get("response", {})
+                server.count("ws_requests")
+                previous = request.get("previous_response_id")
+                if previous and previous != last_response_id and not server.is_stored(previous):
+                    server.count("previous_response_not_found")
+                    self._send_ws_json({"type": "error", "error": {
+                        "type": "invalid_request_error", "code": "previous_response_not_found",
+                        "message": f"Previous response with id '{previous}' not found."}})
+                    continue
+                text, fault = server.plan(request)
+                response_id = server.next_id(request.get("store", False))
+                for out in self._events(response_id, request.get("model", "mock-model"), text, fault):
+                    if out is None:
+                        server.count("disconnects_injected")
+                        self.connection.shutdown(socket.SHUT_RDWR)
+                        return
+                    self._send_ws_json(out)
+                last_response_id = response_id
+        except (OSError, ValueError):
+            return
+        finally:
+            server.count("open_connections", -1)
+
+    def _read_exact(self, size):
+        data = self.rfile.read(size)
+        if len(data) < size:
+            raise ConnectionError("client went away")
+        return data
+
+    def _read_message(self):
+        """Next text message (continuation frames joined); None on close."""
+        parts = []
+        while True:
+            try:
+                first, second = self._read_exact(2)
+            except ConnectionError:
+                return None
+            fin, opcode = first & 0x80, first & 0x0F
+            length = second & 0x7F
+            if length == 126:
+                length = struct.unpack("!H", self._read_exact(2))[0]
+            elif length == 127:
+                length = struct.unpack("!Q", self._read_exact(8))[0]
+            mask = self._read_exact(4) if second & 0x80 else b""
+            payload = self._read_exact(length)
+            if mask and length:
+                key = (mask * (length // 4 + 1))[:length]
+                payload = (int.from_bytes(payload, "big") ^ int.from_bytes(key, "big")).to_bytes(length, "big")
+            if opcode == OP_CLOSE:
+                self._send_frame(OP_CLOSE, payload[:2])
+                return None
+            if opcode == OP_PING:
+                self._send_frame(OP_PONG, payload)
+                continue
+            if opcode == OP_PONG:
+                continue
+            parts.append(payload)
+            if fin:
+                return b"".join(parts).decode("utf-8", errors="replace")
+
+    def _send_frame(self, opcode, payload):
+        length = len(payload)
+        if length < 126:
+            header = struct.pack("!BB", 0x80 | opcode, length)
+        elif length < 1 << 16:
+            header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+        self.wfile.write(header + payload)
+        self.wfile.flush()
+
+    def _send_ws_json(self, event):
+        self._send_frame(OP_TEXT, json.dumps(event).encode())
+
+
+def start_server(host="127.0.0.1", port=0, **options):
+    """A MockResponsesServer serving from a daemon thread; call shutdown() when done."""
+    server = MockResponsesServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_fault_arguments(parser):
+    """Mock behaviour options, shared with debate-load-test.py."""
+    parser.add_argument("--latency-ms", type=float, default=50, help="Time to first token (default: 50)")
+    parser.add_argument("--tokens-per-second", type=float, default=0,
+                        help="Delta pacing after the first token, 0 for unpaced (default: 0)")
+    parser.add_argument("--fail-rate", type=float, default=0.0,
+                        help="Fraction of responses answered with response.failed (default: 0)")
+    parser.add_argument("--disconnect-rate", type=float, default=0.0,
+                        help="Fraction of responses whose connection drops mid-stream (default: 0)")
+    parser.add_argument("--reject-rate", type=float, default=0.3,
+                        help="Fraction of findings the mock challenger disputes (default: 0.3)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for faults and verdicts (default: 0)")
+
+
+def fault_options(args):
+    return {"latency_ms": args.latency_ms, "tokens_per_second": args.tokens_per_second,
+            "fail_rate": args.fail_rate, "disconnect_rate": args.disconnect_rate,
+            "reject_rate": args.reject_rate, "seed": args.seed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline mock of the OpenAI Responses API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0, help="0 picks a free port (default: 0)")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockResponsesServer((args.host, args.port), **fault_options(args))
+    print(f"listening {server.ws_url} {server.http_url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(server.snapshot()), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,16 +12,51 @@ connection fails.
 
 Connection-local in-memory cache holds the most recent response per
 connection, enabling previous_response_id chaining even with store=false.
+A debate therefore keeps one connection for all of its rounds.
 
-Usage: echo '{"findings": [...], "config": {...}, "code_context": {...}}' | python3 openai-ws-debate.py
+Challengeable findings are split into bounded shards (by file or by
+similarity, debate.shard_by) that are debated independently and
+concurrently over a pool of long-lived connections (websocket.pool_size),
+each with its own previous_response_id chain and only its own findings and
+code context in the prompt; connections are recycled before
+websocket.max_connection_minutes. In --serve mode one process answers a
+stream of debate requests over the same pool.
+
+Verdicts are parsed from the response stream as they arrive; each finding's
+status is written to the session signal log (debate_verdict) once decided,
+and findings confirmed with high confidence in round 1
+(debate.early_commit_confidence) skip rounds 2 and 3.
+
+With DEBATE_CACHE_DIR set, verdicts are reused across runs for the same
+finding on unchanged code (cache.debate_verdicts); only misses are debated.
+
+Usage: echo '{"findings": [...], "config": {...}, "code_context": {...}, "session_dir"?: "..."}' | python3 openai-ws-debate.py
 Output: {"accepted": [...], "rejected": [...], "disputed": [...]}
+
+Serve:  python3 openai-ws-debate.py --serve [--config <config.json>]
+        stdin:  one {"id": ..., "findings": [...], "code_context": {...}, "config"?: {...}} per line
+        stdout: one {"id": ..., "accepted": [...], ...} per line, in completion order
 """
 
+import hashlib
 import json
 import os
+import queue
 import re
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+try:
+    from websocket import WebSocketConnectionClosedException
+except ImportError:
+    WebSocketConnectionClosedException = ConnectionError
+
+# Loopback hosts a websocket.url may point at when DEBATE_ALLOW_LOCAL_URL=1
+# (the offline mock server, scripts/mock-responses-server.py)
+LOCAL_URL_PREFIXES = ("ws://127.0.0.1:", "ws://localhost:", "ws://[::1]:")
 
 
 def extract_json_from_text(text):
@@ -49,8 +84,16 @@ def extract_json_from_text(text):
     return None
 
 
-def ws_send_and_receive(ws, request_payload, timeout=120):
-    """Send a response.create event over WebSocket and collect the full response."""
+def ws_send_and_receive(ws, request_payload, timeout=120, on_delta=None):
+    """Send a response.create event over WebSocket and collect the full response.
+
+    on_delta, if given, is called with each output text delta as it arrives.
+    ws.complete stays False if no terminal event arrives (timeout or drop),
+    so the pool discards a connection that may still deliver stale events.
+    A connection closed mid-response raises ConnectionError so the debate is
+    retried on a fresh connection; a timeout returns what has arrived.
+    """
+    ws.complete = False
     ws.send(json.dumps({
         "type": "response.create",
         "response": request_payload
@@ -64,6 +107,8 @@ def ws_send_and_receive(ws, request_payload, timeout=120):
         try:
             ws.settimeout(max(1, deadline - time.time()))
             raw = ws.recv()
+        except (WebSocketConnectionClosedException, ConnectionResetError, BrokenPipeError) as e:
+            raise ConnectionError(f"WebSocket closed mid-response: {e}")
         except Exception:
             break
 
@@ -75,8 +120,12 @@ def ws_send_and_receive(ws, request_payload, timeout=120):
         event_type = event.get("type", "")
 
         if event_type == "response.output_text.delta":
-            response_text += event.get("delta", "")
+            delta = event.get("delta", "")
+            response_text += delta
+            if on_delta:
+                on_delta(delta)
         elif event_type == "response.completed":
+            ws.complete = True
             resp = event.get("response", {})
             response_id = resp.get("id")
             # Extract full text from completed response output
@@ -87,6 +136,7 @@ def ws_send_and_receive(ws, request_payload, timeout=120):
                             response_text = content.get("text", response_text)
             break
         elif event_type == "response.failed":
+            ws.complete = True
             error = event.get("response", {}).get("error", {})
             raise RuntimeError(f"Response failed: {error.get('message', 'unknown')}")
         elif event_type == "error":
@@ -95,6 +145,95 @@ def ws_send_and_receive(ws, request_payload, timeout=120):
     return response_text, response_id
 
 
+def http_send_and_receive(client, request_payload, on_delta=None):
+    """HTTP counterpart of ws_send_and_receive: one streamed Responses API call."""
+    response_text = ""
+    response_id = None
+    for event in client.responses.create(stream=True, **request_payload):
+        event_type = getattr(event, "type", "")
+        if event_type == "response.output_text.delta":
+            delta = getattr(event, "delta", "")
+            response_text += delta
+            if on_delta:
+                on_delta(delta)
+        elif event_type == "response.completed":
+            response_id = event.response.id
+            response_text = _extract_response_text(event.response) or response_text
+        elif event_type in ("response.failed", "error"):
+            error = getattr(getattr(event, "response", None), "error", None)
+            message = getattr(error, "message", None) or getattr(event, "message", None)
+            raise RuntimeError(f"Response failed: {message or 'unknown'}")
+    return response_text, response_id
+
+
+class VerdictStreamParser:
+    """Incremental scanner for the objects of one JSON array in a streamed response.
+
+    feed() takes output text deltas and returns each element object of the
+    `key` array ("challenges", "final_assessments", "synthesis") as soon as
+    its closing brace arrives. Text outside JSON (prose, ``` fences) is
+    skipped; an element that fails to parse is left to the full-text parse
+    after the response completes.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self._text = ""
+        self._pos = 0
+        self._stack = []          # open containers, '{' or '['
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string = None  # most recent string, a key if ':' follows
+        self._pending_key = None  # key whose value comes next
+        self._array_depth = None  # stack depth inside the target array
+        self._item_start = None
+
+    def feed(self, delta):
+        self._text += delta
+        text, items = self._text, []
+        for pos in range(self._pos, len(text)):
+            char = text[pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    self._last_string = text[self._string_start:pos]
+                continue
+            if char.isspace() or (not self._stack and char not in "{["):
+                continue
+            key, self._pending_key = self._pending_key, None
+            if char == '"':
+                self._in_string = True
+                self._string_start = pos + 1
+            elif char == ":":
+                self._pending_key = self._last_string
+            elif char in "{[":
+                if char == "[" and self._array_depth is None and key == self.key:
+                    self._array_depth = len(self._stack) + 1
+                elif char == "{" and len(self._stack) == self._array_depth:
+                    self._item_start = pos
+                self._stack.append(char)
+            elif char in "}]" and self._stack:
+                self._stack.pop()
+                depth = len(self._stack)
+                if char == "}" and depth == self._array_depth and self._item_start is not None:
+                    try:
+                        item = json.loads(text[self._item_start:pos + 1])
+                    except json.JSONDecodeError:
+                        item = None
+                    if isinstance(item, dict):
+                        items.append(item)
+                    self._item_start = None
+                elif self._array_depth is not None and depth < self._array_depth:
+                    self._array_depth = None
+        self._pos = len(text)
+        return items
+
+
 def compact_context(api_key, previous_response_id, model):
     """Compact context using OpenAI /responses/compact endpoint.
 
@@ -133,79 +272,190 @@ def compact_context(api_key, previous_response_id, model):
         return None
 
 
+class PooledConnection:
+    """A WebSocket connection with its open time, as handed out by the pool."""
+
+    def __init__(self, ws, max_age_seconds):
+        self.ws = ws
+        self.expires_at = time.time() + max_age_seconds
+        self.complete = True
+
+    def send(self, data):
+        self.ws.send(data)
+
+    def recv(self):
+        return self.ws.recv()
+
+    def settimeout(self, timeout):
+        self.ws.settimeout(timeout)
+
+    def close(self):
+        try:
+            self.ws.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """Long-lived WebSocket connections shared by concurrent debates.
+
+    At most `size` connections are open; a debate holds one for all of its
+    rounds. Idle connections are reused, and one with less than
+    recycle_before_seconds of its max_connection_minutes lifetime left is
+    closed and replaced instead, so no debate starts on a connection the
+    server is about to drop.
+    """
+
+    def __init__(self, api_key, ws_url, connection_timeout, size=1,
+                 max_connection_minutes=55, recycle_before_seconds=300):
+        self.api_key = api_key
+        self.ws_url = ws_url
+        self.connection_timeout = connection_timeout
+        self.size = max(1, size)
+        self.max_age = max_connection_minutes * 60
+        self.recycle_before = min(recycle_before_seconds, self.max_age / 2)
+        self.idle = queue.LifoQueue()
+        self.slots = threading.Semaphore(self.size)
+        self.lock = threading.Lock()
+        self.stats = {"opened": 0, "reused": 0, "recycled": 0, "discarded": 0}
+
+    def _count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def _open(self):
+        import websocket
+        ws = websocket.create_connection(
+            self.ws_url,
+            header=[
+                f"Authorization: Bearer {self.api_key}",
+                "OpenAI-Beta: realtime=v1"
+            ],
+            timeout=self.connection_timeout
+        )
+        self._count("opened")
+        return PooledConnection(ws, self.max_age)
+
+    def acquire(self):
+        """A connection for one debate; blocks while all `size` are in use."""
+        self.slots.acquire()
+        try:
+            while True:
+                try:
+                    conn = self.idle.get_nowait()
+                except queue.Empty:
+                    return self._open()
+                if conn.expires_at - time.time() > self.recycle_before:
+                    self._count("reused")
+                    return conn
+                conn.close()
+                self._count("recycled")
+        except BaseException:
+            self.slots.release()
+            raise
+
+    def release(self, conn, broken=False):
+        """Return a connection after a debate; broken or unfinished ones are closed."""
+        if broken or not conn.complete:
+            conn.close()
+            self._count("discarded")
+        else:
+            self.idle.put(conn)
+        self.slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
 def run_debate_ws(findings, code_context, model, store, connection_timeout,
                   max_rounds, challenge_threshold, consensus_threshold, api_key, ws_url,
-                  compaction_config=None):
+                  compaction_config=None, pool=None, indices=None, tracker=None):
     """Run debate over persistent WebSocket connection.
 
+    The connection comes from pool (a private one-connection pool if None)
+    and goes back to it afterwards. indices limits the debate to those
+    findings (a shard); by default every challengeable finding is debated.
+    tracker (a VerdictTracker) commits verdicts as they stream in.
+
     Supports context compaction on reconnection (E3 philosophy):
     When WebSocket connection drops mid-debate, uses /responses/compact
     to compress prior context before reconnecting, preserving decision
     context while reducing token usage.
     """
     try:
-        import websocket
+        import websocket  # noqa: F401
     except ImportError:
         raise ImportError("websocket-client package not installed. Run: pip install websocket-client")
 
     if compaction_config is None:
         compaction_config = {}
+    if tracker is None:
+        tracker = VerdictTracker(consensus_threshold)
+    # A dropped attempt may have applied some verdicts; each retry starts from this
+    initial_state = _verdict_state(findings, range(len(findings)) if indices is None else indices)
+    owned = pool is None
+    if owned:
+        pool = ConnectionPool(api_key, ws_url, connection_timeout)
 
     max_retries = 3
     last_error = None
     last_response_id = None
 
-    for attempt in range(max_retries):
-        try:
-            ws = websocket.create_connection(
-                ws_url,
-                header=[
-                    f"Authorization: Bearer {api_key}",
-                    "OpenAI-Beta: realtime=v1"
-                ],
-                timeout=connection_timeout
-            )
-        except Exception as e:
-            last_error = e
-            if attempt < max_retries - 1:
-                backoff = min(2 ** attempt, 8)
-                time.sleep(backoff)
-                # E3: On reconnection, compact context if we have a previous response
-                if last_response_id and compaction_config.get("enabled", False):
-                    compacted_id = compact_context(api_key, last_response_id, model)
-                    if compacted_id:
-                        last_response_id = compacted_id
-                continue
-            raise RuntimeError(f"WebSocket connection failed after {max_retries} attempts: {last_error}")
-
-        try:
-            result = _run_debate_rounds(ws, findings, code_context, model, store,
-                                        connection_timeout, max_rounds,
-                                        challenge_threshold, consensus_threshold)
-            return result
-        except (ConnectionError, OSError) as e:
-            last_error = e
-            if attempt < max_retries - 1:
-                backoff = min(2 ** attempt, 8)
-                time.sleep(backoff)
-                # E3: Compact context before retry to reduce token usage
-                if last_response_id and compaction_config.get("enabled", False):
-                    compacted_id = compact_context(api_key, last_response_id, model)
-                    if compacted_id:
-                        last_response_id = compacted_id
-                continue
-            raise
-        finally:
+    try:
+        for attempt in range(max_retries):
             try:
-                ws.close()
-            except Exception:
-                pass
+                conn = pool.acquire()
+            except Exception as e:
+                last_error = e
+                if attempt < max_retries - 1:
+                    backoff = min(2 ** attempt, 8)
+                    time.sleep(backoff)
+                    # E3: On reconnection, compact context if we have a previous response
+                    if last_response_id and compaction_config.get("enabled", False):
+                        compacted_id = compact_context(api_key, last_response_id, model)
+                        if compacted_id:
+                            last_response_id = compacted_id
+                    continue
+                raise RuntimeError(f"WebSocket connection failed after {max_retries} attempts: {last_error}")
+
+            broken = True
+            if attempt:
+                _restore_verdict_state(findings, initial_state, tracker)
+            try:
+                result = _run_debate_rounds(conn, findings, code_context, model, store,
+                                            connection_timeout, max_rounds,
+                                            challenge_threshold, consensus_threshold, indices,
+                                            tracker)
+                broken = False
+                return result
+            except (ConnectionError, OSError) as e:
+                last_error = e
+                if attempt < max_retries - 1:
+                    backoff = min(2 ** attempt, 8)
+                    time.sleep(backoff)
+                    # E3: Compact context before retry to reduce token usage
+                    if last_response_id and compaction_config.get("enabled", False):
+                        compacted_id = compact_context(api_key, last_response_id, model)
+                        if compacted_id:
+                            last_response_id = compacted_id
+                    continue
+                raise
+            finally:
+                pool.release(conn, broken)
+    finally:
+        if owned:
+            pool.close()
 
     raise RuntimeError(f"WebSocket debate failed after {max_retries} attempts: {last_error}")
 
 
 def run_debate_http(findings, code_context, model, store, connection_timeout,
-                    max_rounds, challenge_threshold, consensus_threshold, api_key):
+                    max_rounds, challenge_threshold, consensus_threshold, api_key,
+                    indices=None, tracker=None):
     """Fallback: run debate using standard HTTP Responses API."""
     try:
         import openai
@@ -213,91 +463,93 @@ def run_debate_http(findings, code_context, model, store, connection_timeout,
         raise ImportError("openai package not installed. Run: pip install openai>=2.22.0")
 
     client = openai.OpenAI(api_key=api_key)
+    if tracker is None:
+        tracker = VerdictTracker(consensus_threshold)
 
-    challengeable = _find_challengeable(findings, challenge_threshold)
+    challengeable = _find_challengeable(findings, challenge_threshold) if indices is None else indices
     if not challengeable:
         return {"accepted": findings, "rejected": [], "disputed": []}
+    challengeable = tracker.pending(challengeable)
+    if not challengeable:
+        return categorize_findings(findings, consensus_threshold)
+
+    findings_text, code_text = _shard_prompt_inputs(findings, code_context, challengeable)
 
-    findings_text = json.dumps(findings, indent=2)
-    code_text = json.dumps(code_context, indent=2) if code_context else "No code context provided"
+    def send(payload, on_delta):
+        return http_send_and_receive(client, payload, on_delta)
 
     previous_response_id = None
 
-    # Round 1: Challenge
+    # Round 1: Challenge (high-confidence confirmations are committed as they stream in)
     round1_prompt = _build_round1_prompt(findings_text, code_text, challengeable)
     try:
-        response = client.responses.create(
-            model=model,
-            input=round1_prompt,
-            store=True,  # HTTP mode needs store=true for chaining
-            stream=False,
-        )
-        previous_response_id = response.id
-        round1_text = _extract_response_text(response)
-        round1_data = extract_json_from_text(round1_text)
-        if round1_data:
-            _apply_challenges(findings, round1_data.get("challenges", []), model)
+        previous_response_id = _stream_round(
+            send, {"model": model, "input": round1_prompt, "store": True},  # HTTP mode needs store=true for chaining
+            "challenges", _round1_handler(findings, challengeable, model, tracker))
     except Exception as e:
         return {"accepted": findings, "rejected": [], "disputed": [],
                 "error": f"HTTP Round 1 failed: {e}"}
 
-    if max_rounds < 2:
+    open_indices = tracker.pending(challengeable)
+    if max_rounds < 2 or not open_indices:
+        tracker.commit(findings, open_indices, 1)
         return categorize_findings(findings, consensus_threshold)
 
     # Round 2: Defense
-    challenged = [f for f in findings if f.get("debate_status") == "challenged"]
+    challenged = _indexed(findings, [i for i in open_indices
+                                     if findings[i].get("debate_status") == "challenged"])
     if challenged and previous_response_id:
         round2_prompt = _build_round2_prompt(challenged)
         try:
-            response2 = client.responses.create(
-                model=model,
-                input=round2_prompt,
-                previous_response_id=previous_response_id,
-                store=True,
-                stream=False,
-            )
-            previous_response_id = response2.id
-            round2_text = _extract_response_text(response2)
-            round2_data = extract_json_from_text(round2_text)
-            if round2_data:
-                _apply_defenses(findings, round2_data.get("final_assessments", []))
+            previous_response_id = _stream_round(
+                send, {"model": model, "input": round2_prompt,
+                       "previous_response_id": previous_response_id, "store": True},
+                "final_assessments",
+                _round2_handler(findings, open_indices, tracker, final=max_rounds < 3))
         except Exception:
             pass
 
     if max_rounds < 3:
+        tracker.commit(findings, open_indices, 2)
         return categorize_findings(findings, consensus_threshold)
 
     # Round 3: Synthesis
     if previous_response_id:
-        round3_prompt = _build_round3_prompt()
+        round3_prompt = _build_round3_prompt(open_indices)
         try:
-            response3 = client.responses.create(
-                model=model,
-                input=round3_prompt,
-                previous_response_id=previous_response_id,
-                store=True,
-                stream=False,
-            )
-            round3_text = _extract_response_text(response3)
-            round3_data = extract_json_from_text(round3_text)
-            if round3_data:
-                _apply_synthesis(findings, round3_data.get("synthesis", []))
+            _stream_round(send, {"model": model, "input": round3_prompt,
+                                 "previous_response_id": previous_response_id, "store": True},
+                          "synthesis", _round3_handler(findings, open_indices, tracker))
         except Exception:
             pass
 
+    tracker.commit(findings, open_indices, 3)
     return categorize_findings(findings, consensus_threshold)
 
 
 def _run_debate_rounds(ws, findings, code_context, model, store,
                        connection_timeout, max_rounds,
-                       challenge_threshold, consensus_threshold):
-    """Core debate logic used by WebSocket path."""
-    challengeable = _find_challengeable(findings, challenge_threshold)
+                       challenge_threshold, consensus_threshold, indices=None, tracker=None):
+    """Core debate logic used by WebSocket path.
+
+    Verdicts are applied as they stream in. A finding confirmed in round 1
+    with high confidence (tracker.early_commit_confidence) is committed at
+    once and left out of rounds 2 and 3; when none remain open, those rounds
+    are skipped. Findings already committed (on a retry) are not re-debated.
+    """
+    if tracker is None:
+        tracker = VerdictTracker(consensus_threshold)
+    challengeable = _find_challengeable(findings, challenge_threshold) if indices is None else indices
     if not challengeable:
         return {"accepted": findings, "rejected": [], "disputed": []}
+    challengeable = tracker.pending(challengeable)
+    if not challengeable:
+        return categorize_findings(findings, consensus_threshold)
 
-    findings_text = json.dumps(findings, indent=2)
-    code_text = json.dumps(code_context, indent=2) if code_context else "No code context provided"
+    findings_text, code_text = _shard_prompt_inputs(findings, code_context, challengeable)
+
+    def send(payload, on_delta):
+        return ws_send_and_receive(ws, payload, connection_timeout, on_delta)
 
     previous_response_id = None
 
@@ -305,47 +557,177 @@ def _run_debate_rounds(ws, findings, code_context, model, store,
     round1_prompt = _build_round1_prompt(findings_text, code_text, challengeable)
     payload = {"model": model, "input": [{"role": "user", "content": round1_prompt}],
                "store": store}
-    round1_text, previous_response_id = ws_send_and_receive(ws, payload, connection_timeout)
-    round1_data = extract_json_from_text(round1_text)
-    if round1_data:
-        _apply_challenges(findings, round1_data.get("challenges", []), model)
+    previous_response_id = _stream_round(send, payload, "challenges",
+                                         _round1_handler(findings, challengeable, model, tracker))
 
-    if max_rounds < 2:
+    open_indices = tracker.pending(challengeable)
+    if max_rounds < 2 or not open_indices:
+        tracker.commit(findings, open_indices, 1)
         return categorize_findings(findings, consensus_threshold)
 
     # Round 2: Defense
-    challenged = [f for f in findings if f.get("debate_status") == "challenged"]
+    challenged = _indexed(findings, [i for i in open_indices
+                                     if findings[i].get("debate_status") == "challenged"])
     if challenged and previous_response_id:
         round2_prompt = _build_round2_prompt(challenged)
         payload2 = {"model": model, "input": [{"role": "user", "content": round2_prompt}],
                      "previous_response_id": previous_response_id, "store": store}
-        round2_text, previous_response_id = ws_send_and_receive(ws, payload2, connection_timeout)
-        round2_data = extract_json_from_text(round2_text)
-        if round2_data:
-            _apply_defenses(findings, round2_data.get("final_assessments", []))
+        previous_response_id = _stream_round(
+            send, payload2, "final_assessments",
+            _round2_handler(findings, open_indices, tracker, final=max_rounds < 3))
 
     if max_rounds < 3:
+        tracker.commit(findings, open_indices, 2)
         return categorize_findings(findings, consensus_threshold)
 
     # Round 3: Synthesis
     if previous_response_id:
-        round3_prompt = _build_round3_prompt()
+        round3_prompt = _build_round3_prompt(open_indices)
         payload3 = {"model": model, "input": [{"role": "user", "content": round3_prompt}],
                      "previous_response_id": previous_response_id, "store": store}
-        round3_text, _ = ws_send_and_receive(ws, payload3, connection_timeout)
-        round3_data = extract_json_from_text(round3_text)
-        if round3_data:
-            _apply_synthesis(findings, round3_data.get("synthesis", []))
+        _stream_round(send, payload3, "synthesis", _round3_handler(findings, open_indices, tracker))
 
+    tracker.commit(findings, open_indices, 3)
     return categorize_findings(findings, consensus_threshold)
 
 
+# --- Streaming verdicts ---
+
+def _stream_round(send, payload, key, on_item):
+    """Run one round, handing each element of its `key` array to on_item as it streams in.
+
+    Elements the incremental parse missed are handed over from the full
+    text once the response completes. Returns the round's response id.
+    """
+    parser = VerdictStreamParser(key)
+    streamed = []
+
+    def on_delta(delta):
+        for item in parser.feed(delta):
+            streamed.append(item)
+            on_item(item)
+
+    response_text, response_id = send(payload, on_delta)
+    data = extract_json_from_text(response_text)
+    items = data.get(key, []) if isinstance(data, dict) else []
+    for item in items if isinstance(items, list) else []:
+        if item in streamed:
+            streamed.remove(item)
+        elif isinstance(item, dict):
+            on_item(item)
+    return response_id
+
+
+def _round1_handler(findings, allowed, model, tracker):
+    def on_challenge(challenge):
+        _apply_challenges(findings, [challenge], model, allowed)
+        tracker.confirm_early(findings, challenge.get("finding_index"), allowed)
+    return on_challenge
+
+
+def _round2_handler(findings, allowed, tracker, final):
+    def on_assessment(assessment):
+        _apply_defenses(findings, [assessment], allowed)
+        if final and assessment.get("finding_index") in allowed:
+            tracker.commit(findings, [assessment["finding_index"]], 2)
+    return on_assessment
+
+
+def _round3_handler(findings, allowed, tracker):
+    def on_synthesis(synthesis):
+        _apply_synthesis(findings, [synthesis], allowed)
+        if synthesis.get("finding_index") in allowed:
+            tracker.commit(findings, [synthesis["finding_index"]], 3)
+    return on_synthesis
+
+
+_signal_lock = threading.Lock()
+
+
+def write_signal(signal_log, signal_type, data):
+    """Append one entry to the session signal log (same format as stream-review.py)."""
+    entry = {
+        "ts": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z",
+        "source": "debate",
+        "type": signal_type,
+        "data": data,
+    }
+    # One os.write of the whole line on an O_APPEND fd, so lines from other
+    # processes writing the same log (stream-review.py, signal-log.sh) never
+    # interleave with it; the lock covers the rare short write
+    view = memoryview((json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8"))
+    with _signal_lock:
+        fd = os.open(signal_log, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+
+
+class VerdictTracker:
+    """Commits each finding's debate verdict once, as soon as it is decided.
+
+    A commit writes a debate_verdict signal (finding_index, file, line,
+    title, status, confidence, round, early) to signal_log when one is set,
+    so the review gate can act on it before the whole debate ends. A
+    finding confirmed in round 1 with confidence >= early_commit_confidence
+    (None disables) is committed early and skips rounds 2 and 3.
+    """
+
+    def __init__(self, consensus_threshold, early_commit_confidence=None, signal_log=None):
+        self.consensus_threshold = consensus_threshold
+        self.early_commit_confidence = early_commit_confidence
+        self.signal_log = signal_log
+        self.committed = set()
+        self.early = 0
+        self._lock = threading.Lock()
+
+    def pending(self, indices):
+        with self._lock:
+            return [i for i in indices if i not in self.committed]
+
+    def confirm_early(self, findings, idx, allowed):
+        if self.early_commit_confidence is None or idx not in allowed:
+            return
+        finding = findings[idx]
+        if (finding.get("debate_status") == "confirmed"
+                and finding.get("confidence", 50) >= self.early_commit_confidence):
+            self.commit(findings, [idx], 1, early=True)
+
+    def commit(self, findings, indices, round_no, early=False, status=None):
+        """Commit the findings at indices not committed yet; status defaults to their category."""
+        with self._lock:
+            indices = [i for i in indices if i not in self.committed]
+            self.committed.update(indices)
+            if early:
+                self.early += len(indices)
+        if not self.signal_log:
+            return
+        for i in indices:
+            finding = findings[i]
+            try:
+                write_signal(self.signal_log, "debate_verdict", {
+                    "finding_index": i,
+                    "file": finding.get("file", ""),
+                    "line": finding.get("line", 0),
+                    "title": finding.get("title", ""),
+                    "severity": finding.get("severity", ""),
+                    "status": status or finding_category(finding, self.consensus_threshold),
+                    "confidence": finding.get("confidence", 50),
+                    "round": round_no,
+                    "early": early,
+                })
+            except OSError:
+                pass
+
+
 # --- Prompt builders ---
 
 def _build_round1_prompt(findings_text, code_text, challengeable):
     return f"""You are a code review challenger. Analyze these findings and challenge any that seem incorrect, overstated, or lack evidence.
 
-FINDINGS TO REVIEW:
+FINDINGS TO REVIEW (finding_index is the index to answer with):
 {findings_text}
 
 CODE CONTEXT:
@@ -370,7 +752,7 @@ def _build_round2_prompt(challenged_findings):
     return f"""Based on the challenges you raised, the original reviewers defend their findings.
 
 CHALLENGED FINDINGS:
-{json.dumps(challenged_findings, indent=2)}
+{_compact(challenged_findings)}
 
 Review the defenses and provide your final assessment. Adjust confidence up if the defense is convincing, down if not.
 
@@ -387,23 +769,111 @@ Respond with ONLY valid JSON:
 }}"""
 
 
-def _build_round3_prompt():
-    return """Provide a final synthesis of the debate. For each finding, give your final confidence assessment.
+def _build_round3_prompt(open_indices):
+    return f"""Provide a final synthesis of the debate. For each finding still open (indices: {open_indices}), give your final confidence assessment.
 
 Respond with ONLY valid JSON:
-{
+{{
   "synthesis": [
-    {
+    {{
       "finding_index": <int>,
       "final_confidence": <0-100>,
       "verdict": "accepted|rejected|disputed"
-    }
+    }}
   ]
-}"""
+}}"""
+
+
+# --- Sharding ---
+
+def _compact(value):
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def _indexed(findings, indices):
+    """Findings at indices, each tagged with its global finding_index."""
+    entries = []
+    for i in indices:
+        entry = {"finding_index": i}
+        entry.update((k, v) for k, v in findings[i].items() if k != "finding_index")
+        entries.append(entry)
+    return entries
+
+
+def _shard_prompt_inputs(findings, code_context, indices):
+    """(findings_text, code_text) for a debate over the findings at indices.
+
+    Only those findings are serialized (compactly, with global indices).
+    A code_context keyed by file path is cut down to the shard's files;
+    any other shape is sent whole.
+    """
+    findings_text = _compact(_indexed(findings, indices))
+    if isinstance(code_context, dict) and code_context:
+        all_files = {f.get("file", "") for f in findings}
+        if all_files & set(code_context):
+            files = {findings[i].get("file", "") for i in indices}
+            code_context = {path: ctx for path, ctx in code_context.items() if path in files}
+    code_text = _compact(code_context) if code_context else "No code context provided"
+    return findings_text, code_text
+
+
+def _finding_words(finding):
+    text = " ".join(str(finding.get(k, "")) for k in ("title", "description", "category"))
+    return set(re.findall(r"[a-z0-9_]{3,}", text.lower()))
+
+
+def shard_findings(findings, indices, shard_by="file", max_size=8, similarity=0.3):
+    """Partition finding indices into independent debates of at most max_size.
+
+    "file" groups by file, splitting files with more findings; "similarity"
+    greedily clusters findings (across files) whose title/description word
+    sets overlap by at least `similarity` (Jaccard).
+    """
+    max_size = max(1, max_size)
+    if shard_by == "similarity":
+        clusters = []
+        for i in indices:
+            words = _finding_words(findings[i])
+            best, best_score = None, similarity
+            for members, cluster_words in clusters:
+                if len(members) >= max_size or not (words or cluster_words):
+                    continue
+                score = len(words & cluster_words) / len(words | cluster_words)
+                if score >= best_score:
+                    best, best_score = (members, cluster_words), score
+            if best is None:
+                clusters.append(([i], set(words)))
+            else:
+                best[0].append(i)
+                best[1].update(words)
+        return [members for members, _ in clusters]
+    groups = {}
+    for i in indices:
+        groups.setdefault(findings[i].get("file", ""), []).append(i)
+    return [group[start:start + max_size]
+            for group in groups.values() for start in range(0, len(group), max_size)]
 
 
 # --- Finding manipulation helpers ---
 
+_VERDICT_FIELDS = ("confidence", "debate_status", "challenger")
+
+
+def _verdict_state(findings, indices):
+    """The verdict fields of the findings at indices, for _restore_verdict_state."""
+    return {i: {k: findings[i][k] for k in _VERDICT_FIELDS if k in findings[i]} for i in indices}
+
+
+def _restore_verdict_state(findings, state, tracker):
+    """Undo a failed attempt's verdicts, keeping those already committed."""
+    for i, fields in state.items():
+        if i in tracker.committed:
+            continue
+        for k in _VERDICT_FIELDS:
+            findings[i].pop(k, None)
+        findings[i].update(fields)
+
+
 def _find_challengeable(findings, challenge_threshold):
     challengeable = []
     for i, f in enumerate(findings):
@@ -414,10 +884,10 @@ def _find_challengeable(findings, challenge_threshold):
     return challengeable
 
 
-def _apply_challenges(findings, challenges, model):
+def _apply_challenges(findings, challenges, model, allowed=None):
     for challenge in challenges:
         idx = challenge.get("finding_index", -1)
-        if 0 <= idx < len(findings):
+        if 0 <= idx < len(findings) and (allowed is None or idx in allowed):
             adj = max(-20, min(20, challenge.get("confidence_adjustment", 0)))
             old_conf = findings[idx].get("confidence", 50)
             findings[idx]["confidence"] = max(0, min(100, old_conf + adj))
@@ -425,10 +895,10 @@ def _apply_challenges(findings, challenges, model):
             findings[idx]["challenger"] = model
 
 
-def _apply_defenses(findings, assessments):
+def _apply_defenses(findings, assessments, allowed=None):
     for assessment in assessments:
         idx = assessment.get("finding_index", -1)
-        if 0 <= idx < len(findings):
+        if 0 <= idx < len(findings) and (allowed is None or idx in allowed):
             adj = max(-10, min(10, assessment.get("confidence_adjustment", 0)))
             old_conf = findings[idx].get("confidence", 50)
             findings[idx]["confidence"] = max(0, min(100, old_conf + adj))
@@ -436,10 +906,10 @@ def _apply_defenses(findings, assessments):
                 findings[idx]["debate_status"] = "challenged"
 
 
-def _apply_synthesis(findings, synthesis):
+def _apply_synthesis(findings, synthesis, allowed=None):
     for syn in synthesis:
         idx = syn.get("finding_index", -1)
-        if 0 <= idx < len(findings):
+        if 0 <= idx < len(findings) and (allowed is None or idx in allowed):
             findings[idx]["confidence"] = syn.get("final_confidence", findings[idx].get("confidence", 50))
             verdict = syn.get("verdict", "")
             if verdict in ("accepted", "rejected", "disputed"):
@@ -463,31 +933,412 @@ def categorize_findings(findings, consensus_threshold):
     rejected = []
     disputed = []
 
+    categories = {"accepted": accepted, "rejected": rejected, "disputed": disputed}
     for f in findings:
-        models = f.get("models", [])
-        model_count = len(set(models)) if models else 1
-        confidence = f.get("confidence", 50)
-        status = f.get("debate_status", "none")
-
-        if model_count >= 2 and status != "challenged":
-            accepted.append(f)
-        elif confidence >= consensus_threshold:
-            accepted.append(f)
-        elif status == "challenged" and confidence < (consensus_threshold * 0.5):
-            rejected.append(f)
-        elif status == "challenged":
-            disputed.append(f)
-        elif confidence < (consensus_threshold * 0.6):
-            disputed.append(f)
-        elif confidence >= (consensus_threshold * 0.7):
-            accepted.append(f)
-        else:
-            disputed.append(f)
+        categories[finding_category(f, consensus_threshold)].append(f)
+
+    return categories
+
+
+def finding_category(f, consensus_threshold):
+    """"accepted", "rejected" or "disputed" for one finding (see categorize_findings)."""
+    models = f.get("models", [])
+    model_count = len(set(models)) if models else 1
+    confidence = f.get("confidence", 50)
+    status = f.get("debate_status", "none")
+
+    if model_count >= 2 and status != "challenged":
+        return "accepted"
+    if confidence >= consensus_threshold:
+        return "accepted"
+    if status == "challenged" and confidence < (consensus_threshold * 0.5):
+        return "rejected"
+    if status == "challenged":
+        return "disputed"
+    if confidence < (consensus_threshold * 0.6):
+        return "disputed"
+    if confidence >= (consensus_threshold * 0.7):
+        return "accepted"
+    return "disputed"
+
+
+# --- Verdict cache ---
+
+# Bump when prompts or verdict semantics change in a way the key does not capture
+VERDICT_CACHE_VERSION = 1
+
+
+class VerdictCache:
+    """Debate verdicts reused across runs for the same finding on the same code.
+
+    Entries live in DEBATE_CACHE_DIR (run-debate.sh points it at the
+    project's cache-manager.sh "debate-verdicts" category) as <key> plus an
+    epoch <key>.timestamp, like stream-review.py's review cache. The key
+    hashes a normalized finding fingerprint (title, file, line bucket,
+    description), the model and the finding's code: its file's entry in a
+    code_context keyed by path, else the whole code_context, else the file
+    on disk. A finding with no code to hash is never cached, so a code
+    change always invalidates. A hit restores the verdict's debate_status
+    and confidence adjustment without any API round.
+    """
 
-    return {"accepted": accepted, "rejected": rejected, "disputed": disputed}
+    def __init__(self, directory, ttl_seconds, max_bytes, line_bucket=10):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.line_bucket = max(1, line_bucket)
+        self.hits = self.misses = self.stored = 0
+
+    @classmethod
+    def from_config(cls, config):
+        """The cache from cache.debate_verdicts, or None when disabled or unset."""
+        cache_cfg = config.get("cache", {})
+        verdict_cfg = cache_cfg.get("debate_verdicts", {})
+        directory = os.environ.get("DEBATE_CACHE_DIR", "")
+        if not directory or cache_cfg.get("enabled", True) is False or \
+                verdict_cfg.get("enabled", True) is False:
+            return None
+        return cls(directory, verdict_cfg.get("ttl_days", 7) * 86400,
+                   int(verdict_cfg.get("max_size_mb", 10) * 1024 * 1024),
+                   int(verdict_cfg.get("line_bucket", 10)))
+
+    def key(self, finding, code_context, model):
+        """Cache key for a finding, or None when its code cannot be hashed."""
+        code = _finding_code(finding, code_context)
+        if code is None:
+            return None
+
+        def normalize(text):
+            return " ".join(str(text or "").lower().split())
+
+        try:
+            bucket = int(finding.get("line") or 0) // self.line_bucket
+        except (TypeError, ValueError):
+            bucket = 0
+        description = hashlib.sha256(normalize(finding.get("description")).encode("utf-8")).hexdigest()
+        digest = hashlib.sha256()
+        for part in (str(VERDICT_CACHE_VERSION), model, normalize(finding.get("title")),
+                     str(finding.get("file", "")), str(bucket), description, code):
+            digest.update(part.encode("utf-8", errors="ignore"))
+            digest.update(b"\0")
+        return f"debate-{digest.hexdigest()[:40]}"
+
+    def get(self, key):
+        """The stored verdict, or None if missing or expired."""
+        path = os.path.join(self.directory, key)
+        try:
+            with open(f"{path}.timestamp") as f:
+                stored = int(f.read().strip() or 0)
+            if time.time() - stored > self.ttl_seconds:
+                raise ValueError("expired")
+            with open(path) as f:
+                verdict = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return verdict
+
+    def put(self, key, verdict):
+        path = os.path.join(self.directory, key)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            for target, text in ((path, json.dumps(verdict) + "\n"),
+                                 (f"{path}.timestamp", f"{int(time.time())}\n")):
+                tmp = f"{target}.tmp.{os.getpid()}"
+                with open(tmp, "w") as f:
+                    f.write(text)
+                os.replace(tmp, target)
+            self.stored += 1
+        except OSError as e:
+            print(f"Warning: debate verdict cache write failed: {e}", file=sys.stderr)
+
+    def evict(self):
+        """Drop expired entries, then the oldest ones until under max_bytes."""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        entries, total = [], 0
+        for name in names:
+            if name.endswith(".timestamp") or ".tmp." in name:
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        now = time.time()
+        for mtime, size, path in sorted(entries):
+            if total <= self.max_bytes and now - mtime <= self.ttl_seconds:
+                break
+            for stale in (path, f"{path}.timestamp"):
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+            total -= size
+
+    def report(self):
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "stored": self.stored,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0}
+
+
+def _finding_code(finding, code_context):
+    """The code a finding's verdict depends on, or None when there is none."""
+    path = str(finding.get("file", ""))
+    if isinstance(code_context, dict) and path in code_context:
+        return _compact(code_context[path])
+    if code_context:
+        return _compact(code_context)
+    if path and os.path.isfile(path):
+        try:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                return f.read()
+        except OSError:
+            return None
+    return None
+
+
+def _apply_cached_verdict(finding, verdict):
+    finding["confidence"] = max(0, min(100, finding.get("confidence", 50)
+                                       + verdict.get("confidence_adjustment", 0)))
+    finding["debate_status"] = verdict["debate_status"]
+    if verdict.get("challenger"):
+        finding["challenger"] = verdict["challenger"]
+    finding["verdict_cached"] = True
+
+
+# --- Concurrent debates ---
+
+def debate_settings(config):
+    """Debate parameters from the arena config (model is "" when none is configured)."""
+    ws_config = config.get("websocket", {})
+    debate_config = config.get("debate", {})
+    ws_url = ws_config.get("url", "wss://api.openai.com/v1/responses")
+    # Security: only allow OpenAI endpoints (prevents API key exfiltration via project config);
+    # a loopback mock needs an explicit opt-in from the environment, not the config
+    local_ok = os.environ.get("DEBATE_ALLOW_LOCAL_URL") == "1" and ws_url.startswith(LOCAL_URL_PREFIXES)
+    if not ws_url.startswith("wss://api.openai.com/") and not local_ok:
+        ws_url = "wss://api.openai.com/v1/responses"
+    return {
+        "model": ws_config.get("model", "") or config.get("models", {}).get("codex", {}).get("model_variant", ""),
+        "store": ws_config.get("store", False),
+        "connection_timeout": ws_config.get("connection_timeout_seconds", 30),
+        "ws_url": ws_url,
+        "max_rounds": debate_config.get("max_rounds", 3),
+        "challenge_threshold": debate_config.get("challenge_threshold", 60),
+        "consensus_threshold": debate_config.get("consensus_threshold", 80),
+        "shard_by": debate_config.get("shard_by", "file"),
+        "max_shard_findings": debate_config.get("max_shard_findings", 8),
+        "shard_similarity": debate_config.get("shard_similarity", 0.3),
+        "early_commit_confidence": (debate_config.get("early_commit_confidence", 85)
+                                    if debate_config.get("early_commit_enabled", True) else None),
+        # Compaction config (E3: Codex compaction philosophy)
+        "compaction_config": ws_config.get("compaction", {}),
+        "pool_size": ws_config.get("pool_size", 4),
+        "max_connection_minutes": ws_config.get("max_connection_minutes", 55),
+        "recycle_before_seconds": ws_config.get("recycle_before_seconds", 300),
+    }
+
+
+def open_pool(settings, api_key):
+    return ConnectionPool(api_key, settings["ws_url"], settings["connection_timeout"],
+                          settings["pool_size"], settings["max_connection_minutes"],
+                          settings["recycle_before_seconds"])
+
+
+def _debate_unit(findings, shard, code_context, settings, api_key, pool, tracker):
+    """Debate one shard (global indices) in place over the pool, falling back to HTTP.
+
+    Returns (ws_error, http_error); both None when the WebSocket debate ran.
+    """
+    args = (findings, code_context, settings["model"], settings["store"],
+            settings["connection_timeout"], settings["max_rounds"],
+            settings["challenge_threshold"], settings["consensus_threshold"], api_key)
+    initial_state = _verdict_state(findings, shard)
+    try:
+        run_debate_ws(*args, settings["ws_url"], settings["compaction_config"],
+                      pool=pool, indices=shard, tracker=tracker)
+        return None, None
+    except (ImportError, ConnectionError, TimeoutError, RuntimeError, OSError) as ws_error:
+        # WebSocket failed — fall back to HTTP Responses API
+        _restore_verdict_state(findings, initial_state, tracker)
+        try:
+            result = run_debate_http(*args, indices=shard, tracker=tracker)
+        except Exception as http_error:
+            return ws_error, http_error
+        return ws_error, result.get("error")
+
+
+def debate_findings(findings, code_context, settings, api_key, pool, executor, signal_log=None,
+                    cache=None):
+    """Debate the challengeable findings as concurrent shards and categorize them all.
+
+    Shards (shard_findings) are bounded in size and each sends only its own
+    findings and code context. They run on separate pooled connections with
+    their own response chains, so the total time follows the slowest shard
+    rather than the sum; verdicts land on the shared list by global index.
+    Findings of a shard whose WebSocket and HTTP attempts both failed are
+    accepted as-is. Every finding's verdict goes to signal_log (if set) as
+    soon as it is decided; undebated findings are committed in round 0.
+
+    With a VerdictCache, findings with a cached verdict are settled before
+    sharding and only the rest are debated; their fresh verdicts are stored
+    and the hit rate is reported as "verdict_cache".
+    """
+    tracker = VerdictTracker(settings["consensus_threshold"],
+                             settings["early_commit_confidence"], signal_log)
+    challengeable = _find_challengeable(findings, settings["challenge_threshold"])
+    challenge_set = set(challengeable)
+    tracker.commit(findings, [i for i in range(len(findings)) if i not in challenge_set], 0)
+    if not challengeable:
+        return {"accepted": findings, "rejected": [], "disputed": []}
+
+    cache_keys, initial = {}, {}
+    if cache:
+        misses = []
+        for i in challengeable:
+            key = cache.key(findings[i], code_context, settings["model"])
+            verdict = cache.get(key) if key else None
+            if verdict and verdict.get("debate_status"):
+                _apply_cached_verdict(findings[i], verdict)
+                tracker.commit(findings, [i], 0)
+                continue
+            if key:
+                cache_keys[i] = key
+                initial[i] = findings[i].get("confidence", 50)
+            misses.append(i)
+        challengeable = misses
+
+    shards = shard_findings(findings, challengeable, settings["shard_by"],
+                            settings["max_shard_findings"], settings["shard_similarity"])
+    futures = [executor.submit(_debate_unit, findings, shard, code_context, settings, api_key,
+                               pool, tracker)
+               for shard in shards]
+    fallbacks, errors, undebated = [], [], []
+    for shard, future in zip(shards, futures):
+        try:
+            ws_error, http_error = future.result()
+        except Exception as e:
+            ws_error = http_error = e
+        if ws_error is None:
+            continue
+        if http_error is None:
+            fallbacks.append(ws_error)
+            continue
+        errors.append(f"WS: {ws_error}, HTTP: {http_error}")
+        undebated.extend(findings[i] for i in shard)
+        tracker.commit(findings, shard, 0, status="accepted")
+        for i in shard:
+            cache_keys.pop(i, None)
+
+    failed = {id(f) for f in undebated}
+    result = categorize_findings([f for f in findings if id(f) not in failed],
+                                 settings["consensus_threshold"])
+    result["accepted"].extend(undebated)
+    result["debates"] = len(shards)
+    if tracker.early:
+        result["early_committed"] = tracker.early
+    if cache:
+        for i, key in cache_keys.items():
+            finding = findings[i]
+            if finding.get("debate_status"):
+                cache.put(key, {"debate_status": finding["debate_status"],
+                                "confidence_adjustment": finding.get("confidence", 50) - initial[i],
+                                "challenger": finding.get("challenger", "")})
+        cache.evict()
+        result["verdict_cache"] = cache.report()
+    if fallbacks:
+        result["ws_fallback"] = f"WebSocket unavailable ({fallbacks[0]}), used HTTP"
+    if errors:
+        more = f" (+{len(errors) - 1} more debates)" if len(errors) > 1 else ""
+        result["error"] = f"All transports failed. {errors[0]}{more}"
+    return result
+
+
+def answer_request(input_data, base_config, api_key, pool, executor):
+    """Result JSON for one debate request ({findings, code_context, config?, session_dir?}).
+
+    Verdicts stream to <session_dir>/signals.jsonl (default $SESSION_DIR).
+    """
+    findings = input_data.get("findings", [])
+    config = input_data.get("config") or base_config
+    code_context = input_data.get("code_context", {})
+    session_dir = input_data.get("session_dir") or os.environ.get("SESSION_DIR")
+    signal_log = os.path.join(session_dir, "signals.jsonl") if session_dir else None
+
+    if not findings:
+        return {"accepted": [], "rejected": [], "disputed": []}
+
+    settings = debate_settings(config)
+    if not settings["model"]:
+        return {
+            "accepted": findings, "rejected": [], "disputed": [],
+            "error": "No model configured for WebSocket debate (set websocket.model or models.codex.model_variant in config)"
+        }
+    if not api_key:
+        return {
+            "accepted": findings, "rejected": [], "disputed": [],
+            "error": "OPENAI_API_KEY not set"
+        }
+    return debate_findings(findings, code_context, settings, api_key, pool, executor, signal_log,
+                           VerdictCache.from_config(config))
+
+
+def serve(argv):
+    """Answer JSONL debate requests from stdin concurrently over one pool.
+
+    Connection settings (url, pool_size, lifetimes) come from --config; a
+    request's own "config" only changes its model and debate thresholds.
+    """
+    base_config = {}
+    if "--config" in argv and argv.index("--config") + 1 < len(argv):
+        try:
+            with open(argv[argv.index("--config") + 1]) as f:
+                base_config = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Warning: cannot read config: {e}", file=sys.stderr)
+
+    api_key = os.environ.get("OPENAI_API_KEY")
+    pool = open_pool(debate_settings(base_config), api_key)
+    out_lock = threading.Lock()
+
+    def answer(request_id, input_data):
+        try:
+            result = answer_request(input_data, base_config, api_key, pool, debates)
+        except Exception as e:
+            result = {"accepted": input_data.get("findings", []), "rejected": [], "disputed": [],
+                      "error": f"Debate failed: {e}"}
+        with out_lock:
+            print(json.dumps(dict({"id": request_id}, **result)), flush=True)
+
+    try:
+        with ThreadPoolExecutor(max_workers=pool.size) as debates, \
+                ThreadPoolExecutor(max_workers=pool.size * 4) as requests:
+            for line in sys.stdin:
+                if not line.strip():
+                    continue
+                try:
+                    input_data = json.loads(line)
+                except json.JSONDecodeError as e:
+                    with out_lock:
+                        print(json.dumps({"id": None, "accepted": [], "rejected": [], "disputed": [],
+                                          "error": f"Invalid JSON input: {e}"}), flush=True)
+                    continue
+                requests.submit(answer, input_data.get("id"), input_data)
+    finally:
+        pool.close()
 
 
 def main():
+    if "--serve" in sys.argv[1:]:
+        serve(sys.argv[1:])
+        return
+
     # Read input from stdin
     try:
         input_data = json.load(sys.stdin)
@@ -500,67 +1351,23 @@ def main():
 
     findings = input_data.get("findings", [])
     config = input_data.get("config", {})
-    code_context = input_data.get("code_context", {})
 
     if not findings:
         print(json.dumps({"accepted": [], "rejected": [], "disputed": []}))
         sys.exit(0)
 
-    # Config
-    ws_config = config.get("websocket", {})
-    debate_config = config.get("debate", {})
-    model = ws_config.get("model", "") or config.get("models", {}).get("codex", {}).get("model_variant", "")
-    if not model:
-        print(json.dumps({
-            "accepted": findings, "rejected": [], "disputed": [],
-            "error": "No model configured for WebSocket debate (set websocket.model or models.codex.model_variant in config)"
-        }))
-        sys.exit(1)
-    store = ws_config.get("store", False)
-    connection_timeout = ws_config.get("connection_timeout_seconds", 30)
-    ws_url = ws_config.get("url", "wss://api.openai.com/v1/responses")
-    # Security: only allow OpenAI endpoints (prevents API key exfiltration via project config)
-    if not ws_url.startswith("wss://api.openai.com/"):
-        ws_url = "wss://api.openai.com/v1/responses"
-    max_rounds = debate_config.get("max_rounds", 3)
-    challenge_threshold = debate_config.get("challenge_threshold", 60)
-    consensus_threshold = debate_config.get("consensus_threshold", 80)
-
     api_key = os.environ.get("OPENAI_API_KEY")
-    if not api_key:
-        print(json.dumps({
-            "accepted": findings, "rejected": [], "disputed": [],
-            "error": "OPENAI_API_KEY not set"
-        }))
-        sys.exit(1)
-
-    # Compaction config (E3: Codex compaction philosophy)
-    compaction_config = ws_config.get("compaction", {})
-
-    # Try WebSocket first, fall back to HTTP
+    settings = debate_settings(config)
+    pool = open_pool(settings, api_key)
     try:
-        result = run_debate_ws(
-            findings, code_context, model, store, connection_timeout,
-            max_rounds, challenge_threshold, consensus_threshold, api_key, ws_url,
-            compaction_config
-        )
-        print(json.dumps(result))
-    except (ImportError, ConnectionError, TimeoutError, RuntimeError, OSError) as ws_error:
-        # WebSocket failed — fall back to HTTP Responses API
-        try:
-            result = run_debate_http(
-                findings, code_context, model, store, connection_timeout,
-                max_rounds, challenge_threshold, consensus_threshold, api_key
-            )
-            result["ws_fallback"] = f"WebSocket unavailable ({ws_error}), used HTTP"
-            print(json.dumps(result))
-        except Exception as http_error:
-            # Both failed — accept all findings
-            print(json.dumps({
-                "accepted": findings, "rejected": [], "disputed": [],
-                "error": f"All transports failed. WS: {ws_error}, HTTP: {http_error}"
-            }))
-            sys.exit(0)
+        with ThreadPoolExecutor(max_workers=pool.size) as executor:
+            result = answer_request(input_data, config, api_key, pool, executor)
+    finally:
+        pool.close()
+    print(json.dumps(result))
+    # Missing model or API key: exit non-zero so run-debate.sh falls through
+    if result.get("error") and "debates" not in result:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
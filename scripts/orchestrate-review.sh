@@ -332,6 +332,50 @@ if [ "$STREAMING_ENABLED" = "true" ] && [ -f "$SCRIPT_DIR/stream-orchestrator.sh
   _PREFER_STREAMING=$(jq -r '.streaming.prefer_streaming // false' "$CONFIG_FILE")
 fi
 
+# Streaming reviews split large files into segments, so they accept files
+# above MAX_FILE_SIZE up to streaming.segmenting.max_file_bytes
+_SEGMENT_MAX_SIZE=0
+if [ "$_PREFER_STREAMING" = "true" ] && \
+   [ "$(jq -r '.streaming.segmenting.enabled // true' "$CONFIG_FILE")" = "true" ]; then
+  _SEGMENT_MAX_SIZE=$(jq -r '.streaming.segmenting.max_file_bytes // 8388608' "$CONFIG_FILE")
+fi
+
+# =============================================================================
+# Review Result Cache (cache.review_results)
+# =============================================================================
+
+# Sync reviews of an unchanged file, role, prompt template and model variant
+# reuse the previous run's findings from the cache-manager "review-results"
+# category; streaming reviews use the same directory via stream-review.py.
+_REVIEW_CACHE=$(jq -r '(.cache.enabled != false) and (.cache.review_results.enabled != false)' \
+  "$CONFIG_FILE" 2>/dev/null || echo "false")
+_REVIEW_CACHE_TTL=$(jq -r '.cache.review_results.ttl_days // 3' "$CONFIG_FILE" 2>/dev/null || echo "3")
+_REVIEW_CACHE_ROOT="${PROJECT_ROOT:-$(git rev-parse --show-toplevel 2>/dev/null || pwd)}"
+_CACHE_KEY=""
+
+# _review_cache_lookup <model> <file> <role> <findings-file>
+# Sets _CACHE_KEY; succeeds (findings file written) on a fresh hit.
+_review_cache_lookup() {
+  local model="$1" file="$2" role="$3" findings_file="$4" variant
+  _CACHE_KEY=""
+  [ "$_REVIEW_CACHE" = "true" ] || return 1
+  variant=$(jq -r --arg m "$model" '.models[$m].model_variant // ""' "$CONFIG_FILE" 2>/dev/null)
+  _CACHE_KEY="sync-$({
+    printf 'v1\n%s\n%s\n%s\n%s\n' "$model" "$variant" "$role" "$file"
+    cat "$file" "$PLUGIN_DIR/config/review-prompts/${role}.txt" \
+      "$PLUGIN_DIR/config/schemas/codex-review.json" 2>/dev/null
+  } | shasum -a 256 | cut -c1-40)"
+  "$SCRIPT_DIR/cache-manager.sh" read "$_REVIEW_CACHE_ROOT" review-results "$_CACHE_KEY" \
+    --ttl "$_REVIEW_CACHE_TTL" > "$findings_file" 2>/dev/null
+}
+
+# _review_cache_store <key> <findings-file>: keeps only complete reviews
+_review_cache_store() {
+  [ -n "$1" ] || return 0
+  jq -e '(.error == null) and (.findings | type == "array")' "$2" >/dev/null 2>&1 || return 0
+  "$SCRIPT_DIR/cache-manager.sh" write "$_REVIEW_CACHE_ROOT" review-results "$1" < "$2" >/dev/null 2>&1 || true
+}
+
 # =============================================================================
 # RAG Auto-Index (if enabled)
 # =============================================================================
@@ -365,6 +409,12 @@ cleanup_reviews() {
 }
 trap cleanup_reviews EXIT INT TERM
 
+# bash >= 4.3 can block until any job exits instead of polling
+_HAS_WAIT_N=false
+if [ "${BASH_VERSINFO[0]}" -gt 4 ] || { [ "${BASH_VERSINFO[0]}" -eq 4 ] && [ "${BASH_VERSINFO[1]}" -ge 3 ]; }; then
+  _HAS_WAIT_N=true
+fi
+
 # Throttle: wait until running process count drops below MAX_PARALLEL
 _throttle_parallel() {
   while [ ${#REVIEW_PIDS[@]} -ge "$MAX_PARALLEL" ]; do
@@ -376,11 +426,17 @@ _throttle_parallel() {
     done
     REVIEW_PIDS=("${new_pids[@]+${new_pids[@]}}")
     if [ ${#REVIEW_PIDS[@]} -ge "$MAX_PARALLEL" ]; then
-      sleep 0.5
+      if [ "$_HAS_WAIT_N" = "true" ]; then
+        wait -n 2>/dev/null || true
+      else
+        sleep 0.5
+      fi
     fi
   done
 }
 
+STREAM_FILES=()
+
 # For each changed file, launch reviews with each enabled model+role
 while IFS= read -r changed_file; do
   [ -z "$changed_file" ] && continue
@@ -389,6 +445,11 @@ while IFS= read -r changed_file; do
   # Skip files exceeding size limit (prevents OOM on large files)
   FILE_SIZE=$(wc -c < "$changed_file" 2>/dev/null | tr -d ' ')
   if [ "${FILE_SIZE:-0}" -gt "$MAX_FILE_SIZE" ]; then
+    if [ "${FILE_SIZE:-0}" -le "$_SEGMENT_MAX_SIZE" ]; then
+      STREAM_FILES+=("$changed_file")  # reviewed in segments, never read here
+    else
+      log_warn "Skipping $changed_file (${FILE_SIZE} bytes exceeds the review size limit)"
+    fi
     continue
   fi
 
@@ -397,35 +458,9 @@ while IFS= read -r changed_file; do
     continue
   fi
 
-  # --- Streaming path: delegate to stream-orchestrator if preferred ---
+  # --- Streaming path: collected here, reviewed by one stream-orchestrator below ---
   if [ "$_PREFER_STREAMING" = "true" ]; then
-    # Collect all roles for this file
-    _all_roles=""
-    if [ "$codex_enabled" = "true" ] && [ -n "$codex_roles" ]; then
-      _all_roles="$codex_roles"
-    fi
-    if [ "$gemini_enabled" = "true" ] && [ -n "$gemini_roles" ]; then
-      if [ -n "$_all_roles" ]; then
-        _all_roles=$(printf '%s\n%s' "$_all_roles" "$gemini_roles" | sort -u)
-      else
-        _all_roles="$gemini_roles"
-      fi
-    fi
-
-    if [ -n "$_all_roles" ]; then
-      _throttle_parallel
-      # Convert newline-separated roles to args
-      _role_args=()
-      while IFS= read -r _sr; do
-        [ -z "$_sr" ] && continue
-        _role_args+=("$_sr")
-      done <<< "$_all_roles"
-
-      (
-        "$SCRIPT_DIR/stream-orchestrator.sh" "$SESSION_DIR" "$changed_file" "$CONFIG_FILE" "${_role_args[@]}" 2>/dev/null
-      ) &
-      REVIEW_PIDS+=($!)
-    fi
+    STREAM_FILES+=("$changed_file")
     continue  # Skip sync path for this file
   fi
 
@@ -435,13 +470,15 @@ while IFS= read -r changed_file; do
   if [ "$codex_enabled" = "true" ] && [ -n "$codex_roles" ]; then
     while IFS= read -r role; do
       [ -z "$role" ] && continue
-      _throttle_parallel
       FINDINGS_FILE="${SESSION_DIR}/findings_${FINDINGS_INDEX}.json"
       FINDINGS_INDEX=$((FINDINGS_INDEX + 1))
+      _review_cache_lookup codex "$changed_file" "$role" "$FINDINGS_FILE" && continue
+      _throttle_parallel
       (
         _cli_err=$(mktemp)
         echo "$FILE_CONTENT" | "$SCRIPT_DIR/codex-review.sh" "$changed_file" "$CONFIG_FILE" "$role" > "$FINDINGS_FILE" 2>"$_cli_err"
         log_stderr_file "orchestrate(codex:$role)" "$_cli_err"
+        _review_cache_store "$_CACHE_KEY" "$FINDINGS_FILE"
       ) &
       REVIEW_PIDS+=($!)
     done <<< "$codex_roles"
@@ -451,19 +488,52 @@ while IFS= read -r changed_file; do
   if [ "$gemini_enabled" = "true" ] && [ -n "$gemini_roles" ]; then
     while IFS= read -r role; do
       [ -z "$role" ] && continue
-      _throttle_parallel
       FINDINGS_FILE="${SESSION_DIR}/findings_${FINDINGS_INDEX}.json"
       FINDINGS_INDEX=$((FINDINGS_INDEX + 1))
+      _review_cache_lookup gemini "$changed_file" "$role" "$FINDINGS_FILE" && continue
+      _throttle_parallel
       (
         _cli_err=$(mktemp)
         echo "$FILE_CONTENT" | "$SCRIPT_DIR/gemini-review.sh" "$changed_file" "$CONFIG_FILE" "$role" > "$FINDINGS_FILE" 2>"$_cli_err"
         log_stderr_file "orchestrate(gemini:$role)" "$_cli_err"
+        _review_cache_store "$_CACHE_KEY" "$FINDINGS_FILE"
       ) &
       REVIEW_PIDS+=($!)
     done <<< "$gemini_roles"
   fi
 done <<< "$CHANGED_FILES"
 
+# --- Streaming path: all files x roles x models in one orchestrator run ---
+if [ ${#STREAM_FILES[@]} -gt 0 ]; then
+  _all_roles=""
+  if [ "$codex_enabled" = "true" ] && [ -n "$codex_roles" ]; then
+    _all_roles="$codex_roles"
+  fi
+  if [ "$gemini_enabled" = "true" ] && [ -n "$gemini_roles" ]; then
+    if [ -n "$_all_roles" ]; then
+      _all_roles=$(printf '%s\n%s' "$_all_roles" "$gemini_roles" | sort -u)
+    else
+      _all_roles="$gemini_roles"
+    fi
+  fi
+
+  if [ -n "$_all_roles" ]; then
+    # Convert newline-separated roles to args
+    _role_args=()
+    while IFS= read -r _sr; do
+      [ -z "$_sr" ] && continue
+      _role_args+=("$_sr")
+    done <<< "$_all_roles"
+
+    _stream_list="${SESSION_DIR}/stream-files.txt"
+    printf '%s\n' "${STREAM_FILES[@]}" > "$_stream_list"
+    (
+      "$SCRIPT_DIR/stream-orchestrator.sh" "$SESSION_DIR" "@${_stream_list}" "$CONFIG_FILE" "${_role_args[@]}" 2>/dev/null
+    ) &
+    REVIEW_PIDS+=($!)
+  fi
+fi
+
 # --- Wait for all reviews to complete ---
 REVIEW_FAILURES=0
 for pid in "${REVIEW_PIDS[@]}"; do
@@ -6,29 +6,51 @@ Core Python engine for RAG indexing and retrieval.
 All external input is received via environment variables (no shell injection risk).
 
 Commands:
-  index    - Build/update vector index from codebase
-  retrieve - Query the index for relevant code chunks
+  index [--jobs N] - Build/update vector index from codebase
+  retrieve         - Query the index for relevant code chunks
+                     (via the retrieve daemon when one is running)
+  retrieve-batch   - Answer a JSONL list of role queries in one round-trip
+  serve [--stdio]  - Long-lived retrieve daemon on <index>/retrieve.sock
+  socket-path      - Print the retrieve daemon's socket path for the index
+  bench            - Compare embedders (recall@k, throughput) on config/benchmarks
+  stub-server      - Local fake embeddings endpoint for throughput testing
 
 Environment variables:
   RAG_INDEX_DIR       - Path to the index directory
   RAG_FILE_LIST       - Path to file list (index only)
   RAG_HASH_FILE       - Path to file hash cache (index only)
-  RAG_EMBEDDING_MODEL - OpenAI embedding model name
+  RAG_EMBEDDING_MODEL - OpenAI embedding model name, or local:hashing[-<dims>] /
+                        local:<sentence-transformers model> for offline embedding
   RAG_CHUNK_SIZE      - Target chunk size in tokens
   RAG_CHUNK_OVERLAP   - Overlap between chunks in tokens
   RAG_FORCE_REINDEX   - Force full reindex (true/false)
+  RAG_EMBED_JOBS      - Max embedding API calls in flight (index only, default 4)
+  RAG_CHUNK_JOBS      - Hashing/chunking worker processes (index only, default: CPU count)
+  RAG_EMBED_BATCH_SIZE - Max chunks per embedding call (index only, default 100)
+  RAG_EMBED_CACHE     - Reuse cached vectors for unchanged chunks (true/false, default true)
+  RAG_EMBED_CACHE_MAX_MB   - Embedding cache size cap (default 200)
+  RAG_EMBED_CACHE_TTL_DAYS - Evict cache entries unused for this long (default 30)
   RAG_PROJECT_ROOT    - Project root path
   RAG_QUERY           - Search query (retrieve only)
   RAG_ROLE_KEYWORDS   - Role-specific augmentation keywords (retrieve only)
   RAG_TOP_K           - Number of results to return (retrieve only)
   RAG_RERANK          - Enable reranking (true/false)
+  RAG_BATCH_FILE      - JSONL query list (retrieve-batch only, default stdin)
+  RAG_RETRIEVE_MODE   - auto (vector, hybrid with rerank) or lexical (BM25 only, offline)
+  RAG_QUERY_CACHE_SIZE    - Query embeddings kept in the daemon LRU (default 1024)
+  RAG_DAEMON_IDLE_SECONDS - Daemon exits after this long without requests (default 1800)
 """
 
+import functools
 import hashlib
 import json
 import os
 import re
+import signal
 import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from pathlib import Path
 from typing import Optional
 
@@ -37,13 +59,28 @@ from typing import Optional
 # Tree-sitter Chunking (AST-based)
 # =============================================================================
 
-def _try_tree_sitter_chunk(content: str, file_path: str, chunk_size: int) -> Optional[list]:
-    """Attempt tree-sitter AST-based chunking. Returns None if tree-sitter unavailable."""
+@functools.lru_cache(maxsize=None)
+def _get_parser(lang: str):
+    """One tree-sitter parser per language per process (None if unavailable)."""
     try:
         from tree_sitter_languages import get_parser
-    except ImportError:
+        return get_parser(lang)
+    except Exception:
         return None
 
+
+def _node_name(node) -> str:
+    """Name of a definition node (its `name` field), or '' if it has none."""
+    try:
+        name = node.child_by_field_name('name')
+        return name.text.decode('utf-8', errors='ignore') if name is not None else ''
+    except Exception:
+        return ''
+
+
+def _try_tree_sitter_chunk(content: str, file_path: str, chunk_size: int) -> Optional[list]:
+    """Attempt tree-sitter AST-based chunking. Returns None if tree-sitter unavailable."""
+
     # Map file extensions to tree-sitter language names
     ext = Path(file_path).suffix.lower()
     lang_map = {
@@ -59,9 +96,8 @@ def _try_tree_sitter_chunk(content: str, file_path: str, chunk_size: int) -> Opt
     if not lang:
         return None
 
-    try:
-        parser = get_parser(lang)
-    except Exception:
+    parser = _get_parser(lang)
+    if parser is None:
         return None
 
     try:
@@ -102,6 +138,7 @@ def _try_tree_sitter_chunk(content: str, file_path: str, chunk_size: int) -> Opt
                         'file': file_path,
                         'content': text.strip(),
                         'type': node.type,
+                        'symbol': _node_name(node),
                         'start_line': node.start_point[0] + 1,
                         'end_line': node.end_point[0] + 1,
                     })
@@ -163,12 +200,13 @@ def _regex_chunk(content: str, file_path: str, chunk_size: int, overlap: int) ->
             i += step - overlap_lines
         return chunks
 
-    # Split by pattern
+    # Split by pattern (odd parts are the captured signatures)
     parts = re.split(pattern, content)
     current_chunk = ""
     current_start = 1
+    current_names = []
 
-    for part in parts:
+    for i, part in enumerate(parts):
         if len(current_chunk) + len(part) > char_limit:
             if current_chunk.strip():
                 line_count = current_chunk[:current_chunk.find(current_chunk.strip())].count('\n')
@@ -176,19 +214,24 @@ def _regex_chunk(content: str, file_path: str, chunk_size: int, overlap: int) ->
                     'file': file_path,
                     'content': current_chunk.strip(),
                     'type': 'code',
+                    'symbol': ' '.join(dict.fromkeys(current_names)),
                     'start_line': current_start,
                     'end_line': current_start + current_chunk.count('\n'),
                 })
             current_start = current_start + current_chunk.count('\n') + 1
             current_chunk = part
+            current_names = []
         else:
             current_chunk += part
+        if i % 2:
+            current_names.append(re.findall(r'\w+', part)[-1])
 
     if current_chunk.strip():
         chunks.append({
             'file': file_path,
             'content': current_chunk.strip(),
             'type': 'code',
+            'symbol': ' '.join(dict.fromkeys(current_names)),
             'start_line': current_start,
             'end_line': current_start + current_chunk.count('\n'),
         })
@@ -211,6 +254,23 @@ def chunk_file(content: str, file_path: str, chunk_size: int = 500, overlap: int
     return _regex_chunk(content, file_path, chunk_size, overlap)
 
 
+def assign_chunk_ids(chunks: list) -> list:
+    """Give each chunk a stable ID derived from its file path and content.
+
+    Identical chunks within one file get an occurrence suffix. IDs stay the
+    same across runs as long as the chunk text does, so re-indexing a file
+    only touches chunks that actually appeared or disappeared.
+    """
+    seen = {}
+    for chunk in chunks:
+        digest = hashlib.sha256(
+            f"{chunk['file']}\0{chunk['content']}".encode('utf-8')).hexdigest()[:32]
+        occurrence = seen.get(digest, 0)
+        seen[digest] = occurrence + 1
+        chunk['id'] = f"c_{digest}" if occurrence == 0 else f"c_{digest}_{occurrence}"
+    return chunks
+
+
 # =============================================================================
 # File Hashing (Incremental Indexing)
 # =============================================================================
@@ -228,14 +288,29 @@ def compute_file_hash(filepath: str) -> str:
 
 
 def load_hash_cache(hash_file: str) -> dict:
-    """Load previous file hashes."""
+    """Load previous file hashes as {path: {hash, size, mtime_ns, ino}}.
+
+    Older caches stored a bare hash string per path; those load as
+    {'hash': ...} and simply get re-hashed once.
+    """
     if not os.path.exists(hash_file):
         return {}
     try:
         with open(hash_file, 'r') as f:
-            return json.load(f)
+            raw = json.load(f)
     except (json.JSONDecodeError, OSError):
         return {}
+    return {path: entry if isinstance(entry, dict) else {'hash': entry}
+            for path, entry in raw.items()}
+
+
+def file_signature(filepath: str) -> Optional[dict]:
+    """(size, mtime_ns, inode) of a file, used to skip re-hashing."""
+    try:
+        st = os.stat(filepath)
+    except OSError:
+        return None
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'ino': st.st_ino}
 
 
 def save_hash_cache(hash_file: str, hashes: dict):
@@ -246,11 +321,746 @@ def save_hash_cache(hash_file: str, hashes: dict):
     os.replace(tmp, hash_file)
 
 
+# =============================================================================
+# Lexical Index (BM25)
+# =============================================================================
+
+_IDENT_RE = re.compile(r'[A-Za-z_][A-Za-z0-9_]*|\d+')
+_CAMEL_RE = re.compile(r'[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+')
+
+
+def lexical_tokens(text: str) -> list:
+    """Identifier-aware tokens: each identifier lowercased, plus its
+    snake_case/camelCase parts, so `getUserById` matches `get_user_by_id`."""
+    tokens = []
+    for ident in _IDENT_RE.findall(text):
+        lower = ident.lower()
+        if len(lower) > 1:
+            tokens.append(lower)
+        parts = [p.lower() for piece in ident.split('_') for p in _CAMEL_RE.findall(piece)]
+        if len(parts) > 1:
+            tokens.extend(p for p in parts if len(p) > 1 and p != lower)
+    return tokens
+
+
+class LexicalIndex:
+    """Inverted BM25 index over chunk tokens, stored next to the Chroma DB.
+
+    Kept in step with the collection by cmd_index (same chunk IDs), and it
+    holds chunk text and metadata so lexical-only retrieval needs neither
+    chromadb nor the embeddings API.
+    """
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, path: str):
+        import sqlite3
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(
+            'CREATE TABLE IF NOT EXISTS docs ('
+            ' id TEXT PRIMARY KEY, length INTEGER NOT NULL,'
+            ' content TEXT NOT NULL, meta TEXT NOT NULL);'
+            'CREATE TABLE IF NOT EXISTS postings ('
+            ' term TEXT NOT NULL, id TEXT NOT NULL, tf INTEGER NOT NULL,'
+            ' PRIMARY KEY (term, id)) WITHOUT ROWID;'
+            'CREATE INDEX IF NOT EXISTS idx_postings_id ON postings(id);'
+            'CREATE TABLE IF NOT EXISTS symbols ('
+            ' name TEXT NOT NULL, id TEXT NOT NULL,'
+            ' PRIMARY KEY (name, id)) WITHOUT ROWID;'
+            'CREATE INDEX IF NOT EXISTS idx_symbols_id ON symbols(id);')
+        self._db.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM docs').fetchone()[0]
+
+    def add(self, chunks: list):
+        """Insert or replace chunks (dicts with id, content and metadata)."""
+        from collections import Counter
+        with self._lock:
+            for chunk in chunks:
+                counts = Counter(lexical_tokens(chunk['content']))
+                self._db.execute('DELETE FROM postings WHERE id = ?', (chunk['id'],))
+                self._db.execute(
+                    'INSERT OR REPLACE INTO docs (id, length, content, meta) VALUES (?, ?, ?, ?)',
+                    (chunk['id'], sum(counts.values()), chunk['content'],
+                     json.dumps(_chunk_metadata(chunk))))
+                self._db.executemany('INSERT INTO postings (term, id, tf) VALUES (?, ?, ?)',
+                                     [(term, chunk['id'], tf) for term, tf in counts.items()])
+                self._db.execute('DELETE FROM symbols WHERE id = ?', (chunk['id'],))
+                self._db.executemany('INSERT OR IGNORE INTO symbols (name, id) VALUES (?, ?)',
+                                     [(name, chunk['id'])
+                                      for name in (chunk.get('symbol') or '').split()])
+            self._db.commit()
+
+    def update_metadata(self, chunks: list):
+        with self._lock:
+            self._db.executemany('UPDATE docs SET meta = ? WHERE id = ?',
+                                 [(json.dumps(_chunk_metadata(c)), c['id']) for c in chunks])
+            self._db.commit()
+
+    def delete(self, ids: list):
+        with self._lock:
+            self._db.executemany('DELETE FROM postings WHERE id = ?', [(i,) for i in ids])
+            self._db.executemany('DELETE FROM symbols WHERE id = ?', [(i,) for i in ids])
+            self._db.executemany('DELETE FROM docs WHERE id = ?', [(i,) for i in ids])
+            self._db.commit()
+
+    def search(self, query: str, k: int) -> list:
+        """Top-k chunks by BM25 score, as result dicts carrying their id."""
+        import math
+        terms = set(lexical_tokens(query))
+        if not terms:
+            return []
+        with self._lock:
+            total, avg_len = self._db.execute(
+                'SELECT COUNT(*), COALESCE(AVG(length), 0) FROM docs').fetchone()
+            if not total:
+                return []
+            scores = {}
+            for term in terms:
+                rows = self._db.execute(
+                    'SELECT p.id, p.tf, d.length FROM postings p JOIN docs d ON d.id = p.id'
+                    ' WHERE p.term = ?', (term,)).fetchall()
+                if not rows:
+                    continue
+                idf = math.log(1 + (total - len(rows) + 0.5) / (len(rows) + 0.5))
+                for chunk_id, tf, length in rows:
+                    norm = tf + self.K1 * (1 - self.B + self.B * length / (avg_len or 1))
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.K1 + 1) / norm
+            best = sorted(scores.items(), key=lambda item: -item[1])[:k]
+            docs = {}
+            for chunk_id, _ in best:
+                row = self._db.execute('SELECT content, meta FROM docs WHERE id = ?',
+                                       (chunk_id,)).fetchone()
+                docs[chunk_id] = row
+        results = []
+        for chunk_id, score in best:
+            content, meta = docs[chunk_id]
+            result = _format_result(content, json.loads(meta), 0.0)
+            result['id'] = chunk_id
+            result['bm25'] = round(score, 4)
+            results.append(result)
+        return results
+
+    def defining(self, names: list, k: int) -> list:
+        """Up to k chunks that define any of the given symbol names, those
+        defining the most names first, as result dicts carrying their id."""
+        names = list(dict.fromkeys(names))[:500]
+        if not names:
+            return []
+        marks = ','.join('?' * len(names))
+        with self._lock:
+            rows = self._db.execute(
+                f'SELECT d.id, d.content, d.meta, COUNT(*) AS hits FROM symbols s'
+                f' JOIN docs d ON d.id = s.id WHERE s.name IN ({marks})'
+                f' GROUP BY d.id ORDER BY hits DESC, d.length ASC LIMIT ?',
+                (*names, k)).fetchall()
+        results = []
+        for chunk_id, content, meta, _ in rows:
+            result = _format_result(content, json.loads(meta), 0.0)
+            result['id'] = chunk_id
+            results.append(result)
+        return results
+
+    def close(self):
+        self._db.close()
+
+
+def _open_lexical(index_dir: str) -> Optional[LexicalIndex]:
+    path = os.path.join(index_dir, 'lexical.sqlite')
+    return LexicalIndex(path) if os.path.exists(path) else None
+
+
+def _backfill_lexical(collection, lexical: LexicalIndex, page: int = 1000):
+    """Populate a new lexical index from chunks already in the collection."""
+    offset = 0
+    while True:
+        found = collection.get(include=['documents', 'metadatas'], limit=page, offset=offset)
+        ids = found.get('ids') or []
+        if not ids:
+            break
+        lexical.add([dict(meta or {}, id=chunk_id, content=doc)
+                     for chunk_id, doc, meta in zip(ids, found['documents'], found['metadatas'])])
+        offset += len(ids)
+
+
+# =============================================================================
+# Embedders
+# =============================================================================
+
+class OpenAIEmbedder:
+    """Embeddings API backend (the default)."""
+
+    def __init__(self, model: str):
+        from openai import OpenAI
+        self.model = model
+        # Rate limits are retried by _embed_with_retry, which also adapts the
+        # batch size and concurrency; SDK retries would hide them from it
+        self._client = OpenAI(max_retries=0)
+
+    def embed(self, texts: list) -> list:
+        response = self._client.embeddings.create(model=self.model, input=texts)
+        return [d.embedding for d in response.data]
+
+
+def _hash_features(text: str) -> list:
+    """Identifier tokens plus character trigrams of longer tokens."""
+    tokens = lexical_tokens(text)
+    grams = [f"#{t[i:i + 3]}" for t in tokens if len(t) > 3 for i in range(len(t) - 2)]
+    return tokens + grams
+
+
+def _hash_embed_batch(args: tuple) -> list:
+    """Signed feature hashing for one slice of texts (runs in pool workers)."""
+    import zlib
+    texts, dims = args
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+
+    rows, cols, signs = [], [], []
+    for row, text in enumerate(texts):
+        for feature in _hash_features(text):
+            h = zlib.crc32(feature.encode('utf-8'))
+            rows.append(row)
+            cols.append(h % dims)
+            signs.append(1.0 if (h >> 31) & 1 else -1.0)
+
+    if np is not None:
+        matrix = np.zeros((len(texts), dims), dtype=np.float32)
+        np.add.at(matrix, (np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)),
+                  np.asarray(signs, dtype=np.float32))
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (matrix / norms).tolist()
+
+    import math
+    vectors = [[0.0] * dims for _ in texts]
+    for row, col, sign in zip(rows, cols, signs):
+        vectors[row][col] += sign
+    for vector in vectors:
+        for i, value in enumerate(vector):
+            vector[i] = math.copysign(math.log1p(abs(value)), value)
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        vector[:] = [v / norm for v in vector]
+    return vectors
+
+
+class HashingEmbedder:
+    """Offline CPU embedder: hashed identifier and trigram features.
+
+    Deterministic and dependency-free (numpy is used when installed).
+    Large batches are split across CPU cores with a process pool.
+    Selected with RAG_EMBEDDING_MODEL=local:hashing[-<dims>].
+    """
+
+    PARALLEL_MIN_TEXTS = 512
+
+    def __init__(self, dims: int = 512):
+        self.model = f"local:hashing-{dims}"
+        self.dims = dims
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def embed(self, texts: list) -> list:
+        workers = os.cpu_count() or 1
+        if workers < 2 or len(texts) < self.PARALLEL_MIN_TEXTS:
+            return _hash_embed_batch((texts, self.dims))
+        # Embedding threads call this concurrently; create one pool, not one each
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = _process_pool(workers)
+        step = -(-len(texts) // workers)
+        parts = [(texts[i:i + step], self.dims) for i in range(0, len(texts), step)]
+        return [v for part in self._pool.map(_hash_embed_batch, parts) for v in part]
+
+
+class SentenceTransformerEmbedder:
+    """Offline CPU embedder backed by a sentence-transformers model.
+
+    Selected with RAG_EMBEDDING_MODEL=local:<model>, for example
+    local:sentence-transformers/all-MiniLM-L6-v2. Inference is batched and
+    uses all cores through torch.
+    """
+
+    def __init__(self, name: str):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise ImportError("sentence-transformers not installed. Run: pip install sentence-transformers "
+                              "(or use RAG_EMBEDDING_MODEL=local:hashing)")
+        self.model = f"local:{name}"
+        self._model = SentenceTransformer(name, device='cpu')
+
+    def embed(self, texts: list) -> list:
+        return self._model.encode(texts, batch_size=64, normalize_embeddings=True,
+                                  convert_to_numpy=True).tolist()
+
+
+def is_local_model(model: str) -> bool:
+    return model.startswith('local:')
+
+
+def get_embedder(model: str):
+    """Embedder for an RAG_EMBEDDING_MODEL value.
+
+    local:hashing[-<dims>] and local:<sentence-transformers model> run
+    offline; anything else is an OpenAI embeddings model.
+    """
+    if not is_local_model(model):
+        return OpenAIEmbedder(model)
+    name = model[len('local:'):]
+    if name == 'hashing' or name.startswith('hashing-'):
+        dims = name.partition('-')[2]
+        return HashingEmbedder(int(dims) if dims.isdigit() else 512)
+    return SentenceTransformerEmbedder(name)
+
+
+# Bumped when chunk metadata gains fields; older indexes are re-stored once
+CHUNK_SCHEMA = 2
+
+
+def load_index_meta(index_dir: str) -> dict:
+    """Index-wide settings recorded at index time (e.g. embedding model)."""
+    try:
+        with open(os.path.join(index_dir, 'index-meta.json'), 'r') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def save_index_meta(index_dir: str, meta: dict):
+    path = os.path.join(index_dir, 'index-meta.json')
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp, path)
+
+
+# =============================================================================
+# Embedding Cache (content-addressed)
+# =============================================================================
+
+class EmbeddingCache:
+    """Persistent embedding store keyed by sha256(model, chunk content).
+
+    Unchanged chunks of a modified file reuse their stored vectors, so only
+    new or edited chunks reach the embeddings API. Vectors are stored as
+    float32 blobs in SQLite; entries are evicted by age and total size.
+    """
+
+    def __init__(self, path: str, model: str):
+        import sqlite3
+        self.model = model
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS embeddings ('
+            ' key TEXT PRIMARY KEY, vector BLOB NOT NULL,'
+            ' size INTEGER NOT NULL, last_used REAL NOT NULL)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings(last_used)')
+        self._db.commit()
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\0{text}".encode('utf-8')).hexdigest()
+
+    def get_many(self, texts: list) -> list:
+        """Return cached vectors aligned with texts (None for misses)."""
+        from array import array
+        keys = [self.key(t) for t in texts]
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                part = keys[i:i + 500]
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(part))})",
+                    part).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._db.executemany('UPDATE embeddings SET last_used = ? WHERE key = ?',
+                                     [(now, k) for k in found])
+                self._db.commit()
+            self.hits += sum(1 for k in keys if k in found)
+            self.misses += sum(1 for k in keys if k not in found)
+        return [array('f', found[k]).tolist() if k in found else None for k in keys]
+
+    def put_many(self, texts: list, vectors: list):
+        from array import array
+        now = time.time()
+        rows = []
+        for text, vector in zip(texts, vectors):
+            blob = array('f', vector).tobytes()
+            rows.append((self.key(text), blob, len(blob) + 64, now))
+        with self._lock:
+            self._db.executemany(
+                'INSERT OR REPLACE INTO embeddings (key, vector, size, last_used) VALUES (?, ?, ?, ?)',
+                rows)
+            self._db.commit()
+
+    def prune(self, max_bytes: int, max_age_days: float) -> int:
+        """Evict entries unused for max_age_days, then least-recently-used
+        entries until the cache fits in max_bytes. Returns entries evicted."""
+        with self._lock:
+            evicted = self._db.execute('DELETE FROM embeddings WHERE last_used < ?',
+                                       (time.time() - max_age_days * 86400,)).rowcount
+            total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM embeddings').fetchone()[0]
+            if total > max_bytes:
+                excess = total - max_bytes
+                doomed = []
+                for key, size in self._db.execute('SELECT key, size FROM embeddings ORDER BY last_used'):
+                    if excess <= 0:
+                        break
+                    doomed.append((key,))
+                    excess -= size
+                self._db.executemany('DELETE FROM embeddings WHERE key = ?', doomed)
+                evicted += len(doomed)
+            self._db.commit()
+            if evicted:
+                self._db.execute('VACUUM')
+        return evicted
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, total = self._db.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM embeddings').fetchone()
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'entries': entries,
+            'size_mb': round(total / (1024 * 1024), 2),
+        }
+
+    def close(self):
+        self._db.close()
+
+
+def cached_embedder(embed, cache: Optional[EmbeddingCache]):
+    """Wrap embed(texts) -> vectors so cached vectors skip the API call."""
+    if cache is None:
+        return embed
+
+    def embed_batch(texts):
+        vectors = cache.get_many(texts)
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            fresh = embed([texts[i] for i in missing])
+            cache.put_many([texts[i] for i in missing], fresh)
+            for i, vector in zip(missing, fresh):
+                vectors[i] = vector
+        return vectors
+
+    return embed_batch
+
+
+# =============================================================================
+# Embedding Pipeline
+# =============================================================================
+
+def _is_rate_limit_error(exc: Exception) -> bool:
+    """True if an embeddings API error is a rate-limit (HTTP 429) response."""
+    if getattr(exc, 'status_code', None) == 429:
+        return True
+    return type(exc).__name__ == 'RateLimitError'
+
+
+def _retry_after_seconds(exc: Exception, attempt: int) -> float:
+    """Honor the server's Retry-After header, else exponential backoff."""
+    response = getattr(exc, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return max(0.1, float(headers.get('retry-after', '')))
+    except (TypeError, ValueError):
+        return min(2 ** attempt, 30)
+
+
+class AdaptiveLimiter:
+    """Batch size and concurrency for the embedding stage.
+
+    Both are halved on a rate-limit response and grow back one step after a
+    run of clean responses, so a run converges to what the account allows.
+    """
+
+    def __init__(self, max_jobs: int, max_batch: int):
+        self.max_jobs = max(1, max_jobs)
+        self.max_batch = max(1, max_batch)
+        self.jobs = self.max_jobs
+        self.batch_size = self.max_batch
+        self.rate_limited = 0
+        self._clean = 0
+        self._pause_until = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Sleep while a rate-limit backoff is in effect."""
+        delay = self._pause_until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def on_success(self):
+        with self._lock:
+            self._clean += 1
+            if self._clean >= 2 * self.jobs:
+                self._clean = 0
+                self.jobs = min(self.max_jobs, self.jobs + 1)
+                self.batch_size = min(self.max_batch, self.batch_size * 2)
+
+    def on_rate_limit(self, retry_after: float):
+        with self._lock:
+            self.rate_limited += 1
+            self._clean = 0
+            self.jobs = max(1, self.jobs // 2)
+            self.batch_size = max(8, self.batch_size // 2)
+            self._pause_until = max(self._pause_until, time.monotonic() + retry_after)
+
+
+def _embed_with_retry(embedder, texts: list, limiter: AdaptiveLimiter,
+                      max_attempts: int = 5) -> list:
+    """Embed one batch, backing off and retrying on rate limits."""
+    for attempt in range(max_attempts):
+        limiter.wait()
+        try:
+            vectors = embedder.embed(texts)
+        except Exception as e:
+            if _is_rate_limit_error(e) and attempt < max_attempts - 1:
+                limiter.on_rate_limit(_retry_after_seconds(e, attempt))
+                continue
+            raise
+        limiter.on_success()
+        return vectors
+
+
+def _process_pool(workers: int):
+    """Process pool safe to create while embedding threads are running."""
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+def _chunk_one(args: tuple) -> tuple:
+    """Read and chunk one file. Runs in chunking pool workers."""
+    filepath, chunk_size, chunk_overlap = args
+    try:
+        with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
+            content = f.read()
+        if not content.strip():
+            return filepath, [], None
+        return filepath, assign_chunk_ids(chunk_file(content, filepath, chunk_size, chunk_overlap)), None
+    except Exception as e:
+        return filepath, [], str(e)
+
+
+def _iter_chunked_files(files: list, chunk_size: int, chunk_overlap: int, jobs: int = 1):
+    """Yield (filepath, chunks, error) per file so embedding can start before chunking ends.
+
+    With jobs > 1 files are chunked in a process pool (each worker keeps its
+    own parser per language); at most 2*jobs files are in flight and files
+    are yielded in completion order.
+    """
+    tasks = ((filepath, chunk_size, chunk_overlap) for filepath in files)
+    if jobs <= 1 or len(files) < 2 * jobs:
+        yield from map(_chunk_one, tasks)
+    else:
+        yield from _bounded_pool_map(_chunk_one, tasks, jobs)
+
+
+def _bounded_pool_map(fn, tasks, jobs: int):
+    """Like pool.map, but submits lazily and yields in completion order."""
+    with _process_pool(jobs) as pool:
+        pending = set()
+        for task in tasks:
+            pending.add(pool.submit(fn, task))
+            if len(pending) >= 2 * jobs:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in as_completed(pending):
+            yield future.result()
+
+
+def _iter_batches(chunks, limiter: AdaptiveLimiter):
+    """Group a chunk stream into batches sized by the limiter's current batch size."""
+    batch = []
+    for chunk in chunks:
+        batch.append(chunk)
+        if len(batch) >= limiter.batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def run_embedding_pipeline(chunks, embed_batch, write_batch, limiter: AdaptiveLimiter,
+                           fail_batch=None) -> dict:
+    """Embed a chunk stream with a bounded pool of in-flight API calls.
+
+    The caller's thread pulls chunks (so chunking overlaps embedding) and runs
+    write_batch(batch, embeddings) as each call completes, so store writes
+    overlap the calls still in flight. At most limiter.jobs calls are pending.
+    Batches whose call fails are passed to fail_batch(batch) if given.
+    """
+    stats = {'chunks': 0, 'embedded': 0, 'failed': 0, 'batches': 0}
+    in_flight = {}
+
+    def drain(return_when):
+        done, _ = wait(in_flight, return_when=return_when)
+        for future in done:
+            batch = in_flight.pop(future)
+            try:
+                embeddings = future.result()
+            except Exception as e:
+                print(f"Embedding API error: {e}", file=sys.stderr)
+                stats['failed'] += len(batch)
+                if fail_batch is not None:
+                    fail_batch(batch)
+                continue
+            write_batch(batch, embeddings)
+            stats['embedded'] += len(batch)
+
+    with ThreadPoolExecutor(max_workers=limiter.max_jobs) as pool:
+        for batch in _iter_batches(chunks, limiter):
+            while len(in_flight) >= limiter.jobs:
+                drain(FIRST_COMPLETED)
+            stats['chunks'] += len(batch)
+            stats['batches'] += 1
+            in_flight[pool.submit(embed_batch, [c['content'] for c in batch])] = batch
+        while in_flight:
+            drain(FIRST_COMPLETED)
+
+    return stats
+
+
+def _chunk_metadata(chunk: dict) -> dict:
+    return {
+        'file': chunk['file'],
+        'type': chunk.get('type', 'code'),
+        'symbol': chunk.get('symbol', ''),
+        'start_line': chunk.get('start_line', 0),
+        'end_line': chunk.get('end_line', 0),
+    }
+
+
+def _existing_chunks(collection, files: list) -> dict:
+    """Map chunk ID -> metadata for every stored chunk of the given files."""
+    existing = {}
+    for i in range(0, len(files), 500):
+        part = files[i:i + 500]
+        where = {"file": part[0]} if len(part) == 1 else {"file": {"$in": part}}
+        try:
+            found = collection.get(where=where, include=['metadatas'])
+        except Exception as e:
+            print(f"Warning: chunk lookup failed: {e}", file=sys.stderr)
+            continue
+        existing.update(zip(found.get('ids') or [], found.get('metadatas') or []))
+    return existing
+
+
+class IndexProgress:
+    """Per-file commit tracking for a streaming index run.
+
+    A changed file's new hash is recorded only once every chunk it needs has
+    been stored; its stale chunks are deleted and moved chunks re-labelled at
+    the same point. checkpoint() flushes those store edits and then rewrites
+    the hash cache, so an interrupted run leaves unfinished files on their old
+    hash and the next run picks them up, skipping chunks already stored.
+    """
+
+    def __init__(self, collection, lexical, hash_file: str, committed: dict,
+                 existing: dict, deleted_files, interval: float = 2.0):
+        self.collection = collection
+        self.lexical = lexical
+        self.hash_file = hash_file
+        self.committed = committed
+        self.interval = interval
+        self.pending = {}    # file -> chunks not yet stored
+        self.files = {}      # file -> (new hash entry, stale ids, moved chunks)
+        self.failed = set()
+        self.stale_ids = []
+        self.moved = []
+        self.dropped = list(deleted_files)
+        self.counts = {'unchanged': 0, 'moved': 0, 'removed': 0}
+        self._last_checkpoint = time.monotonic()
+
+        self.existing_by_file = {}
+        for chunk_id, meta in existing.items():
+            self.existing_by_file.setdefault((meta or {}).get('file'), set()).add(chunk_id)
+        for filepath in self.dropped:
+            self.stale_ids.extend(self.existing_by_file.pop(filepath, ()))
+
+    def begin_file(self, filepath: str, hash_entry: dict, current_ids: set,
+                   new_count: int, unchanged_count: int, moved: list):
+        """Register a chunked file; it commits once new_count chunks are stored."""
+        stale = self.existing_by_file.pop(filepath, set()) - current_ids
+        self.counts['unchanged'] += unchanged_count
+        self.files[filepath] = (hash_entry, stale,
+                                [{k: v for k, v in c.items() if k != 'content'} for c in moved])
+        self.pending[filepath] = new_count
+        if not new_count:
+            self._complete(filepath)
+
+    def fail_file(self, filepath: str):
+        """Leave a file on its old hash so the next run retries it."""
+        self.failed.add(filepath)
+        self.pending.pop(filepath, None)
+        self.files.pop(filepath, None)
+
+    def stored(self, batch: list):
+        for chunk in batch:
+            filepath = chunk['file']
+            if filepath in self.pending:
+                self.pending[filepath] -= 1
+                if not self.pending[filepath]:
+                    self._complete(filepath)
+
+    def failed_batch(self, batch: list):
+        for filepath in {c['file'] for c in batch}:
+            self.fail_file(filepath)
+
+    def _complete(self, filepath: str):
+        del self.pending[filepath]
+        hash_entry, stale, moved = self.files.pop(filepath)
+        self.stale_ids.extend(stale)
+        self.moved.extend(moved)
+        self.committed[filepath] = hash_entry
+        self.counts['moved'] += len(moved)
+        if time.monotonic() - self._last_checkpoint >= self.interval:
+            self.checkpoint()
+
+    def checkpoint(self):
+        """Apply queued deletes/metadata updates, then persist the hash cache."""
+        for i in range(0, len(self.moved), 1000):
+            part = self.moved[i:i + 1000]
+            self.collection.update(ids=[c['id'] for c in part],
+                                   metadatas=[_chunk_metadata(c) for c in part])
+        self.lexical.update_metadata(self.moved)
+        for i in range(0, len(self.stale_ids), 1000):
+            self.collection.delete(ids=self.stale_ids[i:i + 1000])
+        self.lexical.delete(self.stale_ids)
+        self.counts['removed'] += len(self.stale_ids)
+        self.moved, self.stale_ids = [], []
+
+        for filepath in self.dropped:
+            self.committed.pop(filepath, None)
+        self.dropped = []
+        if self.hash_file:
+            save_hash_cache(self.hash_file, self.committed)
+        self._last_checkpoint = time.monotonic()
+
+
 # =============================================================================
 # Index Command
 # =============================================================================
 
-def cmd_index():
+def cmd_index(jobs: Optional[int] = None):
     """Build or incrementally update the vector index."""
     index_dir = os.environ.get('RAG_INDEX_DIR', '')
     file_list_path = os.environ.get('RAG_FILE_LIST', '')
@@ -259,6 +1069,12 @@ def cmd_index():
     chunk_size = int(os.environ.get('RAG_CHUNK_SIZE', '500'))
     chunk_overlap = int(os.environ.get('RAG_CHUNK_OVERLAP', '50'))
     force_reindex = os.environ.get('RAG_FORCE_REINDEX', 'false').lower() == 'true'
+    embed_jobs = jobs or int(os.environ.get('RAG_EMBED_JOBS', '4'))
+    embed_batch_size = int(os.environ.get('RAG_EMBED_BATCH_SIZE', '100'))
+    embed_cache_enabled = os.environ.get('RAG_EMBED_CACHE', 'true').lower() == 'true'
+    embed_cache_max_mb = float(os.environ.get('RAG_EMBED_CACHE_MAX_MB', '200'))
+    embed_cache_ttl_days = float(os.environ.get('RAG_EMBED_CACHE_TTL_DAYS', '30'))
+    chunk_jobs = int(os.environ.get('RAG_CHUNK_JOBS', '0')) or os.cpu_count() or 1
 
     if not index_dir or not file_list_path:
         print("Error: RAG_INDEX_DIR and RAG_FILE_LIST required", file=sys.stderr)
@@ -272,17 +1088,45 @@ def cmd_index():
         print("No files to index", file=sys.stderr)
         return
 
+    # Vectors from different models can't share a collection
+    index_meta = load_index_meta(index_dir)
+    model_changed = index_meta.get('embedding_model', embedding_model) != embedding_model
+    if model_changed:
+        print(f"Embedding model changed ({index_meta['embedding_model']} -> {embedding_model}); "
+              f"rebuilding index")
+        force_reindex = True
+    elif index_meta.get('chunk_schema', 1) < CHUNK_SCHEMA and \
+            os.path.exists(os.path.join(index_dir, 'chroma.db')):
+        print("Chunk metadata format changed; re-storing all chunks once")
+        force_reindex = True
+
     # Load hash cache for incremental indexing
     prev_hashes = {} if force_reindex else load_hash_cache(hash_file)
     new_hashes = {}
 
+    # Files whose (size, mtime_ns, inode) match the last run keep their hash;
+    # only the rest are re-hashed (in parallel)
+    to_hash = []
+    for filepath in files:
+        sig = file_signature(filepath)
+        prev = prev_hashes.get(filepath, {})
+        if sig and prev.get('hash') and all(prev.get(k) == v for k, v in sig.items()):
+            new_hashes[filepath] = prev
+        elif sig:
+            to_hash.append((filepath, sig))
+        else:
+            new_hashes[filepath] = {'hash': ''}
+    with ThreadPoolExecutor(max_workers=chunk_jobs) as pool:
+        for (filepath, sig), file_hash in zip(to_hash, pool.map(compute_file_hash,
+                                                               [f for f, _ in to_hash])):
+            new_hashes[filepath] = dict(sig, hash=file_hash)
+
     # Determine which files changed
     changed_files = []
     unchanged_files = []
     for filepath in files:
-        file_hash = compute_file_hash(filepath)
-        new_hashes[filepath] = file_hash
-        if file_hash and file_hash != prev_hashes.get(filepath, ''):
+        file_hash = new_hashes[filepath]['hash']
+        if file_hash and file_hash != prev_hashes.get(filepath, {}).get('hash', ''):
             changed_files.append(filepath)
         else:
             unchanged_files.append(filepath)
@@ -290,202 +1134,917 @@ def cmd_index():
     # Detect deleted files
     deleted_files = set(prev_hashes.keys()) - set(new_hashes.keys())
 
-    if not changed_files and not deleted_files:
+    db_path = os.path.join(index_dir, 'chroma.db')
+    lexical_path = os.path.join(index_dir, 'lexical.sqlite')
+    needs_backfill = not os.path.exists(lexical_path) and os.path.exists(db_path) and not force_reindex
+
+    if not changed_files and not deleted_files and not needs_backfill:
         print(f"No changes detected. Index up-to-date ({len(files)} files).")
+        if to_hash and hash_file:
+            save_hash_cache(hash_file, new_hashes)  # refresh stat signatures
         return
 
     print(f"Indexing: {len(changed_files)} changed, {len(deleted_files)} deleted, {len(unchanged_files)} unchanged")
 
     # Initialize ChromaDB
     import chromadb
-    db_path = os.path.join(index_dir, 'chroma.db')
     chroma = chromadb.PersistentClient(path=db_path)
+    if model_changed:
+        try:
+            chroma.delete_collection('codebase')
+        except Exception:
+            pass
+        if os.path.exists(lexical_path):
+            os.remove(lexical_path)
+    save_index_meta(index_dir, dict(index_meta, embedding_model=embedding_model,
+                                     chunk_schema=CHUNK_SCHEMA))
     collection = chroma.get_or_create_collection(
         name="codebase",
         metadata={"hnsw:space": "cosine"}
     )
 
-    # Delete chunks from deleted/changed files
-    files_to_remove = list(deleted_files) + changed_files
-    if files_to_remove:
-        # ChromaDB where filter for file metadata
-        for filepath in files_to_remove:
+    # BM25 index kept in step with the collection
+    lexical = LexicalIndex(lexical_path)
+    if needs_backfill:
+        _backfill_lexical(collection, lexical)
+        print(f"Lexical index built from {lexical.count()} existing chunks")
+
+    # One lookup of the chunk IDs currently stored for changed/deleted files
+    existing = _existing_chunks(collection, list(deleted_files) + changed_files)
+
+    # Chunk, embed and store as one pipeline
+    embedder = get_embedder(embedding_model)
+    limiter = AdaptiveLimiter(embed_jobs, embed_batch_size)
+
+    cache = None
+    if embed_cache_enabled:
+        cache = EmbeddingCache(os.path.join(index_dir, 'embedding-cache.sqlite'), embedding_model)
+
+    embed_batch = cached_embedder(
+        lambda texts: _embed_with_retry(embedder, texts, limiter), cache)
+
+    # Files already up to date are committed as-is; changed files keep their
+    # old hash until all of their chunks are stored
+    committed = dict(prev_hashes)
+    committed.update((filepath, new_hashes[filepath]) for filepath in unchanged_files)
+    progress = IndexProgress(collection, lexical, hash_file, committed, existing, deleted_files)
+
+    # --force re-embeds everything; stale chunks are still removed by ID diff
+    stored_chunks = {} if force_reindex else existing
+
+    def new_chunks():
+        """Pass through only chunks whose ID is not already stored."""
+        for filepath, chunks, error in _iter_chunked_files(changed_files, chunk_size,
+                                                           chunk_overlap, chunk_jobs):
+            if error:
+                print(f"Warning: {filepath}: {error}", file=sys.stderr)
+                progress.fail_file(filepath)
+                continue
+            fresh, moved = [], []
+            for chunk in chunks:
+                stored = stored_chunks.get(chunk['id'])
+                if stored is None:
+                    fresh.append(chunk)
+                elif (stored.get('start_line'), stored.get('end_line')) != \
+                        (chunk.get('start_line', 0), chunk.get('end_line', 0)):
+                    moved.append(chunk)
+            progress.begin_file(filepath, new_hashes[filepath], {c['id'] for c in chunks},
+                                len(fresh), len(chunks) - len(fresh), moved)
+            yield from fresh
+
+    def write_batch(batch, embeddings):
+        collection.upsert(
+            ids=[c['id'] for c in batch],
+            embeddings=embeddings,
+            documents=[c['content'] for c in batch],
+            metadatas=[_chunk_metadata(c) for c in batch]
+        )
+        lexical.add(batch)
+        progress.stored(batch)
+
+    started = time.monotonic()
+    try:
+        stats = run_embedding_pipeline(new_chunks(), embed_batch, write_batch, limiter,
+                                       fail_batch=progress.failed_batch)
+    finally:
+        # Also runs on interrupt: whatever finished is kept for the next run
+        progress.checkpoint()
+        lexical.close()
+    elapsed = max(time.monotonic() - started, 1e-6)
+
+    if cache is not None:
+        evicted = cache.prune(int(embed_cache_max_mb * 1024 * 1024), embed_cache_ttl_days)
+        cache_stats = cache.stats()
+        cache.close()
+        print(f"Embedding cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+              f"({cache_stats['hit_rate']:.0%} hit rate), {cache_stats['entries']} entries, "
+              f"{cache_stats['size_mb']} MB, {evicted} evicted")
+
+    counts = progress.counts
+    print(f"Chunks: {stats['chunks']} new, {counts['unchanged']} unchanged "
+          f"({counts['moved']} moved), {counts['removed']} removed across {len(changed_files)} changed files")
+    if progress.failed:
+        print(f"Warning: {len(progress.failed)} files not fully indexed; "
+              f"they will be retried on the next run", file=sys.stderr)
+
+    if stats['chunks']:
+        print(f"Indexed {stats['embedded']} chunks to {db_path} in {elapsed:.1f}s "
+              f"({stats['embedded'] / elapsed:.1f} chunks/s, jobs={embed_jobs}, "
+              f"rate-limited={limiter.rate_limited})")
+
+
+# =============================================================================
+# Stub Embedding Server (throughput testing)
+# =============================================================================
+
+def cmd_stub_server(argv: list):
+    """Serve a local OpenAI-compatible /v1/embeddings endpoint.
+
+    Vectors are deterministic hashes of the input text. Point the indexer at
+    it with OPENAI_BASE_URL=http://127.0.0.1:<port>/v1 to measure how index
+    throughput scales with --jobs without spending API credits.
+    """
+    import argparse
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    parser = argparse.ArgumentParser(prog='rag-engine.py stub-server')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=200.0,
+                        help='Simulated per-request latency')
+    parser.add_argument('--dims', type=int, default=256)
+    parser.add_argument('--max-concurrent', type=int, default=0,
+                        help='Answer 429 above this many concurrent requests (0 = unlimited)')
+    args = parser.parse_args(argv)
+
+    active = [0]
+    lock = threading.Lock()
+
+    def vector(text):
+        seed = hashlib.sha256(text.encode('utf-8')).digest()
+        return [(seed[i % len(seed)] - 128) / 128.0 for i in range(args.dims)]
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status, body, headers=None):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            if not self.path.rstrip('/').endswith('/embeddings'):
+                self._reply(404, {'error': {'message': 'not found'}})
+                return
+            payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            with lock:
+                over_limit = args.max_concurrent and active[0] >= args.max_concurrent
+                if not over_limit:
+                    active[0] += 1
+            if over_limit:
+                self._reply(429, {'error': {'message': 'rate limited', 'type': 'rate_limit_error'}},
+                            {'Retry-After': '0.5'})
+                return
             try:
-                existing = collection.get(where={"file": filepath})
-                if existing and existing['ids']:
-                    collection.delete(ids=existing['ids'])
-            except Exception:
-                pass
-
-    # Chunk changed files
-    all_chunks = []
-    for filepath in changed_files:
+                texts = payload.get('input', [])
+                if isinstance(texts, str):
+                    texts = [texts]
+                time.sleep(args.latency_ms / 1000.0)
+                tokens = sum(len(t) // 4 for t in texts)
+                self._reply(200, {
+                    'object': 'list',
+                    'model': payload.get('model', ''),
+                    'data': [{'object': 'embedding', 'index': i, 'embedding': vector(t)}
+                             for i, t in enumerate(texts)],
+                    'usage': {'prompt_tokens': tokens, 'total_tokens': tokens},
+                })
+            finally:
+                with lock:
+                    active[0] -= 1
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), Handler)
+    print(f"Stub embedding server on http://127.0.0.1:{server.server_port}/v1", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+# =============================================================================
+# Embedder Benchmark
+# =============================================================================
+
+_BENCH_EXTENSIONS = {
+    'javascript': '.js', 'typescript': '.ts', 'python': '.py', 'java': '.java',
+    'kotlin': '.kt', 'go': '.go', 'rust': '.rs', 'ruby': '.rb', 'php': '.php',
+    'c': '.c', 'cpp': '.cpp', 'csharp': '.cs', 'swift': '.swift',
+}
+
+
+def _benchmark_corpus(bench_dir: str, chunk_size: int):
+    """Chunks and labelled queries from config/benchmarks fixtures.
+
+    Each ground-truth item becomes a query (type, location and expected
+    keywords); a hit is any top-k chunk from that item's fixture.
+    """
+    import glob
+    chunks, queries = [], []
+    for path in sorted(glob.glob(os.path.join(bench_dir, '*.json'))):
         try:
-            with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-            if not content.strip():
+            with open(path, 'r') as f:
+                fixture = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            continue
+        code = fixture.get('code') or fixture.get('source_code') or fixture.get('content')
+        if not isinstance(code, str) or not code.strip():
+            continue
+        ext = _BENCH_EXTENSIONS.get(fixture.get('language', ''), '.txt')
+        source = f"{fixture.get('id', Path(path).stem)}{ext}"
+        chunks.extend(assign_chunk_ids(chunk_file(code, source, chunk_size)))
+        truth = fixture.get('ground_truth', [])
+        for item in truth if isinstance(truth, list) else []:
+            if not isinstance(item, dict):
                 continue
-            chunks = chunk_file(content, filepath, chunk_size, chunk_overlap)
-            all_chunks.extend(chunks)
+            text = ' '.join([str(item.get('type', '')).replace('_', ' '),
+                             str(item.get('location', ''))] +
+                            [str(k) for k in item.get('description_contains', [])[:3]]).strip()
+            if text:
+                queries.append((text, source))
+    return chunks, queries
+
+
+def _cosine_rank(query_vector: list, vectors: list) -> list:
+    """Indices of vectors sorted by cosine similarity to query_vector."""
+    import math
+    qn = math.sqrt(sum(v * v for v in query_vector)) or 1.0
+    scores = []
+    for i, vector in enumerate(vectors):
+        vn = math.sqrt(sum(v * v for v in vector)) or 1.0
+        scores.append((sum(a * b for a, b in zip(query_vector, vector)) / (qn * vn), i))
+    scores.sort(key=lambda item: -item[0])
+    return [i for _, i in scores]
+
+
+def cmd_bench(argv: list):
+    """Compare embedders on recall@k and throughput over the benchmark fixtures."""
+    import argparse
+    parser = argparse.ArgumentParser(prog='rag-engine.py bench')
+    parser.add_argument('--models', default='local:hashing,text-embedding-3-small',
+                        help='Comma-separated RAG_EMBEDDING_MODEL values to compare')
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--chunk-size', type=int, default=120)
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='Embed the corpus this many times for the throughput figure')
+    parser.add_argument('--bench-dir', default=str(Path(__file__).resolve().parent.parent / 'config' / 'benchmarks'))
+    args = parser.parse_args(argv)
+
+    chunks, queries = _benchmark_corpus(args.bench_dir, args.chunk_size)
+    if not chunks or not queries:
+        print(f"No benchmark fixtures with code found in {args.bench_dir}", file=sys.stderr)
+        sys.exit(1)
+    texts = [c['content'] for c in chunks]
+
+    for model in [m.strip() for m in args.models.split(',') if m.strip()]:
+        try:
+            embedder = get_embedder(model)
+            started = time.monotonic()
+            for _ in range(max(1, args.repeat)):
+                vectors = []
+                for i in range(0, len(texts), 100):
+                    vectors.extend(embedder.embed(texts[i:i + 100]))
+            elapsed = max(time.monotonic() - started, 1e-6)
+            query_vectors = embedder.embed([q for q, _ in queries])
         except Exception as e:
-            print(f"Warning: {filepath}: {e}", file=sys.stderr)
+            print(json.dumps({'model': model, 'error': str(e)[:300]}))
+            continue
 
-    if not all_chunks:
-        print("No chunks generated from changed files.")
-        save_hash_cache(hash_file, new_hashes)
-        return
+        hits, reciprocal = 0, 0.0
+        for query_vector, (_, source) in zip(query_vectors, queries):
+            ranking = _cosine_rank(query_vector, vectors)
+            for rank, i in enumerate(ranking[:args.k]):
+                if chunks[i]['file'] == source:
+                    hits += 1
+                    reciprocal += 1.0 / (rank + 1)
+                    break
+
+        print(json.dumps({
+            'model': model,
+            'chunks': len(chunks),
+            'queries': len(queries),
+            f'recall@{args.k}': round(hits / len(queries), 4),
+            f'mrr@{args.k}': round(reciprocal / len(queries), 4),
+            'embed_texts_per_sec': round(len(texts) * max(1, args.repeat) / elapsed, 1),
+        }))
 
-    print(f"Created {len(all_chunks)} chunks from {len(changed_files)} files")
 
-    # Batch embed and store
-    from openai import OpenAI
-    client = OpenAI()
+# =============================================================================
+# Retrieve Command
+# =============================================================================
+
+def _open_collection(db_path: str, fresh: bool = False):
+    """Open the codebase collection, or None if the index is missing.
 
-    BATCH_SIZE = 100
-    total_embedded = 0
-    chunk_id_base = int(hashlib.sha256(str(len(all_chunks)).encode()).hexdigest()[:8], 16)
+    fresh=True drops chromadb's per-process client cache first so a
+    long-lived process sees writes made by a later `index` run.
+    """
+    import chromadb
+    if fresh:
+        try:
+            from chromadb.api.client import SharedSystemClient
+            SharedSystemClient.clear_system_cache()
+        except Exception:
+            pass
+    chroma = chromadb.PersistentClient(path=db_path)
+    try:
+        return chroma.get_collection('codebase')
+    except Exception:
+        return None
+
+
+def _format_result(doc: str, meta: dict, score: float) -> dict:
+    return {
+        'file': meta.get('file', ''),
+        'content': doc,
+        'start_line': meta.get('start_line', 0),
+        'end_line': meta.get('end_line', 0),
+        'type': meta.get('type', 'code'),
+        'symbol': meta.get('symbol', ''),
+        'score': round(score, 4),
+    }
 
-    for i in range(0, len(all_chunks), BATCH_SIZE):
-        batch = all_chunks[i:i + BATCH_SIZE]
-        texts = [c['content'] for c in batch]
 
+def _keyword_rerank(candidates: list, augmented_query: str, top_k: int) -> list:
+    """Legacy rerank for indexes without a lexical index: boost candidates
+    that contain query terms."""
+    query_terms = set(augmented_query.lower().split())
+    scored = []
+    for candidate in candidates:
+        doc_lower = candidate['content'].lower()
+        keyword_hits = sum(1 for term in query_terms if term in doc_lower)
+        # Combined score: lower distance is better, more keyword hits is better
+        scored.append((candidate['score'] + keyword_hits * 0.1, candidate))
+    scored.sort(key=lambda x: -x[0])
+    return [c for _, c in scored[:top_k]]
+
+
+def fuse_rankings(rankings: list, top_k: int, k: int = 60) -> list:
+    """Reciprocal rank fusion of several ranked result lists (matched by id).
+
+    The fused score is normalized so a chunk ranked first everywhere scores 1.
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, result in enumerate(ranking):
+            entry = fused.setdefault(result['id'], [0.0, result])
+            entry[0] += 1.0 / (k + rank + 1)
+    best = sorted(fused.values(), key=lambda item: -item[0])[:top_k]
+    ceiling = len(rankings) / (k + 1)
+    results = []
+    for score, result in best:
+        result = {key: value for key, value in result.items() if key not in ('id', 'bm25')}
+        result['score'] = round(score / ceiling, 4)
+        results.append(result)
+    return results
+
+
+# Identifiers too generic to point at a definition worth retrieving
+_NOT_SYMBOLS = frozenset(
+    'and array async await bool boolean break case catch char class const continue def '
+    'default defer del delete double elif else enum err error except export extends false '
+    'final finally float for from func function global import impl int interface len let '
+    'lambda long map new nil none not null object pass print private protected pub public '
+    'raise return self static str string struct super switch this throw true try type '
+    'undefined use var void while with yield'.split())
+
+
+def load_changed_ranges(spec: str) -> dict:
+    """Parse RAG_CHANGED_RANGES: JSON {file: [[start, end], ...]}.
+
+    An empty range list stands for the whole file.
+    """
+    if not spec:
+        return {}
+    try:
+        data = json.loads(spec)
+        return {os.path.normpath(path): [[int(start), int(end)] for start, end in ranges or []]
+                for path, ranges in data.items()}
+    except (ValueError, TypeError, AttributeError) as e:
+        print(f"Warning: ignoring invalid RAG_CHANGED_RANGES: {e}", file=sys.stderr)
+        return {}
+
+
+def changed_symbols(changed: dict, limit: int = 64) -> list:
+    """Identifiers referenced by the changed lines, most frequent first."""
+    from collections import Counter
+    counts = Counter()
+    for path, ranges in changed.items():
         try:
-            response = client.embeddings.create(
-                model=embedding_model,
-                input=texts
-            )
-        except Exception as e:
-            print(f"Embedding API error: {e}", file=sys.stderr)
+            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                lines = f.read().split('\n')
+        except OSError:
             continue
+        for start, end in ranges or [[1, len(lines)]]:
+            for line in lines[max(start - 1, 0):end]:
+                counts.update(ident for ident in _IDENT_RE.findall(line)
+                              if len(ident) > 2 and not ident.isdigit()
+                              and ident.lower() not in _NOT_SYMBOLS)
+    return [name for name, _ in counts.most_common(limit)]
+
+
+def _same_file(a: str, b: str) -> bool:
+    """Path equality that tolerates one side being relative to the project root."""
+    if not a or not b:
+        return False
+    a, b = os.path.normpath(a), os.path.normpath(b)
+    return a == b or a.endswith(os.sep + b) or b.endswith(os.sep + a)
+
+
+def overlaps_changed(result: dict, changed: dict) -> bool:
+    """True if a chunk lies in a changed file and touches a changed line range."""
+    for path, ranges in changed.items():
+        if not _same_file(result.get('file', ''), path):
+            continue
+        if not ranges:
+            return True
+        start, end = result.get('start_line', 0), result.get('end_line', 0)
+        if any(lo <= end and start <= hi for lo, hi in ranges):
+            return True
+    return False
+
+
+def _rank_query(candidates: Optional[list], text: str, spec: dict,
+                lexical: Optional[LexicalIndex], fetch_k: int) -> list:
+    """Turn one query's candidates into its final top_k results.
+
+    Chunks overlapping spec['changed'] are dropped (the reviewer already has
+    them). With rerank the BM25 ranking is fused in, and chunks defining any
+    of spec['symbols'] form one more ranking, which boosts definitions the
+    change refers to. candidates=None means BM25-only retrieval.
+    """
+    top_k = int(spec.get('top_k', 5))
+    changed = spec.get('changed') or {}
+
+    def outside_change(results):
+        return [r for r in results if not overlaps_changed(r, changed)] if changed else results
+
+    rankings = [outside_change(candidates)] if candidates is not None else []
+    if lexical is not None and (candidates is None or spec.get('rerank')):
+        rankings.append(outside_change(lexical.search(text, fetch_k)))
+    if lexical is not None and spec.get('symbols'):
+        definitions = outside_change(lexical.defining(spec['symbols'], fetch_k))
+        if definitions:
+            rankings.append(definitions)
+    if candidates is None or len(rankings) > 1:
+        return fuse_rankings(rankings, top_k)
+
+    candidates = rankings[0]
+    if spec.get('rerank') and len(candidates) > top_k:
+        candidates = _keyword_rerank(candidates, text, top_k)
+    return [{key: value for key, value in c.items() if key != 'id'}
+            for c in candidates[:top_k]]
+
+
+def _fetch_count(spec: dict, rerank_factor: int = 3) -> int:
+    """Candidates to fetch for a query: extra for rerank and for exclusions."""
+    widen = spec.get('rerank') or spec.get('changed')
+    return int(spec.get('top_k', 5)) * (rerank_factor if widen else 1)
+
+
+def retrieve_many(collection, query_embeddings: list, augmented_queries: list,
+                  specs: list, lexical: Optional[LexicalIndex] = None) -> list:
+    """Answer several queries with a single collection.query call.
+
+    specs[i] holds top_k/rerank (and optionally changed/symbols, see
+    _rank_query) for query i. Every query fetches the largest candidate
+    count any of them needs; each is then trimmed to its own top_k. With
+    rerank, vector and BM25 rankings are fused when a lexical index is
+    available (keyword rerank otherwise). Returns one result list per query.
+    """
+    if not query_embeddings:
+        return []
+    fetch_k = max(_fetch_count(spec) for spec in specs)
 
-        embeddings = [e.embedding for e in response.data]
-        ids = [f"chunk_{chunk_id_base + i + j}" for j in range(len(batch))]
-        metadatas = [{
-            'file': c['file'],
-            'type': c.get('type', 'code'),
-            'start_line': c.get('start_line', 0),
-            'end_line': c.get('end_line', 0),
-        } for c in batch]
-
-        collection.add(
-            ids=ids,
-            embeddings=embeddings,
-            documents=texts,
-            metadatas=metadatas
+    try:
+        results = collection.query(
+            query_embeddings=query_embeddings,
+            n_results=min(fetch_k, collection.count())
         )
-        total_embedded += len(batch)
+    except Exception:
+        return [[] for _ in query_embeddings]
 
-    print(f"Indexed {total_embedded} chunks to {db_path}")
+    if not results or not results.get('documents'):
+        return [[] for _ in query_embeddings]
 
-    # Save updated hashes
-    save_hash_cache(hash_file, new_hashes)
+    ranked = []
+    for i, (text, spec) in enumerate(zip(augmented_queries, specs)):
+        docs = results['documents'][i] or []
+        metas = results['metadatas'][i] or []
+        ids = results['ids'][i] if results.get('ids') else [str(j) for j in range(len(docs))]
+        distances = results['distances'][i] if results.get('distances') else [0.0] * len(docs)
+        # Convert distance to similarity
+        candidates = [dict(_format_result(doc, meta, 1.0 - dist), id=chunk_id)
+                      for chunk_id, doc, meta, dist in zip(ids, docs, metas, distances)]
+        ranked.append(_rank_query(candidates, text, spec, lexical, fetch_k))
+    return ranked
 
 
-# =============================================================================
-# Retrieve Command
-# =============================================================================
+def retrieve_lexical(lexical: LexicalIndex, augmented_queries: list, specs: list) -> list:
+    """Offline retrieval from the BM25 index alone (no embeddings, no chromadb)."""
+    return [_rank_query(None, text, spec, lexical, _fetch_count(spec))
+            for text, spec in zip(augmented_queries, specs)]
+
+
+def retrieve_chunks(collection, query_embedding: list, augmented_query: str,
+                    top_k: int, rerank: bool, lexical: Optional[LexicalIndex] = None) -> list:
+    """Run one vector query and return result dicts ready for JSONL output."""
+    return retrieve_many(collection, [query_embedding], [augmented_query],
+                         [{'top_k': top_k, 'rerank': rerank}], lexical)[0]
+
+
+def run_queries(index_dir: str, embedding_model: str, queries: list, mode: str = 'auto') -> list:
+    """Answer queries ({query, top_k, rerank}) with the best available path.
+
+    Order: a running retrieve daemon, then an in-process vector (or hybrid)
+    query. mode='lexical' uses only the BM25 index, and any mode falls back to
+    it when the embeddings API is unreachable. Returns one result list per query.
+    """
+    texts = [q['query'] for q in queries]
+    lexical = _open_lexical(index_dir)
+    # Queries must be embedded with the model the index was built with
+    embedding_model = load_index_meta(index_dir).get('embedding_model', embedding_model)
+
+    if mode == 'lexical':
+        return retrieve_lexical(lexical, texts, queries) if lexical else []
+
+    # A running retrieve daemon answers without importing chromadb/openai
+    reply = daemon_request(index_dir, {'model': embedding_model, 'queries': queries})
+    if reply is not None and 'results' in reply:
+        return reply['results']
+
+    db_path = os.path.join(index_dir, 'chroma.db')
+    collection = _open_collection(db_path) if os.path.exists(db_path) else None
+    if collection is None:
+        return retrieve_lexical(lexical, texts, queries) if lexical else []
+
+    try:
+        vectors = get_embedder(embedding_model).embed(texts)
+    except Exception as e:
+        print(f"Embedding API error: {e}", file=sys.stderr)
+        if lexical is None:
+            return []
+        print("Falling back to lexical retrieval", file=sys.stderr)
+        return retrieve_lexical(lexical, texts, queries)
+
+    return retrieve_many(collection, vectors, texts, queries, lexical)
+
+
+def _diff_context() -> dict:
+    """Query fields for diff-aware retrieval, from RAG_CHANGED_RANGES."""
+    changed = load_changed_ranges(os.environ.get('RAG_CHANGED_RANGES', ''))
+    if not changed:
+        return {}
+    return {'changed': changed, 'symbols': changed_symbols(changed)}
+
 
 def cmd_retrieve():
-    """Query the vector index for relevant code chunks."""
+    """Query the vector index for relevant code chunks.
+
+    With RAG_CHANGED_RANGES set, chunks overlapping the changed lines are
+    left out and definitions of symbols those lines reference are boosted.
+    """
     index_dir = os.environ.get('RAG_INDEX_DIR', '')
     query = os.environ.get('RAG_QUERY', '')
     role_keywords = os.environ.get('RAG_ROLE_KEYWORDS', '')
     top_k = int(os.environ.get('RAG_TOP_K', '5'))
     rerank = os.environ.get('RAG_RERANK', 'false').lower() == 'true'
     embedding_model = os.environ.get('RAG_EMBEDDING_MODEL', 'text-embedding-3-small')
+    mode = os.environ.get('RAG_RETRIEVE_MODE', 'auto')
 
-    if not index_dir or not query:
-        return
-
-    db_path = os.path.join(index_dir, 'chroma.db')
-    if not os.path.exists(db_path):
+    if not index_dir or not query or not os.path.isdir(index_dir):
         return
 
     # Augment query with role keywords
     augmented_query = f"{query} {role_keywords}".strip()
 
-    # Initialize ChromaDB
-    import chromadb
-    chroma = chromadb.PersistentClient(path=db_path)
+    results = run_queries(index_dir, embedding_model,
+                          [dict(_diff_context(), query=augmented_query, top_k=top_k, rerank=rerank)],
+                          mode)
+
+    # Output as JSONL
+    for result in (results[0] if results else []):
+        print(json.dumps(result, ensure_ascii=False))
 
-    try:
-        collection = chroma.get_collection('codebase')
-    except Exception:
-        return
 
-    # Get query embedding
-    from openai import OpenAI
-    client = OpenAI()
+def cmd_retrieve_batch():
+    """Answer many role queries with one embedding call and one index query.
 
+    Reads JSONL from stdin (or RAG_BATCH_FILE), one {role, query, keywords,
+    top_k, rerank} per line; top_k/rerank default to RAG_TOP_K/RAG_RERANK.
+    RAG_CHANGED_RANGES applies to every role, as in cmd_retrieve.
+    Writes one {"role": ..., "results": [...]} line per input line.
+    """
+    index_dir = os.environ.get('RAG_INDEX_DIR', '')
+    batch_file = os.environ.get('RAG_BATCH_FILE', '')
+    default_top_k = int(os.environ.get('RAG_TOP_K', '5'))
+    default_rerank = os.environ.get('RAG_RERANK', 'false').lower() == 'true'
+    embedding_model = os.environ.get('RAG_EMBEDDING_MODEL', 'text-embedding-3-small')
+    mode = os.environ.get('RAG_RETRIEVE_MODE', 'auto')
+
+    source = open(batch_file, 'r') if batch_file else sys.stdin
     try:
-        resp = client.embeddings.create(model=embedding_model, input=[augmented_query])
-        query_embedding = resp.data[0].embedding
-    except Exception as e:
-        print(f"Embedding API error: {e}", file=sys.stderr)
+        entries = []
+        for line in source:
+            if not line.strip():
+                continue
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                print(f"Warning: skipping invalid batch line: {line.strip()[:80]}", file=sys.stderr)
+    finally:
+        if batch_file:
+            source.close()
+
+    diff = _diff_context()
+    queries = [{
+        **diff,
+        'role': e.get('role', ''),
+        'query': f"{e.get('query', '')} {e.get('keywords', '')}".strip(),
+        'top_k': int(e.get('top_k') or default_top_k),
+        'rerank': bool(e.get('rerank', default_rerank)),
+    } for e in entries]
+    queries = [q for q in queries if q['query']]
+
+    if not index_dir or not queries or not os.path.isdir(index_dir):
         return
 
-    # Retrieve more candidates if reranking
-    fetch_k = top_k * 3 if rerank else top_k
+    results = run_queries(index_dir, embedding_model, queries, mode)
+
+    for q, role_results in zip(queries, results):
+        print(json.dumps({'role': q['role'], 'results': role_results}, ensure_ascii=False))
+
+
+# =============================================================================
+# Retrieve Daemon
+# =============================================================================
 
+def daemon_socket_path(index_dir: str) -> str:
+    """Unix socket of the retrieve daemon for an index (short path if needed)."""
+    path = os.path.join(index_dir, 'retrieve.sock')
+    if len(path) < 100:
+        return path
+    import tempfile
+    digest = hashlib.sha256(os.path.abspath(index_dir).encode()).hexdigest()[:16]
+    return os.path.join(tempfile.gettempdir(), f"ai-review-arena-rag-{digest}.sock")
+
+
+def daemon_request(index_dir: str, request: dict, timeout: float = 30.0) -> Optional[dict]:
+    """Send one JSON-lines request to a running daemon; None if none is running."""
+    import socket
+    path = daemon_socket_path(index_dir)
+    if not os.path.exists(path):
+        return None
     try:
-        results = collection.query(
-            query_embeddings=[query_embedding],
-            n_results=min(fetch_k, collection.count())
-        )
-    except Exception:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(0.5)
+            sock.connect(path)
+            sock.settimeout(timeout)
+            sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+            with sock.makefile('rb') as reader:
+                line = reader.readline()
+        return json.loads(line) if line else None
+    except (OSError, ValueError):
+        return None
+
+
+class QueryEmbeddingLRU:
+    """LRU of query embeddings keyed on (model, augmented_query)."""
+
+    def __init__(self, capacity: int):
+        from collections import OrderedDict
+        self.capacity = max(1, capacity)
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, model: str, text: str):
+        vector = self._entries.get((model, text))
+        if vector is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end((model, text))
+        self.hits += 1
+        return vector
+
+    def put(self, model: str, text: str, vector: list):
+        self._entries[(model, text)] = vector
+        self._entries.move_to_end((model, text))
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+
+class RetrieveService:
+    """Keeps the collection, embedding client and query-embedding LRU warm."""
+
+    def __init__(self, index_dir: str, default_model: str, cache_size: int):
+        self.db_path = os.path.join(index_dir, 'chroma.db')
+        self.default_model = default_model
+        self.lru = QueryEmbeddingLRU(cache_size)
+        self.lexical_path = os.path.join(index_dir, 'lexical.sqlite')
+        self.index_dir = index_dir
+        self.lock = threading.Lock()
+        self._embedders = {}
+        self._collection = None
+        self._lexical = None
+        self._lexical_signature = None
+        self._index_mtime = None
+
+    def _index_changed(self) -> bool:
+        try:
+            mtime = max(entry.stat().st_mtime_ns for entry in os.scandir(self.db_path))
+        except (OSError, ValueError):
+            mtime = None
+        changed = mtime != self._index_mtime
+        self._index_mtime = mtime
+        return changed
+
+    def collection(self):
+        if self._index_changed() or self._collection is None:
+            self._collection = _open_collection(self.db_path, fresh=True)
+        return self._collection
+
+    def lexical(self) -> Optional[LexicalIndex]:
+        """The BM25 index, reopened when an `index` run replaced or rewrote it."""
+        try:
+            st = os.stat(self.lexical_path)
+            signature = (st.st_ino, st.st_mtime_ns)
+        except OSError:
+            signature = None
+        if signature != self._lexical_signature:
+            if self._lexical is not None:
+                self._lexical.close()
+            self._lexical = LexicalIndex(self.lexical_path) if signature else None
+            self._lexical_signature = signature
+        return self._lexical
+
+    def embed(self, model: str, texts: list) -> list:
+        """Embed texts, calling the API once for all LRU misses."""
+        vectors = [self.lru.get(model, t) for t in texts]
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            if model not in self._embedders:
+                self._embedders[model] = get_embedder(model)
+            fresh = self._embedders[model].embed([texts[i] for i in missing])
+            for i, vector in zip(missing, fresh):
+                vectors[i] = vector
+                self.lru.put(model, texts[i], vector)
+        return vectors
+
+    def handle(self, request: dict) -> dict:
+        op = request.get('op', 'retrieve')
+        if op == 'ping':
+            return {'ok': True, 'cache': {'hits': self.lru.hits, 'misses': self.lru.misses}}
+        model = load_index_meta(self.index_dir).get(
+            'embedding_model', request.get('model') or self.default_model)
+        queries = request.get('queries', [])
+        texts = [q.get('query', '') for q in queries]
+        with self.lock:
+            collection = self.collection()
+            if collection is None:
+                return {'error': 'index not found'}
+            lexical = self.lexical()
+            try:
+                vectors = self.embed(model, texts)
+            except Exception as e:
+                if lexical is None:
+                    return {'error': f"Embedding API error: {e}"}
+                return {'results': retrieve_lexical(lexical, texts, queries)}
+            results = retrieve_many(collection, vectors, texts, queries, lexical)
+        return {'results': results}
+
+
+def _serve_lines(service: RetrieveService, reader, writer):
+    """Answer JSON-lines requests until EOF."""
+    for line in reader:
+        if not line.strip():
+            continue
+        try:
+            reply = service.handle(json.loads(line))
+        except Exception as e:
+            reply = {'error': str(e)[:500]}
+        writer.write(json.dumps(reply, ensure_ascii=False).encode('utf-8') + b'\n')
+        writer.flush()
+
+
+def cmd_serve(argv: list):
+    """Run a long-lived retrieve daemon on a Unix socket (or stdin/stdout).
+
+    Requests are JSON lines: {"model": ..., "queries": [{"query", "top_k",
+    "rerank"}, ...]}; replies are {"results": [[chunk, ...], ...]}.
+    `retrieve` uses the socket automatically whenever the daemon is up.
+    The daemon exits after RAG_DAEMON_IDLE_SECONDS without requests.
+    """
+    import socketserver
+    index_dir = os.environ.get('RAG_INDEX_DIR', '')
+    if not index_dir:
+        print("Error: RAG_INDEX_DIR required", file=sys.stderr)
+        sys.exit(1)
+
+    service = RetrieveService(
+        index_dir,
+        os.environ.get('RAG_EMBEDDING_MODEL', 'text-embedding-3-small'),
+        int(os.environ.get('RAG_QUERY_CACHE_SIZE', '1024')))
+    idle_seconds = float(os.environ.get('RAG_DAEMON_IDLE_SECONDS', '1800'))
+
+    if '--stdio' in argv:
+        _serve_lines(service, sys.stdin.buffer, sys.stdout.buffer)
         return
 
-    if not results or not results['documents'] or not results['documents'][0]:
+    path = daemon_socket_path(index_dir)
+    if daemon_request(index_dir, {'op': 'ping'}, timeout=2.0) is not None:
+        print(f"Retrieve daemon already running on {path}", file=sys.stderr)
         return
+    if os.path.exists(path):
+        os.unlink(path)  # stale socket from a dead daemon
 
-    docs = results['documents'][0]
-    metas = results['metadatas'][0]
-    distances = results['distances'][0] if results.get('distances') else [0.0] * len(docs)
-
-    # Optional reranking
-    if rerank and len(docs) > top_k:
-        # Simple keyword-based reranking: boost chunks that contain query terms
-        query_terms = set(augmented_query.lower().split())
-        scored = []
-        for j, (doc, meta, dist) in enumerate(zip(docs, metas, distances)):
-            doc_lower = doc.lower()
-            keyword_hits = sum(1 for term in query_terms if term in doc_lower)
-            # Combined score: lower distance is better, more keyword hits is better
-            combined_score = (1.0 - dist) + (keyword_hits * 0.1)
-            scored.append((combined_score, doc, meta, dist))
-
-        scored.sort(key=lambda x: -x[0])
-        docs = [s[1] for s in scored[:top_k]]
-        metas = [s[2] for s in scored[:top_k]]
-        distances = [s[3] for s in scored[:top_k]]
+    last_request = [time.monotonic()]
 
-    # Output as JSONL
-    for doc, meta, dist in zip(docs[:top_k], metas[:top_k], distances[:top_k]):
-        result = {
-            'file': meta.get('file', ''),
-            'content': doc,
-            'start_line': meta.get('start_line', 0),
-            'end_line': meta.get('end_line', 0),
-            'type': meta.get('type', 'code'),
-            'score': round(1.0 - dist, 4),  # Convert distance to similarity
-        }
-        print(json.dumps(result, ensure_ascii=False))
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            last_request[0] = time.monotonic()
+            _serve_lines(service, self.rfile, self.wfile)
+            last_request[0] = time.monotonic()
+
+    old_umask = os.umask(0o177)
+    try:
+        server = socketserver.ThreadingUnixStreamServer(path, Handler)
+    finally:
+        os.umask(old_umask)
+    server.daemon_threads = True
+
+    def idle_watch():
+        while time.monotonic() - last_request[0] < idle_seconds:
+            time.sleep(min(5.0, idle_seconds))
+        server.shutdown()
+
+    threading.Thread(target=idle_watch, daemon=True).start()
+    signal.signal(signal.SIGTERM,
+                  lambda *_: threading.Thread(target=server.shutdown, daemon=True).start())
+    print(f"Retrieve daemon listening on {path}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
 
 
 # =============================================================================
 # Main
 # =============================================================================
 
+USAGE = ("Usage: rag-engine.py <index [--jobs N]|retrieve|retrieve-batch|serve [--stdio]|"
+         "socket-path|bench|stub-server>")
+
 if __name__ == '__main__':
     if len(sys.argv) < 2:
-        print("Usage: rag-engine.py <index|retrieve>", file=sys.stderr)
+        print(USAGE, file=sys.stderr)
         sys.exit(1)
 
     command = sys.argv[1]
     if command == 'index':
-        cmd_index()
+        jobs = None
+        if '--jobs' in sys.argv[2:]:
+            value = sys.argv[sys.argv.index('--jobs') + 1:][:1]
+            if not value or not value[0].isdigit() or int(value[0]) < 1:
+                print("Error: --jobs requires a positive integer", file=sys.stderr)
+                print(USAGE, file=sys.stderr)
+                sys.exit(1)
+            jobs = int(value[0])
+        cmd_index(jobs)
     elif command == 'retrieve':
         cmd_retrieve()
+    elif command == 'retrieve-batch':
+        cmd_retrieve_batch()
+    elif command == 'serve':
+        cmd_serve(sys.argv[2:])
+    elif command == 'socket-path':
+        if not os.environ.get('RAG_INDEX_DIR'):
+            print("Error: RAG_INDEX_DIR required", file=sys.stderr)
+            sys.exit(1)
+        print(daemon_socket_path(os.environ['RAG_INDEX_DIR']))
+    elif command == 'bench':
+        cmd_bench(sys.argv[2:])
+    elif command == 'stub-server':
+        cmd_stub_server(sys.argv[2:])
     else:
         print(f"Unknown command: {command}", file=sys.stderr)
         sys.exit(1)
@@ -2,10 +2,12 @@
 # =============================================================================
 # ai-review-arena: RAG Indexer
 #
-# Builds and incrementally updates a vector index of the codebase.
-# Uses tree-sitter for AST-based chunking and OpenAI embeddings.
+# Builds and incrementally updates a vector index of the codebase, plus a
+# BM25 lexical index over the same chunks.
+# Uses tree-sitter for AST-based chunking and OpenAI embeddings, or an offline
+# CPU embedder when rag.embedding_model is local:hashing / local:<st-model>.
 #
-# Usage: rag-indexer.sh <project-root> [--force] [--config <config-file>]
+# Usage: rag-indexer.sh <project-root> [--force] [--jobs N] [--config <config-file>]
 # Exit: 0 on success, 1 on error
 # =============================================================================
 
@@ -20,10 +22,12 @@ shift 1
 
 FORCE_REINDEX=false
 CONFIG_FILE=""
+EMBED_JOBS=""
 
 while [ $# -gt 0 ]; do
   case "$1" in
     --force) FORCE_REINDEX=true; shift ;;
+    --jobs) EMBED_JOBS="${2:?--jobs requires a value}"; shift 2 ;;
     --config) CONFIG_FILE="${2:?--config requires a value}"; shift 2 ;;
     *) shift ;;
   esac
@@ -41,6 +45,11 @@ RAG_ENABLED=true
 EMBEDDING_MODEL="text-embedding-3-small"
 CHUNK_SIZE=500
 CHUNK_OVERLAP=50
+EMBED_BATCH_SIZE=100
+CHUNK_JOBS=0
+EMBED_CACHE=true
+EMBED_CACHE_MAX_MB=200
+EMBED_CACHE_TTL_DAYS=30
 INDEX_EXTENSIONS=".java .kt .py .ts .tsx .js .jsx .go .rs .rb .php .c .cpp .cs .swift"
 EXCLUDE_PATHS="node_modules .git build dist vendor __pycache__ .venv target"
 
@@ -49,6 +58,14 @@ if [ -n "$CONFIG_FILE" ] && [ -f "$CONFIG_FILE" ] && command -v jq &>/dev/null;
   EMBEDDING_MODEL=$(jq -r '.rag.embedding_model // "text-embedding-3-small"' "$CONFIG_FILE")
   CHUNK_SIZE=$(jq -r '.rag.chunk_size // 500' "$CONFIG_FILE")
   CHUNK_OVERLAP=$(jq -r '.rag.chunk_overlap // 50' "$CONFIG_FILE")
+  EMBED_BATCH_SIZE=$(jq -r '.rag.embed_batch_size // 100' "$CONFIG_FILE")
+  CHUNK_JOBS=$(jq -r '.rag.chunk_jobs // 0' "$CONFIG_FILE")
+  EMBED_CACHE=$(jq -r 'if .rag.embedding_cache.enabled == false then "false" else "true" end' "$CONFIG_FILE")
+  EMBED_CACHE_MAX_MB=$(jq -r '.rag.embedding_cache.max_size_mb // 200' "$CONFIG_FILE")
+  EMBED_CACHE_TTL_DAYS=$(jq -r '.rag.embedding_cache.ttl_days // 30' "$CONFIG_FILE")
+  if [ -z "$EMBED_JOBS" ]; then
+    EMBED_JOBS=$(jq -r '.rag.embed_jobs // 4' "$CONFIG_FILE")
+  fi
 
   # Read extensions array and convert to space-separated with dots
   _ext_arr=$(jq -r '.rag.index_extensions[]? // empty' "$CONFIG_FILE")
@@ -69,6 +86,8 @@ if [ -n "$CONFIG_FILE" ] && [ -f "$CONFIG_FILE" ] && command -v jq &>/dev/null;
   fi
 fi
 
+EMBED_JOBS="${EMBED_JOBS:-4}"
+
 if [ "$RAG_ENABLED" != "true" ]; then
   log_info "RAG indexing disabled in config."
   exit 0
@@ -80,9 +99,13 @@ if ! command -v python3 &>/dev/null; then
   exit 0
 fi
 
-# Check required Python packages
+# Check required Python packages (local:* embedding models run without openai)
+_required_pkgs="chromadb openai"
+case "$EMBEDDING_MODEL" in
+  local:*) _required_pkgs="chromadb" ;;
+esac
 _missing_deps=false
-for pkg in chromadb openai; do
+for pkg in $_required_pkgs; do
   if ! python3 -c "import $pkg" 2>/dev/null; then
     _missing_deps=true
     log_warn "Python package '$pkg' not found."
@@ -90,7 +113,7 @@ for pkg in chromadb openai; do
 done
 
 if [ "$_missing_deps" = "true" ]; then
-  log_warn "Install missing dependencies: pip install chromadb openai"
+  log_warn "Install missing dependencies: pip install $_required_pkgs"
   log_warn "RAG indexing skipped."
   exit 0
 fi
@@ -146,6 +169,12 @@ export RAG_EMBEDDING_MODEL="$EMBEDDING_MODEL"
 export RAG_CHUNK_SIZE="$CHUNK_SIZE"
 export RAG_CHUNK_OVERLAP="$CHUNK_OVERLAP"
 export RAG_FORCE_REINDEX="$FORCE_REINDEX"
+export RAG_EMBED_JOBS="$EMBED_JOBS"
+export RAG_EMBED_BATCH_SIZE="$EMBED_BATCH_SIZE"
+export RAG_CHUNK_JOBS="$CHUNK_JOBS"
+export RAG_EMBED_CACHE="$EMBED_CACHE"
+export RAG_EMBED_CACHE_MAX_MB="$EMBED_CACHE_MAX_MB"
+export RAG_EMBED_CACHE_TTL_DAYS="$EMBED_CACHE_TTL_DAYS"
 
 python3 "$SCRIPT_DIR/rag-engine.py" index 2>&1 | while IFS= read -r line; do
   log_info "RAG: $line"
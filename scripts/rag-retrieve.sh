@@ -5,8 +5,21 @@
 # Retrieves relevant code context from the vector index for a given reviewer role.
 # Returns JSONL with file paths and code snippets.
 #
-# Usage: rag-retrieve.sh <project-root> <role> <query> [--top-k N] [--config <file>]
-# Stdout: JSONL of {file, content, score} objects
+# Usage: rag-retrieve.sh <project-root> <role[,role...]> <query> [--top-k N] [--config <file>]
+#                        [--rerank] [--daemon] [--lexical]
+#                        [--changed-file <file> [--changed-lines 10-20,40-45]]...
+# Stdout: JSONL of {file, content, score} objects. With a comma-separated
+#         role list, one {role, results: [...]} line per role, answered with
+#         a single embedding call and a single index query.
+#
+# Queries go through the warm retrieve daemon (rag-engine.py serve) whenever
+# one is running for the index. --daemon (or rag.retrieve_daemon.enabled)
+# starts it in the background for later calls; it exits when idle.
+# --rerank fuses vector and BM25 rankings; --lexical queries only the BM25
+# index (no network), which is also the fallback when embeddings fail.
+# --changed-file/--changed-lines (repeatable; no lines = whole file) name code
+# the reviewer already sees: overlapping chunks are skipped, and chunks
+# defining symbols referenced from those lines are ranked up.
 # Exit: 0 always (non-blocking)
 # =============================================================================
 
@@ -24,12 +37,25 @@ shift 3
 TOP_K=5
 CONFIG_FILE=""
 RERANK=false
+START_DAEMON=false
+DAEMON_IDLE_SECONDS=1800
+RETRIEVE_MODE=""
+CHANGED_FILES=()
+CHANGED_LINES=()
 
 while [ $# -gt 0 ]; do
   case "$1" in
     --top-k) TOP_K="${2:-5}"; shift 2 ;;
     --config) CONFIG_FILE="${2:-}"; shift 2 ;;
     --rerank) RERANK=true; shift ;;
+    --daemon) START_DAEMON=true; shift ;;
+    --lexical) RETRIEVE_MODE=lexical; shift ;;
+    --changed-file) CHANGED_FILES+=("${2:-}"); CHANGED_LINES+=(""); shift 2 ;;
+    --changed-lines)
+      if [ ${#CHANGED_FILES[@]} -gt 0 ]; then
+        CHANGED_LINES[$((${#CHANGED_FILES[@]} - 1))]="${2:-}"
+      fi
+      shift 2 ;;
     *) shift ;;
   esac
 done
@@ -52,6 +78,13 @@ if [ -n "$CONFIG_FILE" ] && [ -f "$CONFIG_FILE" ] && command -v jq &>/dev/null;
   if [ "$_rerank" = "true" ]; then
     RERANK=true
   fi
+  if [ "$(jq -r '.rag.retrieve_daemon.enabled // false' "$CONFIG_FILE")" = "true" ]; then
+    START_DAEMON=true
+  fi
+  DAEMON_IDLE_SECONDS=$(jq -r '.rag.retrieve_daemon.idle_seconds // 1800' "$CONFIG_FILE")
+  if [ -z "$RETRIEVE_MODE" ]; then
+    RETRIEVE_MODE=$(jq -r '.rag.retrieve_mode // "auto"' "$CONFIG_FILE")
+  fi
 fi
 
 # --- Check index exists ---
@@ -71,38 +104,83 @@ fi
 # --- Role-based query augmentation ---
 # Augment the query with role-specific keywords to improve retrieval relevance.
 # Passed via env var to avoid shell injection.
-ROLE_KEYWORDS=""
-case "$ROLE" in
-  security-reviewer|security)
-    ROLE_KEYWORDS="authentication authorization input validation SQL injection XSS CSRF encryption session token secret credential" ;;
-  bug-detector|bugs)
-    ROLE_KEYWORDS="error handling null undefined race condition async await promise exception try catch finally concurrency thread lock" ;;
-  performance-reviewer|performance)
-    ROLE_KEYWORDS="database query cache latency connection pool N+1 algorithm complexity memory allocation buffer stream batch optimization" ;;
-  architecture-reviewer|architecture)
-    ROLE_KEYWORDS="design pattern module dependency coupling cohesion interface abstract factory singleton import export service layer" ;;
-  test-coverage-reviewer|testing)
-    ROLE_KEYWORDS="test describe it expect assert mock stub spy coverage unit integration e2e fixture setup teardown" ;;
-  dependency-reviewer)
-    ROLE_KEYWORDS="import require package version dependency upgrade vulnerable license" ;;
-  api-contract-reviewer)
-    ROLE_KEYWORDS="endpoint route handler controller request response schema validate middleware versioning breaking change" ;;
-  observability-reviewer)
-    ROLE_KEYWORDS="log logger trace span metric monitor alert health probe correlation" ;;
-  data-integrity-reviewer)
-    ROLE_KEYWORDS="schema validate migration transaction rollback constraint foreign key integrity model entity" ;;
-  *)
-    ROLE_KEYWORDS="" ;;
-esac
+role_keywords() {
+  case "$1" in
+    security-reviewer|security)
+      echo "authentication authorization input validation SQL injection XSS CSRF encryption session token secret credential" ;;
+    bug-detector|bugs)
+      echo "error handling null undefined race condition async await promise exception try catch finally concurrency thread lock" ;;
+    performance-reviewer|performance)
+      echo "database query cache latency connection pool N+1 algorithm complexity memory allocation buffer stream batch optimization" ;;
+    architecture-reviewer|architecture)
+      echo "design pattern module dependency coupling cohesion interface abstract factory singleton import export service layer" ;;
+    test-coverage-reviewer|testing)
+      echo "test describe it expect assert mock stub spy coverage unit integration e2e fixture setup teardown" ;;
+    dependency-reviewer)
+      echo "import require package version dependency upgrade vulnerable license" ;;
+    api-contract-reviewer)
+      echo "endpoint route handler controller request response schema validate middleware versioning breaking change" ;;
+    observability-reviewer)
+      echo "log logger trace span metric monitor alert health probe correlation" ;;
+    data-integrity-reviewer)
+      echo "schema validate migration transaction rollback constraint foreign key integrity model entity" ;;
+    *)
+      echo "" ;;
+  esac
+}
 
 # --- Execute Python retriever (all user input via env vars) ---
 export RAG_INDEX_DIR="$INDEX_DIR"
-export RAG_QUERY="$QUERY"
-export RAG_ROLE_KEYWORDS="$ROLE_KEYWORDS"
 export RAG_TOP_K="$TOP_K"
 export RAG_RERANK="$RERANK"
+export RAG_RETRIEVE_MODE="${RETRIEVE_MODE:-auto}"
 export RAG_EMBEDDING_MODEL="${RAG_EMBEDDING_MODEL:-text-embedding-3-small}"
 
-python3 "$SCRIPT_DIR/rag-engine.py" retrieve 2>/dev/null
+# Changed ranges as JSON {absolute-file: [[start, end], ...]}
+if [ ${#CHANGED_FILES[@]} -gt 0 ] && command -v jq &>/dev/null; then
+  _changed='{}'
+  for _i in "${!CHANGED_FILES[@]}"; do
+    _file="${CHANGED_FILES[$_i]}"
+    [ -z "$_file" ] && continue
+    if [ -f "$_file" ]; then
+      _file="$(cd "$(dirname "$_file")" && pwd)/$(basename "$_file")"
+    elif [ "${_file#/}" = "$_file" ]; then
+      _file="${PROJECT_ROOT%/}/$_file"
+    fi
+    _changed=$(jq -c --arg file "$_file" --arg lines "${CHANGED_LINES[$_i]}" \
+      '.[$file] = [$lines | split(",")[] | select(test("^[0-9]+(-[0-9]+)?$"))
+                   | split("-") | map(tonumber) | [.[0], (.[1] // .[0])]]' <<< "$_changed")
+  done
+  export RAG_CHANGED_RANGES="$_changed"
+fi
+
+case "$ROLE" in
+  *,*)
+    # Batch mode: all roles in one round-trip
+    if command -v jq &>/dev/null; then
+      IFS=',' read -ra _roles <<< "$ROLE"
+      for _role in "${_roles[@]}"; do
+        [ -z "$_role" ] && continue
+        jq -nc --arg role "$_role" --arg query "$QUERY" --arg keywords "$(role_keywords "$_role")" \
+          '{role: $role, query: $query, keywords: $keywords}'
+      done | python3 "$SCRIPT_DIR/rag-engine.py" retrieve-batch 2>/dev/null
+    fi
+    ;;
+  *)
+    export RAG_QUERY="$QUERY"
+    export RAG_ROLE_KEYWORDS="$(role_keywords "$ROLE")"
+    python3 "$SCRIPT_DIR/rag-engine.py" retrieve 2>/dev/null
+    ;;
+esac
+
+# Start the warm daemon after answering so this call never waits on it
+# (long index paths put the socket under $TMPDIR, so ask the engine where)
+if [ "$START_DAEMON" = "true" ]; then
+  _socket_path=$(python3 "$SCRIPT_DIR/rag-engine.py" socket-path 2>/dev/null) || _socket_path=""
+  if [ -n "$_socket_path" ] && [ ! -S "$_socket_path" ]; then
+    RAG_DAEMON_IDLE_SECONDS="$DAEMON_IDLE_SECONDS" \
+      nohup python3 "$SCRIPT_DIR/rag-engine.py" serve >/dev/null 2>&1 &
+  fi
+fi
 
 exit 0
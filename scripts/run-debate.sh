@@ -92,6 +92,9 @@ if [ "$WS_ENABLED" = "true" ] && command -v python3 &>/dev/null; then
   if python3 -c "import openai" &>/dev/null 2>&1; then
     WS_SCRIPT="${PLUGIN_DIR}/scripts/openai-ws-debate.py"
     if [ -f "$WS_SCRIPT" ]; then
+      # Verdicts of earlier runs (cache.debate_verdicts) live in the project's
+      # cache-manager directory, so cache-manager.sh cleanup also ages them out
+      export DEBATE_CACHE_DIR="${DEBATE_CACHE_DIR:-$(cache_base_dir "$(find_project_root)")/debate-verdicts}"
       # Build input JSON for WebSocket client (include code_context)
       # Validate CODE_CONTEXT is valid JSON; default to empty object
       _ws_code_ctx="null"
@@ -102,7 +105,8 @@ if [ "$WS_ENABLED" = "true" ] && command -v python3 &>/dev/null; then
         --argjson findings "$FINDINGS" \
         --argjson code_context "$_ws_code_ctx" \
         --slurpfile config "$CONFIG_FILE" \
-        '{ findings: $findings, code_context: ($code_context // {}), config: $config[0] }')
+        --arg session_dir "$SESSION_DIR" \
+        '{ findings: $findings, code_context: ($code_context // {}), config: $config[0], session_dir: $session_dir }')
 
       WS_TIMEOUT=$(jq -r '.fallback.external_cli_debate_timeout_seconds // 300' "$CONFIG_FILE" || echo "300")
       if ! WS_RESULT=$(echo "$WS_INPUT" | arena_timeout "${WS_TIMEOUT}" python3 "$WS_SCRIPT" 2>&1); then
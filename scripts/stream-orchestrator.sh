@@ -5,9 +5,15 @@
 # Launches parallel streaming reviews with proper process group management.
 # Falls back to sync review scripts if streaming fails.
 #
-# Usage: stream-orchestrator.sh <session-dir> <file-path> <config-file> <roles...>
+# Usage: stream-orchestrator.sh <session-dir> <file-path|@file-list> <config-file> <roles...>
 # Exit: 0 always (non-blocking)
 #
+# With streaming.multi_review.enabled (default), every streamable
+# (file, role, model) job runs inside one `stream-review.py multi` process
+# that shares a client per provider; otherwise one process per job. That
+# process reviews small files for several roles in one request
+# (streaming.multi_role).
+#
 # Output: Findings files in session-dir (findings_stream_*.json)
 # =============================================================================
 
@@ -17,7 +23,7 @@ SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 source "$SCRIPT_DIR/utils.sh" || true
 
 # --- Arguments ---
-SESSION_DIR="${1:?Usage: stream-orchestrator.sh <session-dir> <file-path> <config-file> <roles...>}"
+SESSION_DIR="${1:?Usage: stream-orchestrator.sh <session-dir> <file-path|@file-list> <config-file> <roles...>}"
 FILE_PATH="${2:?Missing file path}"
 CONFIG_FILE="${3:?Missing config file}"
 shift 3
@@ -28,11 +34,30 @@ if [ ${#ROLES[@]} -eq 0 ]; then
   exit 0
 fi
 
+# --- Files to review: one path, or @<file> listing one path per line ---
+FILES=()
+if [ "${FILE_PATH#@}" != "$FILE_PATH" ]; then
+  while IFS= read -r _f; do
+    [ -n "$_f" ] && FILES+=("$_f")
+  done < "${FILE_PATH#@}"
+else
+  FILES=("$FILE_PATH")
+fi
+
 # --- Load streaming config ---
 STREAMING_ENABLED=true
+MULTI_REVIEW=true
+MONITOR_TIMEOUT=300
+DEADLINE_SECONDS=0
+METRICS_HISTORY_MAX=2000
 if [ -f "$CONFIG_FILE" ] && command -v jq &>/dev/null; then
   STREAMING_ENABLED=$(jq -r '.streaming.enabled // true' "$CONFIG_FILE")
+  MULTI_REVIEW=$(jq -r '.streaming.multi_review.enabled // true' "$CONFIG_FILE")
+  MONITOR_TIMEOUT=$(jq -r '.streaming.monitor_timeout_seconds // 300' "$CONFIG_FILE")
+  DEADLINE_SECONDS=$(jq -r '.streaming.early_stop.deadline_seconds // 0 | floor' "$CONFIG_FILE" 2>/dev/null || echo 0)
+  METRICS_HISTORY_MAX=$(jq -r '.streaming.hedging.history_max_entries // 2000' "$CONFIG_FILE")
 fi
+command -v jq &>/dev/null || MULTI_REVIEW=false
 
 if [ "$STREAMING_ENABLED" != "true" ]; then
   log_info "Streaming disabled in config."
@@ -53,7 +78,11 @@ if python3 -c "from openai import OpenAI" 2>/dev/null; then
   _can_stream_codex=true
 fi
 
-if python3 -c "import google.genai" 2>/dev/null || python3 -c "import google.generativeai" 2>/dev/null; then
+_async_gemini=false
+if python3 -c "import google.genai" 2>/dev/null; then
+  _can_stream_gemini=true
+  _async_gemini=true
+elif python3 -c "import google.generativeai" 2>/dev/null; then
   _can_stream_gemini=true
 fi
 
@@ -68,9 +97,24 @@ SIGNAL_LOG="${SESSION_DIR}/signals.jsonl"
 touch "$SIGNAL_LOG"
 
 # --- Start monitor ---
-"$SCRIPT_DIR/stream-monitor.sh" "$SESSION_DIR" --timeout 300 &
+"$SCRIPT_DIR/stream-monitor.sh" "$SESSION_DIR" --timeout "$MONITOR_TIMEOUT" &
 MONITOR_PID=$!
 
+# A session deadline only applies when streaming.early_stop.deadline_seconds
+# is set (or the caller exported one). It cuts off streams already sent;
+# queued jobs still run, and reviews it stopped are re-run through sync below
+if [ -z "${STREAM_DEADLINE_TS:-}" ] && [ "${DEADLINE_SECONDS:-0}" -gt 0 ] 2>/dev/null; then
+  export STREAM_DEADLINE_TS=$(( $(date +%s) + DEADLINE_SECONDS ))
+fi
+
+# Cross-run review results (cache.review_results) live in the project's
+# cache-manager directory, so cache-manager.sh cleanup also ages them out
+if command -v cache_base_dir &>/dev/null; then
+  export REVIEW_CACHE_DIR="${REVIEW_CACHE_DIR:-$(cache_base_dir "$(find_project_root)")/review-results}"
+  # Request latencies of earlier sessions set the hedging thresholds (streaming.hedging)
+  export STREAM_METRICS_HISTORY="${STREAM_METRICS_HISTORY:-$(cache_base_dir "$(find_project_root)")/stream-metrics.jsonl}"
+fi
+
 # --- Process group cleanup ---
 STREAM_PIDS=()
 
@@ -88,68 +132,107 @@ cleanup_streams() {
 }
 trap cleanup_streams EXIT INT TERM
 
+# Per-process streams, sync fallbacks and deadline re-runs are capped like
+# orchestrate-review.sh's sync reviews; STREAM_PIDS keeps every pid for the
+# failure count, RUNNING_PIDS only those that may still be running
+MAX_PARALLEL=8  # Cap concurrent review processes to prevent resource exhaustion
+RUNNING_PIDS=()
+
+# bash >= 4.3 can block until any job exits instead of polling
+_HAS_WAIT_N=false
+if [ "${BASH_VERSINFO[0]}" -gt 4 ] || { [ "${BASH_VERSINFO[0]}" -eq 4 ] && [ "${BASH_VERSINFO[1]}" -ge 3 ]; }; then
+  _HAS_WAIT_N=true
+fi
+
+# Throttle: wait until running process count drops below MAX_PARALLEL
+_throttle_parallel() {
+  while [ ${#RUNNING_PIDS[@]} -ge "$MAX_PARALLEL" ]; do
+    local new_pids=()
+    for pid in "${RUNNING_PIDS[@]}"; do
+      if kill -0 "$pid" 2>/dev/null; then
+        new_pids+=("$pid")
+      fi
+    done
+    RUNNING_PIDS=("${new_pids[@]+${new_pids[@]}}")
+    if [ ${#RUNNING_PIDS[@]} -ge "$MAX_PARALLEL" ]; then
+      if [ "$_HAS_WAIT_N" = "true" ]; then
+        wait -n 2>/dev/null || true
+      else
+        sleep 0.5
+      fi
+    fi
+  done
+}
+
 # --- Launch streaming reviews ---
 FINDINGS_INDEX=0
+MANIFEST="${SESSION_DIR}/stream-manifest.jsonl"
+: > "$MANIFEST"
+# Streaming jobs as "<model>\t<file>\t<role>\t<findings file>" (deadline re-runs)
+STREAM_JOBS=()
 
-for role in "${ROLES[@]}"; do
-  [ -z "$role" ] && continue
+# launch_review <codex|gemini> <file> <role> <can-stream> <async-capable>
+launch_review() {
+  local model="$1" file="$2" role="$3" can_stream="$4" async_ok="$5"
+  local findings_file="${SESSION_DIR}/findings_stream_${FINDINGS_INDEX}.json"
+  FINDINGS_INDEX=$((FINDINGS_INDEX + 1))
 
-  # Determine which models to use for this role
-  _use_codex=false
-  _use_gemini=false
-
-  if [ "$codex_enabled" = "true" ] && echo "$codex_roles" | grep -q "$role"; then
-    _use_codex=true
-  fi
-  if [ "$gemini_enabled" = "true" ] && echo "$gemini_roles" | grep -q "$role"; then
-    _use_gemini=true
+  if [ "$can_stream" = "true" ]; then
+    STREAM_JOBS+=("${model}"$'\t'"${file}"$'\t'"${role}"$'\t'"${findings_file}")
   fi
 
-  # Launch Codex streaming
-  if [ "$_use_codex" = "true" ] && [ "$_can_stream_codex" = "true" ]; then
-    FINDINGS_FILE="${SESSION_DIR}/findings_stream_${FINDINGS_INDEX}.json"
-    FINDINGS_INDEX=$((FINDINGS_INDEX + 1))
+  if [ "$can_stream" = "true" ] && [ "$async_ok" = "true" ] && [ "$MULTI_REVIEW" = "true" ]; then
+    # Queued for the single multi-review process below
+    jq -nc --arg file "$file" --arg role "$role" --arg model "$model" --arg output "$findings_file" \
+      '{file: $file, role: $role, model: $model, output: $output}' >> "$MANIFEST"
+  elif [ "$can_stream" = "true" ]; then
+    _throttle_parallel
     (
-      python3 "$SCRIPT_DIR/stream-review.py" codex "$FILE_PATH" "$role" \
+      python3 "$SCRIPT_DIR/stream-review.py" "$model" "$file" "$role" \
         --config "$CONFIG_FILE" --session-dir "$SESSION_DIR" \
-        > "$FINDINGS_FILE" 2>/dev/null
+        > "$findings_file" 2>/dev/null
     ) &
     STREAM_PIDS+=($!)
-  elif [ "$_use_codex" = "true" ]; then
-    # Fallback to sync Codex
-    FINDINGS_FILE="${SESSION_DIR}/findings_stream_${FINDINGS_INDEX}.json"
-    FINDINGS_INDEX=$((FINDINGS_INDEX + 1))
+    RUNNING_PIDS+=($!)
+  elif [ "$(wc -c < "$file" 2>/dev/null | tr -d ' ')" -gt 1048576 ]; then
+    # Only the streaming path can segment files this large
+    log_warn "${model} streaming unavailable for $role; skipping oversized $file."
+  else
+    # Fallback to sync review script
+    _throttle_parallel
     (
-      cat "$FILE_PATH" | "$SCRIPT_DIR/codex-review.sh" "$FILE_PATH" "$CONFIG_FILE" "$role" \
-        > "$FINDINGS_FILE" 2>/dev/null
+      cat "$file" | "$SCRIPT_DIR/${model}-review.sh" "$file" "$CONFIG_FILE" "$role" \
+        > "$findings_file" 2>/dev/null
     ) &
     STREAM_PIDS+=($!)
-    log_info "Codex streaming unavailable for $role, using sync fallback."
+    RUNNING_PIDS+=($!)
+    log_info "${model} streaming unavailable for $role, using sync fallback."
   fi
+}
 
-  # Launch Gemini streaming
-  if [ "$_use_gemini" = "true" ] && [ "$_can_stream_gemini" = "true" ]; then
-    FINDINGS_FILE="${SESSION_DIR}/findings_stream_${FINDINGS_INDEX}.json"
-    FINDINGS_INDEX=$((FINDINGS_INDEX + 1))
-    (
-      python3 "$SCRIPT_DIR/stream-review.py" gemini "$FILE_PATH" "$role" \
-        --config "$CONFIG_FILE" --session-dir "$SESSION_DIR" \
-        > "$FINDINGS_FILE" 2>/dev/null
-    ) &
-    STREAM_PIDS+=($!)
-  elif [ "$_use_gemini" = "true" ]; then
-    # Fallback to sync Gemini
-    FINDINGS_FILE="${SESSION_DIR}/findings_stream_${FINDINGS_INDEX}.json"
-    FINDINGS_INDEX=$((FINDINGS_INDEX + 1))
-    (
-      cat "$FILE_PATH" | "$SCRIPT_DIR/gemini-review.sh" "$FILE_PATH" "$CONFIG_FILE" "$role" \
-        > "$FINDINGS_FILE" 2>/dev/null
-    ) &
-    STREAM_PIDS+=($!)
-    log_info "Gemini streaming unavailable for $role, using sync fallback."
-  fi
+for file in "${FILES[@]}"; do
+  for role in "${ROLES[@]}"; do
+    [ -z "$role" ] && continue
+
+    if [ "$codex_enabled" = "true" ] && echo "$codex_roles" | grep -q "$role"; then
+      launch_review codex "$file" "$role" "$_can_stream_codex" true
+    fi
+    if [ "$gemini_enabled" = "true" ] && echo "$gemini_roles" | grep -q "$role"; then
+      launch_review gemini "$file" "$role" "$_can_stream_gemini" "$_async_gemini"
+    fi
+  done
 done
 
+# One process streams every queued job concurrently
+if [ -s "$MANIFEST" ]; then
+  (
+    python3 "$SCRIPT_DIR/stream-review.py" multi "$MANIFEST" \
+      --config "$CONFIG_FILE" --session-dir "$SESSION_DIR" 2>/dev/null
+  ) &
+  STREAM_PIDS+=($!)
+  RUNNING_PIDS+=($!)
+fi
+
 # --- Wait for all reviews ---
 STREAM_FAILURES=0
 for pid in "${STREAM_PIDS[@]+${STREAM_PIDS[@]}}"; do
@@ -158,10 +241,50 @@ for pid in "${STREAM_PIDS[@]+${STREAM_PIDS[@]}}"; do
   fi
 done
 
+# --- Re-run reviews stopped at the session deadline through the sync scripts ---
+if [ -n "${STREAM_DEADLINE_TS:-}" ] && command -v jq &>/dev/null; then
+  RERUN_PIDS=()
+  for _job in "${STREAM_JOBS[@]+${STREAM_JOBS[@]}}"; do
+    IFS=$'\t' read -r _model _file _role _out <<< "$_job"
+    jq -e '.stopped // "" | split(",") | index("deadline")' "$_out" &>/dev/null || continue
+    _throttle_parallel
+    (
+      # Keep the partial findings unless the sync review succeeds
+      cat "$_file" | "$SCRIPT_DIR/${_model}-review.sh" "$_file" "$CONFIG_FILE" "$_role" \
+        > "${_out}.sync" 2>/dev/null
+      if jq -e '.error == null and (.findings | type == "array")' "${_out}.sync" &>/dev/null; then
+        mv "${_out}.sync" "$_out"
+      else
+        rm -f "${_out}.sync"
+        exit 1
+      fi
+    ) &
+    RERUN_PIDS+=($!)
+    STREAM_PIDS+=($!)
+    RUNNING_PIDS+=($!)
+  done
+  if [ ${#RERUN_PIDS[@]} -gt 0 ]; then
+    log_info "Re-running ${#RERUN_PIDS[@]} reviews stopped at the session deadline via sync."
+  fi
+  for pid in "${RERUN_PIDS[@]+${RERUN_PIDS[@]}}"; do
+    if ! wait "$pid" 2>/dev/null; then
+      STREAM_FAILURES=$((STREAM_FAILURES + 1))
+    fi
+  done
+fi
+
 # --- Stop monitor ---
 kill "$MONITOR_PID" 2>/dev/null || true
 wait "$MONITOR_PID" 2>/dev/null || true
 
+# --- Keep this session's request metrics (newest METRICS_HISTORY_MAX) ---
+if [ -n "${STREAM_METRICS_HISTORY:-}" ] && grep -qF '"stream_metrics"' "$SIGNAL_LOG" 2>/dev/null; then
+  mkdir -p "$(dirname "$STREAM_METRICS_HISTORY")"
+  _history_tmp="${STREAM_METRICS_HISTORY}.tmp.$$"
+  { cat "$STREAM_METRICS_HISTORY" 2>/dev/null; grep -F '"stream_metrics"' "$SIGNAL_LOG"; } \
+    | tail -n "$METRICS_HISTORY_MAX" > "$_history_tmp" && mv "$_history_tmp" "$STREAM_METRICS_HISTORY"
+fi
+
 # --- Report conflicts ---
 if [ -f "${SESSION_DIR}/conflicts.jsonl" ] && [ -s "${SESSION_DIR}/conflicts.jsonl" ]; then
   CONFLICT_COUNT=$(wc -l < "${SESSION_DIR}/conflicts.jsonl" | tr -d ' ')
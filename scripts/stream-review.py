@@ -8,6 +8,30 @@ Writes findings in real-time to signal log as JSONL.
 Usage:
   stream-review.py codex <file-path> <role> [--config <config-file>]
   stream-review.py gemini <file-path> <role> [--config <config-file>]
+  stream-review.py <codex|gemini> <file-path> --roles <role1,role2,...>
+  stream-review.py multi <manifest.jsonl|-> [--config <config-file>] [--session-dir <dir>]
+  stream-review.py bench-parse [--sizes 25,50,100] [--replay <stream.jsonl>]
+  stream-review.py stats [<signals.jsonl|session-dir>...] [--by provider,model,role] [--json]
+
+The multi mode runs many {file, role, model, output} jobs (one JSON per
+manifest line) concurrently in one process with a shared client per provider.
+With --roles (and in multi mode for small files) one request covers several
+roles; findings carry a role tag and are routed to each role's output. Large
+files are reviewed as concurrent segments cut at rag-engine chunk boundaries,
+with finding lines mapped back to the file (streaming.segmenting).
+
+Every request writes a stream_metrics signal (queue, connect, first token,
+first finding, tokens per second, tokens in/out, parse CPU, retries); the
+stats mode aggregates them into per-provider/model/role percentiles.
+Streams can be stopped early by session policy (confirmed criticals, role
+token budget, STREAM_DEADLINE_TS); their partial findings are kept and the
+output is marked "partial" with the reason (streaming.early_stop); a deadline
+stop is also marked as an error.
+With streaming.hedging on, a request whose first token is later than its
+measured p95 (or that fails before any output) is raced against an
+alternate model and the first stream to yield findings wins.
+With REVIEW_CACHE_DIR set, outputs for an unchanged file, role, model and
+prompt are reused across runs and marked "cached" (cache.review_results).
 
 Environment:
   SESSION_DIR          - Session directory for signal log and findings
@@ -15,39 +39,147 @@ Environment:
   GOOGLE_API_KEY       - Required for Gemini streaming
   STREAM_PROMPT_FILE   - Path to role-specific prompt template
   STREAM_TIMEOUT       - Timeout in seconds (default: 120)
+  STREAM_DEADLINE_TS   - Session deadline (epoch seconds); streams already sent stop shortly
+                         before it (requests still queued are not affected)
+  REVIEW_CACHE_DIR     - Cross-run review result cache directory (unset: no caching)
+  STREAM_METRICS_HISTORY - stream_metrics of earlier sessions (hedging thresholds)
 """
 
 import argparse
-import fcntl
+import atexit
 import json
 import os
 import re
 import sys
+import threading
 import time
 from datetime import datetime, timezone
 from pathlib import Path
 
 
-def atomic_append(filepath: str, line: str):
-    """Append a line to a file with flock-based locking."""
-    with open(filepath, 'a') as f:
-        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+class SignalWriter:
+    """Buffered appender for one JSONL signal log.
+
+    Lines are batched in memory and written with a single os.write on an
+    O_APPEND descriptor, so each batch of whole lines lands atomically
+    without a file lock. A batch is flushed when it reaches max_entries or
+    max_bytes, when its oldest line is flush_interval seconds old (checked by
+    a background thread), on an urgent line such as a critical alert, and at
+    exit.
+    """
+
+    def __init__(self, path: str, max_entries: int = 64, max_bytes: int = 65536,
+                 flush_interval: float = 0.2):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self._lines = []
+        self._size = 0
+        self._oldest = 0.0
+        self._lock = threading.Lock()
+        self._fd = None
+
+    def write(self, line: str, urgent: bool = False):
+        data = line + '\n'
+        with self._lock:
+            if not self._lines:
+                self._oldest = time.monotonic()
+            self._lines.append(data)
+            self._size += len(data)
+            if urgent or len(self._lines) >= self.max_entries or self._size >= self.max_bytes:
+                self._flush_locked()
+
+    def flush(self, only_if_due: bool = False):
+        with self._lock:
+            if only_if_due and (not self._lines or
+                                time.monotonic() - self._oldest < self.flush_interval):
+                return
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._lines:
+            return
+        data = ''.join(self._lines).encode('utf-8')
+        self._lines, self._size = [], 0
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self._fd, view):]
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+_signal_writers = {}
+_signal_writers_lock = threading.Lock()
+_signal_settings = {}
+URGENT_SIGNALS = {'critical_alert'}
+
+
+def configure_signal_log(config: dict):
+    """Apply streaming.signal_buffer settings to writers created afterwards."""
+    buffer_cfg = config.get('streaming', {}).get('signal_buffer', {})
+    if not buffer_cfg.get('enabled', True):
+        _signal_settings.update(max_entries=1)
+        return
+    _signal_settings.update(
+        max_entries=int(buffer_cfg.get('max_entries', 64)),
+        max_bytes=int(buffer_cfg.get('max_bytes', 65536)),
+        flush_interval=float(buffer_cfg.get('flush_interval_ms', 200)) / 1000.0)
+
+
+def signal_writer(signal_log: str) -> SignalWriter:
+    """Shared writer per signal log path; starts the age-based flusher once."""
+    with _signal_writers_lock:
+        writer = _signal_writers.get(signal_log)
+        if writer is None:
+            writer = SignalWriter(signal_log, **_signal_settings)
+            if not _signal_writers:
+                atexit.register(close_signal_writers)
+                threading.Thread(target=_flush_aged_signals, daemon=True).start()
+            _signal_writers[signal_log] = writer
+        return writer
+
+
+def _flush_aged_signals():
+    while True:
+        with _signal_writers_lock:
+            writers = list(_signal_writers.values())
+        interval = min((w.flush_interval for w in writers), default=0.2)
+        time.sleep(max(interval / 2, 0.01))
+        for writer in writers:
+            try:
+                writer.flush(only_if_due=True)
+            except OSError:
+                pass
+
+
+def close_signal_writers():
+    with _signal_writers_lock:
+        writers = list(_signal_writers.values())
+    for writer in writers:
         try:
-            f.write(line + '\n')
-            f.flush()
-        finally:
-            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            writer.close()
+        except OSError:
+            pass
 
 
 def write_signal(signal_log: str, source: str, signal_type: str, data: dict):
-    """Write a signal entry to the JSONL signal log."""
+    """Write a signal entry to the JSONL signal log (buffered; critical alerts flush at once)."""
     entry = {
         'ts': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z',
         'source': source,
         'type': signal_type,
         'data': data,
     }
-    atomic_append(signal_log, json.dumps(entry, ensure_ascii=False))
+    signal_writer(signal_log).write(json.dumps(entry, ensure_ascii=False),
+                                     urgent=signal_type in URGENT_SIGNALS)
 
 
 def extract_findings_from_text(text: str) -> list:
@@ -93,129 +225,693 @@ def extract_findings_from_text(text: str) -> list:
     return findings
 
 
-def build_prompt(file_path: str, file_content: str, role: str, prompt_file: str) -> str:
-    """Build the review prompt from template and file content."""
-    template = ""
+class FindingStreamParser:
+    """Incremental JSON scanner that emits findings as their closing brace arrives.
+
+    Each delta is consumed once. Text outside JSON (prose, ``` fences) is
+    skipped; when a value turns out not to be JSON the scanner drops it and
+    resumes at the next top-level '{' or '['. A finding is a dict that is an
+    element of a "findings" array (at any depth), or a dict with a "title"
+    that is a top-level value or an element of a top-level array. Nested
+    objects inside a finding are built in full before it is emitted.
+    """
+
+    _SKIP_TO_VALUE = re.compile(r'[{\[]')
+    _STRING_RUN = re.compile(r'[^"\\]+')
+    _WHITESPACE = re.compile(r'[ \t\r\n]+')
+    _SCALAR_CHARS = frozenset('+-0123456789.eEtruefalsn')
+
+    def __init__(self):
+        self._stack = []       # open containers: [value, key-or-None, state, parent_key]
+        self._string = None    # raw chunks of the string being read
+        self._escape = False
+        self._scalar = None    # chars of the number/literal being read
+        self.parts = []        # every delta, for callers needing the full text
+
+    @property
+    def text(self) -> str:
+        return ''.join(self.parts)
+
+    def feed(self, delta: str) -> list:
+        """Consume a delta and return findings completed by it."""
+        self.parts.append(delta)
+        found = []
+        i, n = 0, len(delta)
+        while i < n:
+            if self._string is not None:
+                i = self._read_string(delta, i, found)
+                continue
+            if not self._stack:
+                match = self._SKIP_TO_VALUE.search(delta, i)
+                if match is None:
+                    break
+                i = match.start()
+            if self._scalar is not None:
+                char = delta[i]
+                if char in self._SCALAR_CHARS:
+                    self._scalar.append(char)
+                    i += 1
+                    continue
+                if not self._end_scalar(found):
+                    continue
+            match = self._WHITESPACE.match(delta, i)
+            if match:
+                i = match.end()
+                continue
+            if self._step(delta[i], found):
+                i += 1
+        return found
+
+    def finish(self) -> list:
+        """Flush a trailing scalar at end of stream; returns late findings."""
+        found = []
+        if self._scalar is not None:
+            self._end_scalar(found)
+        return found
+
+    # -- scanning -------------------------------------------------------------
+
+    def _read_string(self, delta: str, i: int, found: list) -> int:
+        n = len(delta)
+        while i < n:
+            if self._escape:
+                self._string.append(delta[i])
+                self._escape = False
+                i += 1
+                continue
+            match = self._STRING_RUN.match(delta, i)
+            if match:
+                self._string.append(match.group())
+                i = match.end()
+                continue
+            char = delta[i]
+            i += 1
+            if char == '\\':
+                self._string.append(char)
+                self._escape = True
+                continue
+            raw, self._string = ''.join(self._string), None
+            try:
+                value = json.loads('"' + raw + '"')
+            except json.JSONDecodeError:
+                self._reset()
+                return i
+            self._value(value, found, is_string=True)
+            return i
+        return i
+
+    def _end_scalar(self, found: list) -> bool:
+        """Finish a number/literal. False if it was invalid (state reset)."""
+        raw, self._scalar = ''.join(self._scalar), None
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            self._reset()
+            return False
+        self._value(value, found)
+        return True
+
+    def _step(self, char: str, found: list) -> bool:
+        """Handle one structural char. False means: re-read char after a reset."""
+        top = self._stack[-1] if self._stack else None
+        state = top[2] if top else 'value'
+        if char == '"' and state in ('value', 'key', 'first'):
+            self._string = []
+        elif char in '{[' and state in ('value', 'first'):
+            if top is not None and state == 'first':
+                top[2] = 'value'
+            parent_key = top[1] if top is not None and isinstance(top[0], dict) else \
+                (top[3] if top is not None else None)
+            if char == '{':
+                self._stack.append([{}, None, 'key', parent_key])
+            else:
+                self._stack.append([[], None, 'first', parent_key])
+        elif char == '}' and top is not None and isinstance(top[0], dict) and state in ('key', 'comma'):
+            self._close(found)
+        elif char == ']' and top is not None and isinstance(top[0], list) and state in ('first', 'comma'):
+            self._close(found)
+        elif char == ':' and state == 'colon':
+            top[2] = 'value'
+        elif char == ',' and state == 'comma':
+            top[2] = 'key' if isinstance(top[0], dict) else 'value'
+        elif char in self._SCALAR_CHARS and state in ('value', 'first') and top is not None:
+            self._scalar = [char]
+        else:
+            # Not JSON after all: drop it and rescan this char at top level
+            was_open = bool(self._stack)
+            self._reset()
+            return not was_open
+        return True
+
+    def _close(self, found: list):
+        value, _, _, _ = self._stack.pop()
+        self._value(value, found)
+
+    def _value(self, value, found: list, is_string: bool = False):
+        if not self._stack:
+            if isinstance(value, dict) and 'title' in value:
+                found.append(value)
+            return
+        top = self._stack[-1]
+        container, key, state, parent_key = top
+        if isinstance(container, dict):
+            if state == 'key' and is_string:
+                top[1], top[2] = value, 'colon'
+                return
+            container[key] = value
+            top[1], top[2] = None, 'comma'
+            return
+        container.append(value)
+        top[2] = 'comma'
+        if isinstance(value, dict) and (parent_key == 'findings' or
+                                        (len(self._stack) == 1 and 'title' in value)):
+            found.append(value)
+
+    def _reset(self):
+        self._stack = []
+        self._string = None
+        self._escape = False
+        self._scalar = None
+
+
+def _read_template(prompt_file: str) -> str:
     if os.path.exists(prompt_file):
         with open(prompt_file, 'r') as f:
-            template = f.read()
+            return f.read()
+    return ""
 
-    return f"""{template}
+
+def _file_prefix(file_path: str, file_content: str) -> str:
+    return f"""Source file under review. Review instructions follow after the file.
 
 --- FILE: {file_path} ---
 {file_content}
 --- END FILE ---
+"""
+
+
+def build_prompt_parts(file_path: str, file_content: str, role: str, prompt_file: str) -> tuple:
+    """Split the review prompt into (shared prefix, role suffix).
+
+    The prefix holds only the file, so it is byte-identical for every role
+    and provider prompt caches can reuse it; the role template and the core
+    instruction repeat come after it.
+    """
+    template = _read_template(prompt_file)
+    suffix = f"""
+{template}
 
 ---
 [CORE INSTRUCTION REPEAT]
 Review the code above for {role} issues in file {file_path}. Return findings as structured JSON with fields: severity (critical|high|medium|low), title, description, file, line, and suggestion. Output must be valid JSON only.
 """
+    return _file_prefix(file_path, file_content), suffix
+
+
+def build_prompt(file_path: str, file_content: str, role: str, prompt_file: str) -> str:
+    """Build the review prompt from template and file content."""
+    return ''.join(build_prompt_parts(file_path, file_content, role, prompt_file))
+
+
+def multi_role_schema(roles: list) -> dict:
+    """Response schema for one request covering several roles: the finding
+    items of config/schemas/codex-review.json plus a required role tag."""
+    schema_path = Path(__file__).parent.parent / 'config' / 'schemas' / 'codex-review.json'
+    with open(schema_path) as f:
+        item = json.load(f)['properties']['findings']['items']
+    item['properties'] = {'role': {'type': 'string', 'enum': list(roles)}, **item['properties']}
+    item['required'] = ['role'] + item['required']
+    return {
+        'type': 'object',
+        'properties': {
+            'findings': {'type': 'array', 'items': item},
+            'summary': {'type': 'string'},
+        },
+        'required': ['findings', 'summary'],
+        'additionalProperties': False,
+    }
+
+
+def build_multi_role_parts(file_path: str, file_content: str, roles: list) -> tuple:
+    """(shared prefix, suffix) asking for every role's findings in one response."""
+    sections = []
+    for role in roles:
+        template = _read_template(role_prompt_file(role)).strip()
+        sections.append(f"=== ROLE: {role} ===\n{template or f'Review for {role} issues.'}")
+    role_list = ', '.join(roles)
+    schema = json.dumps(multi_role_schema(roles), separators=(',', ':'))
+    suffix = f"""
+{chr(10).join(sections)}
+
+---
+[CORE INSTRUCTION REPEAT]
+Review the code above in file {file_path} once for each of these roles: {role_list}. Return a single JSON object matching this schema, tagging every finding with the role it belongs to:
+{schema}
+Output must be valid JSON only.
+"""
+    return _file_prefix(file_path, file_content), suffix
+
+
+def prompt_cache_key(file_path: str, file_content: str) -> str:
+    """Routing key so every role's request for a file lands on the same cache."""
+    import hashlib
+    digest = hashlib.sha256(f"{file_path}\0{file_content}".encode('utf-8', errors='ignore'))
+    return f"arena-{digest.hexdigest()[:24]}"
+
+
+def record_findings(new_findings: list, seen: set, all_findings: list,
+                    signal_log: str, source: str, file_path: str):
+    """Deduplicate, signal and collect findings as they are parsed."""
+    for finding in new_findings:
+        # Deduplicate by title+file+line
+        key = f"{finding.get('title', '')}:{finding.get('file', '')}:{finding.get('line', 0)}"
+        if key in seen:
+            continue
+        seen.add(key)
+        finding.setdefault('file', file_path)
+        all_findings.append(finding)
+
+        # Write real-time signal
+        write_signal(signal_log, source, 'finding_stream', finding)
+
+        # Alert on critical findings immediately
+        if finding.get('severity') == 'critical':
+            write_signal(signal_log, source, 'critical_alert', {
+                'title': finding.get('title', ''),
+                'file': finding.get('file', file_path),
+                'line': finding.get('line', 0),
+            })
+
+
+class StopStream(Exception):
+    """Raised from a collector when the session policy ends its stream early."""
+
+
+class EarlyStopPolicy:
+    """Session-wide early termination of streaming reviews (streaming.early_stop).
+
+    Streams stop early, keeping their partial findings, when:
+      - critical_confirmations critical findings have each been reported by
+        both providers (same file, lines within confirm_line_window): the
+        review gate is decided, so every in-flight stream is cancelled;
+      - a role has used its role_token_budget of output tokens;
+      - the session deadline is within deadline_margin_seconds. The deadline
+        is STREAM_DEADLINE_TS (epoch seconds) or deadline_seconds after start
+        (none by default). It only cuts off requests sent before it; queued
+        requests still run, and a review stopped by it is reported as failed.
+    Cross-provider confirmation needs both providers streaming in the same
+    process (multi mode); budgets and the deadline apply everywhere.
+    """
+
+    def __init__(self, config: dict):
+        cfg = config.get('streaming', {}).get('early_stop', {})
+        self.enabled = cfg.get('enabled', True)
+        self.confirmations_needed = cfg.get('critical_confirmations', 0)
+        self.line_window = cfg.get('confirm_line_window', 3)
+        self.budgets = cfg.get('role_token_budget', {})
+        self.margin = cfg.get('deadline_margin_seconds', 5)
+        self.deadline = None
+        try:
+            self.deadline = float(os.environ.get('STREAM_DEADLINE_TS', '') or 0) or None
+        except ValueError:
+            pass
+        if self.deadline is None and cfg.get('deadline_seconds', 0) > 0:
+            self.deadline = time.time() + cfg['deadline_seconds']
+        self.criticals = []
+        self.confirmed = set()
+        self.decided = False
+        self.role_tokens = {}
+        self.tasks = {}
+
+    def _budget(self, role: str) -> int:
+        return self.budgets.get(role, self.budgets.get('default', 0))
+
+    def remaining(self):
+        """Seconds left before streams must stop, or None without a deadline."""
+        if self.deadline is None:
+            return None
+        return self.deadline - self.margin - time.time()
+
+    def time_limit(self, timeout: float, collector) -> tuple:
+        """(limit, deadline_bound) for collector's request, about to be sent
+        with timeout. A request sent after the deadline runs unbounded by it."""
+        remaining = self.remaining() if self.enabled else None
+        collector.deadline_bound = remaining is not None and remaining > 0
+        if collector.deadline_bound and remaining < timeout:
+            return remaining, True
+        return timeout, False
+
+    def blocked(self, collector) -> str:
+        """Reason a request should not start (or continue), else ''."""
+        if not self.enabled:
+            return ''
+        if self.decided:
+            return 'critical_confirmed'
+        remaining = self.remaining()
+        if collector.deadline_bound and remaining is not None and remaining <= 0:
+            return 'deadline'
+        for role in collector.role.split(','):
+            budget = self._budget(role)
+            if budget and self.role_tokens.get(role, 0) >= budget:
+                return 'token_budget'
+        return ''
+
+    def register(self, collector, task=None):
+        self.tasks[collector] = task
+
+    def unregister(self, collector):
+        self.tasks.pop(collector, None)
+
+    def _cancel(self, reason: str, current, match):
+        """Stop other registered streams that match; current stops by raising."""
+        for other, task in list(self.tasks.items()):
+            if other is not current and task is not None and other.stop_reason is None and match(other):
+                other.stop_reason = reason
+                task.cancel()
+
+    def after_feed(self, collector, chars: int, new_findings: list) -> str:
+        """Account a delta and its findings; reason the stream must stop, else ''."""
+        if not self.enabled:
+            return ''
+        roles = collector.role.split(',')
+        for role in roles:
+            self.role_tokens[role] = self.role_tokens.get(role, 0) + chars / 4.0 / len(roles)
+        for finding in new_findings:
+            if finding.get('severity') == 'critical':
+                self._note_critical(collector.source, finding)
+        reason = self.blocked(collector)
+        if reason == 'critical_confirmed':
+            self._cancel(reason, collector, lambda other: True)
+        elif reason == 'deadline':
+            self._cancel(reason, collector, lambda other: other.deadline_bound)
+        elif reason == 'token_budget':
+            spent = {r for r in roles if self._budget(r) and self.role_tokens[r] >= self._budget(r)}
+            self._cancel(reason, collector, lambda other: spent & set(other.role.split(',')))
+        return reason
+
+    def _note_critical(self, provider: str, finding: dict):
+        if not self.confirmations_needed:
+            return
+        try:
+            line = int(finding.get('line') or 0)
+        except (TypeError, ValueError):
+            line = 0
+        file_path = finding.get('file', '')
+        for other_provider, other_file, other_line in self.criticals:
+            if other_provider != provider and other_file == file_path \
+                    and abs(other_line - line) <= self.line_window:
+                self.confirmed.add((file_path, min(line, other_line)))
+                break
+        self.criticals.append((provider, file_path, line))
+        if len(self.confirmed) >= self.confirmations_needed:
+            self.decided = True
+
+
+class StreamCollector:
+    """Parser, dedup and signal output for one streaming review."""
+
+    def __init__(self, signal_log: str, source: str, file_path: str, role: str):
+        self.signal_log = signal_log
+        self.source = source
+        self.file_path = file_path
+        self.role = role
+        self.parser = FindingStreamParser()
+        self.seen = set()
+        self.findings = []
+        self.usage = None
+        # Request timeline (time.monotonic) for the stream_metrics signal
+        self.model = ''
+        self.created = time.monotonic()
+        self.started = self.connected_at = self.first_token = self.first_finding = None
+        self.parse_cpu = 0.0
+        self.output_chars = 0
+        self.retries = 0
+        self.failed = False
+        self.policy = None
+        self.stop_reason = None
+        self.deadline_bound = False
+        self.race = None
+        self.hedged = False
+
+    def spawn(self):
+        """A fresh collector for a hedge request of the same review."""
+        return StreamCollector(self.signal_log, self.source, self.file_path, self.role)
+
+    def adopt(self, other):
+        """Take over the state of a hedge stream that won its race, keeping
+        a stop reason already set on this collector by the session policy."""
+        stop_reason = self.stop_reason
+        self.__dict__.update(other.__dict__)
+        self.stop_reason = self.stop_reason or stop_reason
+
+    def begin(self, model: str):
+        """The request is about to be sent (after any limiter wait)."""
+        self.model = model
+        self.started = time.monotonic()
+
+    def connected(self, stream=None):
+        """The provider accepted the request and the stream is open."""
+        self.connected_at = time.monotonic()
+        # openai-python stamps the retries it made on the request it finally sent
+        try:
+            self.retries = int(stream.response.request.headers.get('x-stainless-retry-count', 0))
+        except Exception:
+            pass
+
+    def _accept(self, findings: list):
+        record_findings(findings, self.seen, self.findings,
+                        self.signal_log, self.source, self.file_path)
+
+    def feed(self, text: str):
+        if self.first_token is None:
+            self.first_token = time.monotonic()
+        self.output_chars += len(text)
+        cpu = time.thread_time()
+        findings = self.parser.feed(text)
+        self.parse_cpu += time.thread_time() - cpu
+        before = len(self.findings)
+        self._accept(findings)
+        if self.first_finding is None and self.findings:
+            self.first_finding = time.monotonic()
+            if self.race is not None:
+                self.race.claim(self)
+        if self.policy is not None:
+            reason = self.policy.after_feed(self, len(text), self.findings[before:])
+            if reason:
+                self.stop_reason = reason
+                raise StopStream(reason)
+
+    def record_usage(self, prompt_tokens, cached_tokens, output_tokens):
+        """Token usage reported by the provider, including prompt-cache hits."""
+        self.usage = {
+            'prompt_tokens': prompt_tokens or 0,
+            'cached_tokens': cached_tokens or 0,
+            'output_tokens': output_tokens or 0,
+        }
+
+    def codex_usage(self, usage):
+        details = getattr(usage, 'prompt_tokens_details', None)
+        self.record_usage(getattr(usage, 'prompt_tokens', 0),
+                          getattr(details, 'cached_tokens', 0) if details else 0,
+                          getattr(usage, 'completion_tokens', 0))
+
+    def gemini_usage(self, meta):
+        self.record_usage(getattr(meta, 'prompt_token_count', 0),
+                          getattr(meta, 'cached_content_token_count', 0),
+                          getattr(meta, 'candidates_token_count', 0))
+
+    def error(self, e):
+        if self.policy is not None and self.stop_reason is None and self.policy.blocked(self) == 'deadline':
+            # The request was cut short at the session deadline
+            self.stop_reason = 'deadline'
+            return
+        self.failed = True
+        write_signal(self.signal_log, self.source, 'error', {
+            'message': str(e)[:500],
+            'role': self.role,
+        })
+
+    def metrics(self) -> dict:
+        """Latency, throughput and token figures of the finished request.
+
+        Times are milliseconds from sending the request (None if the stage
+        was never reached). Without provider usage data, output tokens are
+        estimated at four characters each and flagged as estimated.
+        """
+        end = time.monotonic()
+
+        def since_start(t):
+            return round((t - self.started) * 1000, 1) if t is not None else None
+
+        usage = self.usage or {}
+        output_tokens = usage.get('output_tokens', 0)
+        estimated = not output_tokens and self.output_chars > 0
+        if estimated:
+            output_tokens = self.output_chars // 4
+        generating = end - self.first_token if self.first_token is not None else 0
+        return {
+            'provider': self.source,
+            'model': self.model,
+            'role': self.role,
+            'file': self.file_path,
+            'queue_ms': round((self.started - self.created) * 1000, 1),
+            'connect_ms': since_start(self.connected_at),
+            'ttft_ms': since_start(self.first_token),
+            'ttff_ms': since_start(self.first_finding),
+            'total_ms': since_start(end),
+            'prompt_tokens': usage.get('prompt_tokens', 0),
+            'cached_tokens': usage.get('cached_tokens', 0),
+            'output_tokens': output_tokens,
+            'tokens_estimated': estimated,
+            'output_tokens_per_s': round(output_tokens / generating, 1) if generating > 0 else None,
+            'parse_cpu_ms': round(self.parse_cpu * 1000, 2),
+            'retries': self.retries,
+            'findings': len(self.findings),
+            'error': self.failed,
+            'stopped': self.stop_reason,
+            'hedged': self.hedged,
+        }
+
+    def result(self) -> list:
+        self._accept(self.parser.finish())
+        if self.usage is not None:
+            write_signal(self.signal_log, self.source, 'usage', dict(
+                self.usage, role=self.role, file=self.file_path))
+        # Final parse attempt on complete text
+        if not self.findings:
+            self._accept(extract_findings_from_text(self.parser.text))
+        if self.stop_reason:
+            write_signal(self.signal_log, self.source, 'stream_stopped', {
+                'reason': self.stop_reason, 'role': self.role, 'file': self.file_path,
+                'findings': len(self.findings),
+            })
+        if self.started is not None:
+            write_signal(self.signal_log, self.source, 'stream_metrics', self.metrics())
+        return self.findings
+
+
+class MultiRoleCollector(StreamCollector):
+    """Collector for a multi-role request: each parsed finding is routed by
+    its "role" tag to that role's findings, so per-role signals and outputs
+    fill in as the shared response streams."""
+
+    def __init__(self, signal_log: str, source: str, file_path: str, roles: list):
+        super().__init__(signal_log, source, file_path, ','.join(roles))
+        self.roles = list(roles)
+        self.role_seen = {role: set() for role in self.roles}
+        self.by_role = {role: [] for role in self.roles}
+
+    def spawn(self):
+        return MultiRoleCollector(self.signal_log, self.source, self.file_path, self.roles)
+
+    def _match_role(self, tag) -> str:
+        """The requested role a finding's tag names; untagged or unknown
+        findings go to the first role."""
+        tag = str(tag or '').strip().lower()
+        for role in self.roles:
+            if tag == role.lower():
+                return role
+        for role in self.roles:
+            if tag and (role.lower().startswith(tag) or tag.startswith(role.lower().split('-')[0])):
+                return role
+        return self.roles[0]
+
+    def _accept(self, findings: list):
+        for finding in findings:
+            role = self._match_role(finding.pop('role', ''))
+            before = len(self.by_role[role])
+            record_findings([finding], self.role_seen[role], self.by_role[role],
+                            self.signal_log, self.source, self.file_path)
+            if len(self.by_role[role]) > before:
+                self.findings.append(finding)
+
+
+class SegmentCollector(StreamCollector):
+    """Collector for one segment of a large file: finding lines are mapped
+    back to the original file before they are signalled."""
+
+    def __init__(self, signal_log: str, source: str, file_path: str, role: str, segment: dict):
+        super().__init__(signal_log, source, file_path, role)
+        self.segment = segment
+
+    def spawn(self):
+        return SegmentCollector(self.signal_log, self.source, self.file_path, self.role, self.segment)
+
+    def _accept(self, findings: list):
+        for finding in findings:
+            finding['line'] = segment_line(finding.get('line'), self.segment)
+        super()._accept(findings)
+
+    def metrics(self) -> dict:
+        return dict(super().metrics(), segment=self.segment['index'])
+
+
+def _close_quietly(stream):
+    """Close a provider stream left early so its connection is released."""
+    try:
+        stream.close()
+    except Exception:
+        pass
 
 
 def stream_codex(file_path: str, role: str, prompt: str, session_dir: str,
-                 model: str = "gpt-5.4", timeout: int = 120) -> list:
+                 model: str = "gpt-5.4", timeout: int = 120, cache_key: str = '',
+                 collector: 'StreamCollector' = None) -> list:
     """Stream review using OpenAI API (Responses API or Chat Completions)."""
     from openai import OpenAI
 
     client = OpenAI()
-    signal_log = os.path.join(session_dir, 'signals.jsonl')
-    all_findings = []
-    accumulated_text = ""
-    seen_findings = set()
+    collector = collector or StreamCollector(
+        os.path.join(session_dir, 'signals.jsonl'), 'codex', file_path, role)
 
     try:
         # Use streaming chat completion
-        stream = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": "You are a code reviewer. Output findings as JSON."},
-                {"role": "user", "content": prompt}
-            ],
-            stream=True,
-            timeout=timeout,
-        )
+        collector.begin(model)
+        stream = client.chat.completions.create(**codex_request(prompt, model, timeout, cache_key))
+        collector.connected(stream)
 
         for chunk in stream:
             if chunk.choices and chunk.choices[0].delta.content:
-                delta = chunk.choices[0].delta.content
-                accumulated_text += delta
-
-                # Try to extract findings from accumulated text periodically
-                new_findings = extract_findings_from_text(accumulated_text)
-                for finding in new_findings:
-                    # Deduplicate by title+file+line
-                    key = f"{finding.get('title', '')}:{finding.get('file', '')}:{finding.get('line', 0)}"
-                    if key not in seen_findings:
-                        seen_findings.add(key)
-                        finding.setdefault('file', file_path)
-                        all_findings.append(finding)
-
-                        # Write real-time signal
-                        write_signal(signal_log, 'codex', 'finding_stream', finding)
-
-                        # Alert on critical findings immediately
-                        if finding.get('severity') == 'critical':
-                            write_signal(signal_log, 'codex', 'critical_alert', {
-                                'title': finding.get('title', ''),
-                                'file': finding.get('file', file_path),
-                                'line': finding.get('line', 0),
-                            })
+                # Each delta is parsed once; findings surface as they close
+                collector.feed(chunk.choices[0].delta.content)
+            if getattr(chunk, 'usage', None):
+                collector.codex_usage(chunk.usage)
 
+    except StopStream:
+        _close_quietly(stream)
     except Exception as e:
-        write_signal(signal_log, 'codex', 'error', {
-            'message': str(e)[:500],
-            'role': role,
-        })
-
-    # Final parse attempt on complete text
-    if not all_findings:
-        all_findings = extract_findings_from_text(accumulated_text)
-        for f in all_findings:
-            f.setdefault('file', file_path)
-            write_signal(signal_log, 'codex', 'finding_stream', f)
+        collector.error(e)
 
-    return all_findings
+    return collector.result()
 
 
 def stream_gemini(file_path: str, role: str, prompt: str, session_dir: str,
-                  model: str = "gemini-3-pro-preview", timeout: int = 120) -> list:
+                  model: str = "gemini-3-pro-preview", timeout: int = 120,
+                  collector: 'StreamCollector' = None) -> list:
     """Stream review using Google GenAI API."""
-    signal_log = os.path.join(session_dir, 'signals.jsonl')
-    all_findings = []
-    accumulated_text = ""
-    seen_findings = set()
+    collector = collector or StreamCollector(
+        os.path.join(session_dir, 'signals.jsonl'), 'gemini', file_path, role)
 
     try:
         import google.genai as genai
 
         client = genai.Client()
 
+        collector.begin(model)
         stream = client.models.generate_content_stream(
             model=model,
             contents=prompt,
         )
+        collector.connected(stream)
 
         for chunk in stream:
             if chunk.text:
-                accumulated_text += chunk.text
-
-                new_findings = extract_findings_from_text(accumulated_text)
-                for finding in new_findings:
-                    key = f"{finding.get('title', '')}:{finding.get('file', '')}:{finding.get('line', 0)}"
-                    if key not in seen_findings:
-                        seen_findings.add(key)
-                        finding.setdefault('file', file_path)
-                        all_findings.append(finding)
-
-                        write_signal(signal_log, 'gemini', 'finding_stream', finding)
-
-                        if finding.get('severity') == 'critical':
-                            write_signal(signal_log, 'gemini', 'critical_alert', {
-                                'title': finding.get('title', ''),
-                                'file': finding.get('file', file_path),
-                                'line': finding.get('line', 0),
-                            })
+                collector.feed(chunk.text)
+            if getattr(chunk, 'usage_metadata', None):
+                collector.gemini_usage(chunk.usage_metadata)
 
+    except StopStream:
+        _close_quietly(stream)
     except ImportError:
         # Fallback: try google.generativeai (older SDK)
         try:
@@ -224,109 +920,1330 @@ def stream_gemini(file_path: str, role: str, prompt: str, session_dir: str,
             genai_old.configure()
             gen_model = genai_old.GenerativeModel(model)
 
+            collector.begin(model)
             response = gen_model.generate_content(prompt, stream=True)
+            collector.connected()
             for chunk in response:
                 if chunk.text:
-                    accumulated_text += chunk.text
-                    new_findings = extract_findings_from_text(accumulated_text)
-                    for finding in new_findings:
-                        key = f"{finding.get('title', '')}:{finding.get('file', '')}:{finding.get('line', 0)}"
-                        if key not in seen_findings:
-                            seen_findings.add(key)
-                            finding.setdefault('file', file_path)
-                            all_findings.append(finding)
-                            write_signal(signal_log, 'gemini', 'finding_stream', finding)
+                    collector.feed(chunk.text)
 
+        except StopStream:
+            pass
         except Exception as e:
-            write_signal(signal_log, 'gemini', 'error', {
-                'message': str(e)[:500],
-                'role': role,
-            })
+            collector.error(e)
 
     except Exception as e:
-        write_signal(signal_log, 'gemini', 'error', {
-            'message': str(e)[:500],
-            'role': role,
-        })
+        collector.error(e)
+
+    return collector.result()
+
+
+def codex_messages(prompt: str) -> list:
+    return [
+        {"role": "system", "content": "You are a code reviewer. Output findings as JSON."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def codex_request(prompt: str, model: str, timeout: int, cache_key: str = '') -> dict:
+    """Chat Completions streaming request with usage reporting enabled.
+
+    prompt_cache_key (sent as an extra body field so older SDKs accept it)
+    routes all roles reviewing one file to the same prompt cache.
+    """
+    request = {
+        'model': model,
+        'messages': codex_messages(prompt),
+        'stream': True,
+        'stream_options': {'include_usage': True},
+        'timeout': timeout,
+    }
+    if cache_key:
+        request['extra_body'] = {'prompt_cache_key': cache_key}
+    return request
+
+
+def role_prompt_file(role: str) -> str:
+    """Path of the role-specific prompt template."""
+    plugin_dir = Path(__file__).parent.parent
+    return str(plugin_dir / 'config' / 'review-prompts' / f'{role}.txt')
+
+
+def load_config(config_path: str) -> dict:
+    if config_path and os.path.exists(config_path):
+        try:
+            with open(config_path) as f:
+                return json.load(f)
+        except Exception:
+            pass
+    return {}
+
+
+def model_settings(config: dict, model: str) -> tuple:
+    """(model variant, timeout seconds) for codex or gemini."""
+    default_variant = 'gpt-5.4' if model == 'codex' else 'gemini-3-pro-preview'
+    timeout = config.get('timeout', config.get('fallback', {}).get('external_cli_timeout_seconds', 120))
+    variant = config.get('models', {}).get(model, {}).get('model_variant', default_variant)
+    return variant or default_variant, timeout
+
 
-    if not all_findings:
-        all_findings = extract_findings_from_text(accumulated_text)
-        for f in all_findings:
-            f.setdefault('file', file_path)
-            write_signal(signal_log, 'gemini', 'finding_stream', f)
+def review_output(model: str, role: str, file_path: str, findings: list,
+                  usage: dict = None) -> dict:
+    output = {
+        'model': model,
+        'role': role,
+        'file': file_path,
+        'findings': findings,
+        'summary': f"Streaming review completed. Found {len(findings)} issues.",
+        'streaming': True,
+    }
+    if usage:
+        output['usage'] = usage
+    return output
+
+
+def _has_async_sdk(model: str) -> bool:
+    try:
+        if model == 'codex':
+            from openai import AsyncOpenAI
+        else:
+            import google.genai
+        return True
+    except ImportError:
+        return False
+
+
+def stop_marker(collectors: list) -> dict:
+    """Output fields marking a review whose stream(s) were stopped early.
 
-    return all_findings
+    A deadline stop also sets error, so the review counts as failed and
+    stream-orchestrator.sh re-runs it through the sync review script.
+    """
+    reasons = sorted({c.stop_reason for c in collectors if c.stop_reason})
+    if not reasons:
+        return {}
+    marker = {'partial': True, 'stopped': ','.join(reasons)}
+    if 'deadline' in reasons:
+        marker['error'] = 'stopped at the session deadline'
+    return marker
+
+
+def multi_role_outputs(model: str, file_path: str, collector: MultiRoleCollector) -> list:
+    """One review output per role of a multi-role request, in role order."""
+    outputs = []
+    for role in collector.roles:
+        output = review_output(model, role, file_path, collector.by_role[role], collector.usage)
+        output['request_roles'] = collector.roles
+        outputs.append(output)
+    return outputs
 
 
 def main():
     parser = argparse.ArgumentParser(description='Streaming Review Engine')
     parser.add_argument('model', choices=['codex', 'gemini'], help='Model to use')
     parser.add_argument('file_path', help='Path to file being reviewed')
-    parser.add_argument('role', help='Review role')
+    parser.add_argument('role', nargs='?', default='', help='Review role')
+    parser.add_argument('--roles', default='',
+                        help='Comma-separated roles reviewed in one request (one JSON line per role)')
     parser.add_argument('--config', default='', help='Config file path')
     parser.add_argument('--session-dir', default=os.environ.get('SESSION_DIR', '/tmp/ai-review-arena'),
                         help='Session directory')
     args = parser.parse_args()
+    roles = [r.strip() for r in args.roles.split(',') if r.strip()]
+    if not roles and not args.role:
+        parser.error('a role or --roles is required')
+    if len(roles) == 1:
+        args.role, roles = roles[0], []
 
     # Read file content
     try:
         with open(args.file_path, 'r', encoding='utf-8', errors='ignore') as f:
             file_content = f.read()
     except Exception as e:
-        print(json.dumps({
-            'model': args.model, 'role': args.role, 'file': args.file_path,
-            'error': str(e), 'findings': []
-        }))
+        for role in roles or [args.role]:
+            print(json.dumps({
+                'model': args.model, 'role': role, 'file': args.file_path,
+                'error': str(e), 'findings': []
+            }))
         sys.exit(0)
 
-    # Resolve prompt file
-    script_dir = Path(__file__).parent
-    plugin_dir = script_dir.parent
-    prompt_file = str(plugin_dir / 'config' / 'review-prompts' / f'{args.role}.txt')
-
     # Load config
-    model_variant = ""
-    timeout = 120
-    if args.config and os.path.exists(args.config):
-        try:
-            with open(args.config) as f:
-                config = json.load(f)
-            timeout = config.get('timeout', config.get('fallback', {}).get('external_cli_timeout_seconds', 120))
-            if args.model == 'codex':
-                model_variant = config.get('models', {}).get('codex', {}).get('model_variant', 'gpt-5.4')
-            else:
-                model_variant = config.get('models', {}).get('gemini', {}).get('model_variant', 'gemini-3-pro-preview')
-        except Exception:
-            pass
-
-    if not model_variant:
-        model_variant = 'gpt-5.4' if args.model == 'codex' else 'gemini-3-pro-preview'
+    config = load_config(args.config)
+    configure_signal_log(config)
+    model_variant, timeout = model_settings(config, args.model)
 
-    # Build prompt
-    prompt = build_prompt(args.file_path, file_content, args.role, prompt_file)
+    # Large files (concurrent segment reviews) and hedged requests go
+    # through the async clients
+    large = not roles and len(file_content) >= segment_settings(config)['min_file_bytes']
+    hedging = config.get('streaming', {}).get('hedging', {}).get('enabled', False)
+    if (large or hedging) and _has_async_sdk(args.model):
+        import asyncio
+        os.makedirs(args.session_dir, exist_ok=True)
+        jobs = [{'file': args.file_path, 'role': role, 'model': args.model}
+                for role in roles or [args.role]]
+        for output in asyncio.run(run_multi(jobs, config, args.session_dir)):
+            print(json.dumps(output, ensure_ascii=False))
+        return
 
-    # Ensure session dir exists
+    # Unchanged file, prompts and model: reuse the last run's outputs
     os.makedirs(args.session_dir, exist_ok=True)
+    signal_log = os.path.join(args.session_dir, 'signals.jsonl')
+    review_cache = ReviewCache.from_config(config)
+    cache_keys = {}
+    if review_cache is not None:
+        cache_keys = {role: review_cache.key(args.model, model_variant, role, args.file_path, file_content)
+                      for role in roles or [args.role]}
+        cached = [review_cache.get(key) for key in cache_keys.values()]
+        if all(cached):
+            for output in cached:
+                review_cache.replay(output, signal_log)
+                print(json.dumps(output, ensure_ascii=False))
+            review_cache.report(signal_log)
+            return
+
+    # Build prompt
+    if roles:
+        prompt = ''.join(build_multi_role_parts(args.file_path, file_content, roles))
+    else:
+        prompt = build_prompt(args.file_path, file_content, args.role, role_prompt_file(args.role))
 
     # Stream review
-    if args.model == 'codex':
-        findings = stream_codex(args.file_path, args.role, prompt, args.session_dir,
-                                model=model_variant, timeout=timeout)
+    if roles:
+        collector = MultiRoleCollector(signal_log, args.model, args.file_path, roles)
+    else:
+        collector = StreamCollector(signal_log, args.model, args.file_path, args.role)
+    collector.policy = EarlyStopPolicy(config)
+    timeout, _ = collector.policy.time_limit(timeout, collector)
+    if collector.policy.blocked(collector):
+        collector.stop_reason = collector.policy.blocked(collector)
+        findings = collector.result()
+    elif args.model == 'codex':
+        findings = stream_codex(args.file_path, collector.role, prompt, args.session_dir,
+                                model=model_variant, timeout=timeout,
+                                cache_key=prompt_cache_key(args.file_path, file_content),
+                                collector=collector)
     else:
-        findings = stream_gemini(args.file_path, args.role, prompt, args.session_dir,
-                                 model=model_variant, timeout=timeout)
+        findings = stream_gemini(args.file_path, collector.role, prompt, args.session_dir,
+                                 model=model_variant, timeout=timeout, collector=collector)
 
-    # Output normalized JSON
-    output = {
-        'model': args.model,
-        'role': args.role,
-        'file': args.file_path,
-        'findings': findings,
-        'summary': f"Streaming review completed. Found {len(findings)} issues.",
-        'streaming': True,
+    # Output normalized JSON (one line per role for --roles)
+    if roles:
+        outputs = multi_role_outputs(args.model, args.file_path, collector)
+    else:
+        outputs = [review_output(args.model, args.role, args.file_path, findings, collector.usage)]
+    for output in outputs:
+        output.update(stop_marker([collector]))
+        if review_cache is not None:
+            review_cache.put(cache_keys[output['role']], output)
+        print(json.dumps(output, ensure_ascii=False))
+    if review_cache is not None:
+        review_cache.evict()
+        review_cache.report(signal_log)
+
+
+# =============================================================================
+# Cross-Run Review Result Cache
+# =============================================================================
+
+# Bump when prompt construction or output shape changes in a way the
+# template and schema contents do not capture
+REVIEW_CACHE_VERSION = 1
+
+# The injection scan cache-manager.sh write applies (validate_cache_content in
+# utils.sh reads the same file); model output must pass it before it is reused
+# in later sessions
+CACHE_INJECTION_PATTERNS_FILE = Path(__file__).parent.parent / 'config' / 'cache-injection-patterns.txt'
+_cache_injection_patterns = None
+
+
+def load_cache_injection_patterns(path=CACHE_INJECTION_PATTERNS_FILE) -> list:
+    """[(name, compiled regex)] from the shared pattern file.
+
+    Lines are tab-separated "<grep mode> <name> <regex>"; a PCRE code point
+    escape (x{HHHH}) becomes U+HHHH, everything else is matched
+    case-insensitively as written.
+    """
+    patterns = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            parts = line.rstrip('\n').split('\t')
+            if len(parts) != 3 or parts[0] not in ('E', 'P'):
+                continue
+            regex = re.sub(r'\\x\{([0-9A-Fa-f]{1,6})\}',
+                           lambda m: '\\U%08x' % int(m.group(1), 16), parts[2])
+            patterns.append((parts[1], re.compile(regex, re.I)))
+    return patterns
+
+
+def cache_injection_match(text: str):
+    """Name of the first injection pattern found in text, or None if clean.
+
+    An unreadable pattern file rejects everything, as utils.sh does.
+    """
+    global _cache_injection_patterns
+    if _cache_injection_patterns is None:
+        try:
+            _cache_injection_patterns = load_cache_injection_patterns()
+        except OSError:
+            return 'unreadable pattern file'
+    for name, pattern in _cache_injection_patterns:
+        if pattern.search(text):
+            return name
+    return None
+
+
+class ReviewCache:
+    """Review outputs reused across runs for unchanged (file, role, model) jobs.
+
+    Entries live in REVIEW_CACHE_DIR (the orchestrators point it at the
+    project's cache-manager.sh "review-results" category) as <key> plus an
+    epoch <key>.timestamp, so cache-manager.sh list/cleanup cover them too.
+    The key hashes the file path and content, provider, model variant, role,
+    role prompt template and review schema: editing any of them is a miss.
+    Only complete outputs are stored (no error, not stopped early), and
+    only if they pass the same injection scan as cache-manager.sh write.
+    """
+
+    def __init__(self, directory: str, ttl_seconds: float, max_bytes: int):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = self.misses = self.stored = self.rejected = 0
+
+    @classmethod
+    def from_config(cls, config: dict):
+        """The cache from cache.review_results, or None when disabled or unset."""
+        cache_cfg = config.get('cache', {})
+        results_cfg = cache_cfg.get('review_results', {})
+        directory = os.environ.get('REVIEW_CACHE_DIR', '')
+        if not directory or cache_cfg.get('enabled', True) is False or \
+                results_cfg.get('enabled', True) is False:
+            return None
+        return cls(directory, results_cfg.get('ttl_days', 3) * 86400,
+                   int(results_cfg.get('max_size_mb', 20) * 1024 * 1024))
+
+    def key(self, model: str, variant: str, role: str, file_path: str, content: str) -> str:
+        import hashlib
+        schema_path = Path(__file__).parent.parent / 'config' / 'schemas' / 'codex-review.json'
+        digest = hashlib.sha256()
+        for part in (str(REVIEW_CACHE_VERSION), model, variant, role, file_path, content,
+                     _read_template(role_prompt_file(role)), _read_template(str(schema_path))):
+            digest.update(part.encode('utf-8', errors='ignore'))
+            digest.update(b'\0')
+        return f"stream-{digest.hexdigest()[:40]}"
+
+    def get(self, key: str):
+        """The stored output marked "cached", or None if missing or expired."""
+        path = os.path.join(self.directory, key)
+        try:
+            with open(f"{path}.timestamp") as f:
+                stored = int(f.read().strip() or 0)
+            if time.time() - stored > self.ttl_seconds:
+                raise ValueError('expired')
+            with open(path) as f:
+                output = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        output['cached'] = True
+        return output
+
+    def put(self, key: str, output: dict):
+        if output.get('error') or output.get('partial') or output.get('cached'):
+            return
+        match = cache_injection_match(json.dumps(output, ensure_ascii=False))
+        if match:
+            self.rejected += 1
+            print(f"Warning: review cache write rejected for {key}: {match} pattern detected",
+                  file=sys.stderr)
+            return
+        path = os.path.join(self.directory, key)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            write_output(path, output)
+            tmp = f"{path}.timestamp.tmp.{os.getpid()}"
+            with open(tmp, 'w') as f:
+                f.write(f"{int(time.time())}\n")
+            os.replace(tmp, f"{path}.timestamp")
+            self.stored += 1
+        except OSError as e:
+            print(f"Warning: review cache write failed: {e}", file=sys.stderr)
+
+    def replay(self, output: dict, signal_log: str):
+        """Signal cached findings as if streamed, so the monitor sees them."""
+        record_findings([dict(f) for f in output.get('findings', [])], set(), [],
+                        signal_log, output.get('model', ''), output.get('file', ''))
+
+    def evict(self):
+        """Drop expired entries, then the oldest ones until under max_bytes."""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        entries, total = [], 0
+        for name in names:
+            if name.endswith('.timestamp') or '.tmp.' in name:
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        now = time.time()
+        for mtime, size, path in sorted(entries):
+            if total <= self.max_bytes and now - mtime <= self.ttl_seconds:
+                break
+            for stale in (path, f"{path}.timestamp"):
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+            total -= size
+
+    def report(self, signal_log: str):
+        write_signal(signal_log, 'cache', 'review_cache', {
+            'hits': self.hits, 'misses': self.misses, 'stored': self.stored,
+            'rejected': self.rejected})
+
+
+# =============================================================================
+# Large-File Segmenting
+# =============================================================================
+
+_IMPORT_LINE = re.compile(
+    r'^(?:import\s|from\s+\S+\s+import\s|#\s*include\s|using\s|package\s|use\s|require[\s(]'
+    r'|(?:const|let|var)\s+\w+\s*=\s*require\()')
+
+_rag_module = []
+
+
+def _rag_engine():
+    """scripts/rag-engine.py loaded as a module (its chunker supplies the
+    segment boundaries), or None if it cannot be loaded."""
+    if not _rag_module:
+        import importlib.util
+        try:
+            spec = importlib.util.spec_from_file_location(
+                'rag_engine', Path(__file__).parent / 'rag-engine.py')
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            _rag_module.append(module)
+        except Exception:
+            _rag_module.append(None)
+    return _rag_module[0]
+
+
+def segment_settings(config: dict) -> dict:
+    cfg = config.get('streaming', {}).get('segmenting', {})
+    return {
+        'enabled': cfg.get('enabled', True),
+        'min_file_bytes': cfg.get('min_file_bytes', 60000),
+        'segment_chars': cfg.get('segment_chars', 24000),
+        'max_segments': cfg.get('max_segments', 16),
+        'header_max_chars': cfg.get('header_max_chars', 4000),
     }
-    print(json.dumps(output, ensure_ascii=False))
+
+
+def segment_header(content: str, chunks: list, max_chars: int) -> str:
+    """Imports and definition signatures of the whole file, shared by every
+    segment so each one is reviewed knowing what the rest defines."""
+    entries = [line.rstrip() for line in content.splitlines() if _IMPORT_LINE.match(line)]
+    for chunk in chunks:
+        text = chunk.get('content', '').strip()
+        if chunk.get('symbol') and text:
+            entries.append(f"{text.splitlines()[0].strip()}  [line {chunk['start_line']}]")
+    header = ''
+    for entry in entries:
+        if len(header) + len(entry) + 1 > max_chars:
+            header += '...\n'
+            break
+        header += entry + '\n'
+    return header
+
+
+def segment_file(file_path: str, content: str, settings: dict) -> tuple:
+    """(header, segments) for a file large enough to be reviewed in parts.
+
+    Segments are contiguous line ranges that together cover the file once.
+    They are cut at the chunk starts rag-engine's chunk_file computes
+    (tree-sitter definitions or regex signatures), falling back to a plain
+    line cut only when a single unit is larger than a segment. Segment size
+    grows so a file never needs more than max_segments requests. Files
+    below min_file_bytes give ('', []).
+    """
+    import bisect
+    if not settings['enabled'] or len(content.encode('utf-8', errors='ignore')) < settings['min_file_bytes']:
+        return '', []
+    engine = _rag_engine()
+    chunks = []
+    if engine is not None:
+        try:
+            chunks = engine.chunk_file(content, file_path)
+        except Exception:
+            chunks = []
+
+    lines = content.splitlines(keepends=True)
+    total = len(lines)
+    pos = [0]
+    for line in lines:
+        pos.append(pos[-1] + len(line))
+    limit = max(settings['segment_chars'], -(-pos[-1] // max(1, settings['max_segments'])))
+
+    def top_level(n: int) -> bool:
+        return bool(lines[n - 1].strip()) and not lines[n - 1][:1].isspace()
+
+    cuts = set()
+    for chunk in chunks:
+        line = chunk.get('start_line', 0)
+        if not 1 < line <= total:
+            continue
+        # Regex chunk starts can sit a few lines off the definition they
+        # belong to; snap to the closest top-level line above
+        for candidate in range(line, max(1, line - 40), -1):
+            if top_level(candidate):
+                line = candidate
+                break
+        cuts.add(line)
+    cuts = sorted(cut for cut in cuts if cut > 1)
+
+    # Prefer cutting before a top-level line; a nested chunk start is next best
+    ranges = []
+    start, last_top, last_any = 1, 0, 0
+    for boundary in cuts + [total + 1]:
+        while pos[boundary - 1] - pos[start - 1] > limit:
+            if last_top > start:
+                end = last_top - 1
+            elif last_any > start:
+                end = last_any - 1
+            else:
+                end = max(start, bisect.bisect_right(pos, pos[start - 1] + limit) - 1)
+            ranges.append((start, end))
+            start = end + 1
+            last_top = last_top if last_top > start else 0
+            last_any = last_any if last_any > start else 0
+        if boundary <= total and top_level(boundary):
+            last_top = boundary
+        last_any = boundary
+    if start <= total:
+        ranges.append((start, total))
+
+    segments = [{
+        'index': i + 1, 'count': len(ranges), 'start': a, 'end': b,
+        'total_lines': total, 'text': ''.join(lines[a - 1:b]),
+    } for i, (a, b) in enumerate(ranges)]
+    return segment_header(content, chunks, settings['header_max_chars']), segments
+
+
+def build_segment_prefix(file_path: str, header: str, segment: dict) -> str:
+    """Shared prompt prefix for one segment (outline, then the segment)."""
+    return f"""Source file under review, split into {segment['count']} segments because of its size; this is segment {segment['index']} (lines {segment['start']}-{segment['end']} of {segment['total_lines']}). Review instructions follow after the file.
+
+--- FILE OUTLINE: {file_path} (imports and definitions, for context only) ---
+{header}--- END OUTLINE ---
+
+--- FILE: {file_path} (lines {segment['start']}-{segment['end']}) ---
+{segment['text']}
+--- END FILE ---
+Count finding line numbers from the first line of this segment (line 1 = file line {segment['start']}).
+"""
+
+
+def segment_line(line, segment: dict) -> int:
+    """Map a segment-relative line back to the file. A line that is only
+    valid as an absolute line of this segment is kept; anything else
+    points at the segment start."""
+    try:
+        line = int(line)
+    except (TypeError, ValueError):
+        return segment['start']
+    if 1 <= line <= segment['end'] - segment['start'] + 1:
+        return segment['start'] + line - 1
+    if segment['start'] <= line <= segment['end']:
+        return line
+    return segment['start']
+
+
+def merge_segment_results(collectors: list) -> tuple:
+    """(findings, usage) of a segmented review, deduplicated across segments."""
+    findings, seen = [], set()
+    usage = {}
+    for collector in collectors:
+        for finding in collector.findings:
+            key = f"{finding.get('title', '')}:{finding.get('line', 0)}"
+            if key not in seen:
+                seen.add(key)
+                findings.append(finding)
+        for name, count in (collector.usage or {}).items():
+            usage[name] = usage.get(name, 0) + count
+    return findings, usage or None
+
+
+# =============================================================================
+# Multi-Review (asyncio fan-out)
+# =============================================================================
+
+class ProviderLimiter:
+    """Per-provider concurrency cap plus optional requests-per-minute pacing."""
+
+    def __init__(self, max_concurrency: int, requests_per_minute: float = 0):
+        import asyncio
+        self._slots = asyncio.Semaphore(max(1, int(max_concurrency)))
+        self._interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        import asyncio
+        await self._slots.acquire()
+        if self._interval:
+            async with self._lock:
+                now = asyncio.get_running_loop().time()
+                delay = self._next_start - now
+                self._next_start = max(now, self._next_start) + self._interval
+            if delay > 0:
+                await asyncio.sleep(delay)
+        return self
+
+    async def __aexit__(self, *exc):
+        self._slots.release()
+
+
+async def astream_codex(client, collector: StreamCollector, prompt: str, model: str, timeout: int,
+                        cache_key: str = '', cached_content: str = ''):
+    collector.begin(model)
+    stream = await client.chat.completions.create(**codex_request(prompt, model, timeout, cache_key))
+    collector.connected(stream)
+    try:
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                collector.feed(chunk.choices[0].delta.content)
+            if getattr(chunk, 'usage', None):
+                collector.codex_usage(chunk.usage)
+    finally:
+        await _aclose_quietly(stream)
+
+
+async def astream_gemini(client, collector: StreamCollector, prompt: str, model: str, timeout: int,
+                         cache_key: str = '', cached_content: str = ''):
+    """With cached_content, prompt is only the role suffix; the file prefix
+    is served from the explicit cache."""
+    kwargs = {'model': model, 'contents': prompt}
+    if cached_content:
+        from google.genai import types
+        kwargs['config'] = types.GenerateContentConfig(cached_content=cached_content)
+    collector.begin(model)
+    stream = await client.models.generate_content_stream(**kwargs)
+    collector.connected(stream)
+    try:
+        async for chunk in stream:
+            if chunk.text:
+                collector.feed(chunk.text)
+            if getattr(chunk, 'usage_metadata', None):
+                collector.gemini_usage(chunk.usage_metadata)
+    finally:
+        await _aclose_quietly(stream)
+
+
+async def _aclose_quietly(stream):
+    """Release an async provider stream (also when it was stopped early)."""
+    close = getattr(stream, 'close', None) or getattr(stream, 'aclose', None)
+    if close is None:
+        return
+    try:
+        result = close()
+        if hasattr(result, '__await__'):
+            await result
+    except Exception:
+        pass
+
+
+class GeminiPrefixCache:
+    """Explicit Gemini context caches for file prefixes shared by several roles.
+
+    Gemini's implicit caching is best effort, so when two or more jobs in a
+    run review the same large file with the same model, the prefix is
+    uploaded once as cached content and each role sends only its suffix.
+    Any failure falls back to sending the full prompt.
+    """
+
+    def __init__(self, client, min_chars: int, ttl_seconds: int):
+        import asyncio
+        self.client = client
+        self.min_chars = min_chars
+        self.ttl_seconds = ttl_seconds
+        self.names = {}
+        self.lock = asyncio.Lock()
+
+    async def get(self, key: tuple, prefix: str) -> str:
+        """Cache name for key, creating it on first use; '' when unavailable."""
+        if len(prefix) < self.min_chars:
+            return ''
+        async with self.lock:
+            if key not in self.names:
+                try:
+                    from google.genai import types
+                    cache = await self.client.caches.create(
+                        model=key[-1],
+                        config=types.CreateCachedContentConfig(
+                            contents=[prefix], ttl=f"{self.ttl_seconds}s"))
+                    self.names[key] = cache.name
+                except Exception as e:
+                    print(f"Warning: Gemini prompt cache unavailable: {e}", file=sys.stderr)
+                    self.names[key] = ''
+            return self.names[key]
+
+    async def close(self):
+        for name in self.names.values():
+            if not name:
+                continue
+            try:
+                await self.client.caches.delete(name=name)
+            except Exception:
+                pass
+
+
+class HedgePolicy:
+    """When to hedge a streaming request on an alternate model (streaming.hedging).
+
+    A request whose first token has not arrived after its provider/model's
+    measured p95 time to first token, or that fails before producing any
+    output, is sent again to alternate_models[provider]. The p95 comes from
+    stream_metrics in STREAM_METRICS_HISTORY (earlier sessions) plus this
+    session's signal log, once min_samples requests are known; until then
+    fallback_delay_seconds is used. At most max_hedges_per_session hedge
+    requests are made per run.
+    """
+
+    def __init__(self, config: dict, signal_log: str):
+        cfg = config.get('streaming', {}).get('hedging', {})
+        self.enabled = cfg.get('enabled', False)
+        self.alternates = cfg.get('alternate_models', {})
+        self.fallback_delay = cfg.get('fallback_delay_seconds', 30)
+        self.min_delay = cfg.get('min_delay_seconds', 2)
+        self.max_hedges = cfg.get('max_hedges_per_session', 4)
+        self.hedges = 0
+        self.delays = {}
+        if not self.enabled:
+            return
+        paths = [p for p in (os.environ.get('STREAM_METRICS_HISTORY', ''), signal_log)
+                 if p and os.path.exists(p)]
+        for row in summarize_metrics(load_stream_metrics(paths), ('provider', 'model')):
+            if row['ttft_ms']['n'] >= cfg.get('min_samples', 20):
+                self.delays[(row['provider'], row['model'])] = row['ttft_ms']['p95'] / 1000.0
+
+    def delay(self, provider: str, variant: str):
+        """Seconds to wait for a first token before hedging, or None if the
+        request is never hedged."""
+        alternate = self.alternates.get(provider)
+        if not self.enabled or not alternate or alternate == variant:
+            return None
+        return max(self.min_delay, self.delays.get((provider, variant), self.fallback_delay))
+
+    def acquire(self) -> bool:
+        """Take one hedge from the session cap."""
+        if self.hedges >= self.max_hedges:
+            return False
+        self.hedges += 1
+        return True
+
+
+class HedgeRace:
+    """The first stream of a hedged pair to produce a finding (or finish)
+    wins; the other is cancelled at once, before it can signal anything."""
+
+    def __init__(self, tasks: dict):
+        import asyncio
+        self.tasks = tasks
+        self.winner = None
+        self.decided = asyncio.Event()
+
+    def claim(self, collector):
+        if self.winner is not None:
+            return
+        self.winner = collector
+        self.decided.set()
+        for other, task in self.tasks.items():
+            if other is not collector:
+                task.cancel()
+
+
+def _open_async_clients(providers: set) -> dict:
+    """One pooled async client per provider; a provider whose SDK is missing
+    maps to the ImportError so its jobs report it."""
+    clients = {}
+    if 'codex' in providers:
+        try:
+            from openai import AsyncOpenAI
+            clients['codex'] = AsyncOpenAI()
+        except Exception as e:
+            clients['codex'] = e
+    if 'gemini' in providers:
+        try:
+            import google.genai as genai
+            clients['gemini'] = genai.Client().aio
+        except Exception as e:
+            clients['gemini'] = e
+    return clients
+
+
+async def _close_async_clients(clients: dict):
+    for client in clients.values():
+        if not isinstance(client, Exception):
+            await _aclose_quietly(client)
+
+
+def write_output(path: str, output: dict):
+    """Write a review result atomically so readers never see partial JSON."""
+    tmp = f"{path}.tmp.{os.getpid()}"
+    with open(tmp, 'w') as f:
+        f.write(json.dumps(output, ensure_ascii=False) + '\n')
+    os.replace(tmp, path)
+
+
+def plan_requests(jobs: list, config: dict) -> list:
+    """Group job indices into model requests.
+
+    Jobs for the same (file, model) are merged into multi-role requests of
+    at most streaming.multi_role.max_roles_per_request roles when the file
+    is no larger than max_file_bytes, where per-request overhead dominates;
+    larger files keep one request per role.
+    """
+    role_cfg = config.get('streaming', {}).get('multi_role', {})
+    max_bytes = role_cfg.get('max_file_bytes', 12000) if role_cfg.get('enabled', True) else -1
+    segmenting = segment_settings(config)
+    if segmenting['enabled']:
+        # Files that get segmented are reviewed per role
+        max_bytes = min(max_bytes, segmenting['min_file_bytes'] - 1)
+    max_roles = max(1, role_cfg.get('max_roles_per_request', 4))
+    groups = {}
+    for index, job in enumerate(jobs):
+        groups.setdefault((job['file'], job['model']), []).append(index)
+    requests = []
+    for (file_path, _), indices in groups.items():
+        try:
+            mergeable = os.path.getsize(file_path) <= max_bytes
+        except OSError:
+            mergeable = False
+        if not mergeable:
+            requests.extend([index] for index in indices)
+            continue
+        for start in range(0, len(indices), max_roles):
+            requests.append(indices[start:start + max_roles])
+    return requests
+
+
+async def run_multi(jobs: list, config: dict, session_dir: str) -> list:
+    """Run (file, role, model) review jobs concurrently in one event loop.
+
+    Streams from all jobs feed the shared signal log as they arrive. Each
+    provider gets one client (one connection pool) and a ProviderLimiter
+    from streaming.multi_review. A job whose output path is set writes its
+    result there; all results are also returned in job order. Prompts put
+    the file first so roles sharing a file share a cacheable prefix
+    (streaming.prompt_cache), small files are reviewed for several roles
+    in one request (plan_requests) and large files as concurrent segments
+    whose findings are merged (segment_file). Jobs unchanged since an
+    earlier run are answered from the ReviewCache without a request.
+    """
+    import asyncio
+    multi_cfg = config.get('streaming', {}).get('multi_review', {})
+    signal_log = os.path.join(session_dir, 'signals.jsonl')
+    file_cache = {}
+    results = [None] * len(jobs)
+
+    def read_file(file_path: str):
+        if file_path not in file_cache:
+            try:
+                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                    file_cache[file_path] = f.read()
+            except Exception as e:
+                file_cache[file_path] = e
+        return file_cache[file_path]
+
+    # Jobs whose file, prompts and model are unchanged since a previous run
+    # are answered from the review cache; only the misses are planned
+    review_cache = ReviewCache.from_config(config)
+    cache_keys = [''] * len(jobs)
+    pending = []
+    for index, job in enumerate(jobs):
+        content = read_file(job['file'])
+        if review_cache is not None and not isinstance(content, Exception):
+            cache_keys[index] = review_cache.key(job['model'], model_settings(config, job['model'])[0],
+                                                 job['role'], job['file'], content)
+            output = review_cache.get(cache_keys[index])
+            if output is not None:
+                review_cache.replay(output, signal_log)
+                if job.get('output'):
+                    write_output(job['output'], output)
+                results[index] = output
+                continue
+        pending.append(index)
+
+    providers = {jobs[index]['model'] for index in pending}
+    clients = _open_async_clients(providers)
+    limiters = {
+        provider: ProviderLimiter(
+            multi_cfg.get('max_concurrency', {}).get(provider, 8),
+            multi_cfg.get('requests_per_minute', {}).get(provider, 0))
+        for provider in providers
+    }
+    streamers = {'codex': astream_codex, 'gemini': astream_gemini}
+    policy = EarlyStopPolicy(config)
+    hedger = HedgePolicy(config, signal_log)
+    requests = [[pending[i] for i in request]
+                for request in plan_requests([jobs[index] for index in pending], config)]
+    segmenting = segment_settings(config)
+    segment_cache = {}
+
+    cache_cfg = config.get('streaming', {}).get('prompt_cache', {})
+    cache_enabled = cache_cfg.get('enabled', True)
+    gemini_cache = None
+    if cache_enabled and not isinstance(clients.get('gemini', ImportError()), Exception):
+        shared = {}
+        for indices in requests:
+            job = jobs[indices[0]]
+            if job['model'] == 'gemini':
+                shared[job['file']] = shared.get(job['file'], 0) + 1
+        if any(count > 1 for count in shared.values()):
+            gemini_cache = GeminiPrefixCache(
+                clients['gemini'],
+                cache_cfg.get('gemini_explicit_cache_min_chars', 16000),
+                cache_cfg.get('gemini_cache_ttl_seconds', 600))
+
+    async def stream_one(model: str, collector: StreamCollector, prefix: str, suffix: str,
+                         cache_key: str, cache_id: tuple):
+        variant, timeout = model_settings(config, model)
+        client = clients.get(model)
+        collector.policy = policy
+        policy.register(collector, asyncio.current_task())
+        deadline_bound = False
+        try:
+            async with limiters[model]:
+                try:
+                    reason = policy.blocked(collector)
+                    if reason:
+                        # Decided while queued: the request is never sent
+                        collector.stop_reason = reason
+                        raise StopStream(reason)
+                    if isinstance(client, Exception) or client is None:
+                        raise client or RuntimeError(f"no client for {model}")
+                    cached_content = ''
+                    if model == 'gemini' and gemini_cache is not None:
+                        cached_content = await gemini_cache.get(cache_id + (variant,), prefix)
+                    prompt = suffix if cached_content else prefix + suffix
+                    limit, deadline_bound = policy.time_limit(timeout, collector)
+                    await asyncio.wait_for(
+                        hedged_stream(model, client, collector, variant, timeout, cache_key,
+                                      prompt, prefix + suffix, cached_content), limit)
+                except StopStream:
+                    pass
+                except asyncio.TimeoutError:
+                    if deadline_bound:
+                        collector.stop_reason = 'deadline'
+                    else:
+                        collector.error(f"timed out after {timeout}s")
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    collector.error(e)
+        except asyncio.CancelledError:
+            # Only a policy stop is absorbed; any other cancellation propagates
+            if collector.stop_reason is None:
+                raise
+            task = asyncio.current_task()
+            if hasattr(task, 'uncancel'):
+                task.uncancel()
+        finally:
+            policy.unregister(collector)
+        return collector.result()
+
+    async def hedged_stream(model: str, client, collector: StreamCollector, variant: str,
+                            timeout: int, cache_key: str, prompt: str, full_prompt: str,
+                            cached_content: str):
+        """Stream into collector; when the first token is late or the request
+        fails before any output, race the alternate model (HedgePolicy) and
+        keep whichever stream yields findings or completes first."""
+        def start(target: StreamCollector, target_variant: str, target_prompt: str, cached: str):
+            return asyncio.ensure_future(streamers[model](
+                client, target, target_prompt, target_variant, timeout, cache_key, cached))
+
+        primary = start(collector, variant, prompt, cached_content)
+        tasks = [primary]
+        hedge = race = None
+        try:
+            delay = hedger.delay(model, variant)
+            if delay is None:
+                return await primary
+            await asyncio.wait({primary}, timeout=delay)
+            failed = primary.done() and not primary.cancelled() and \
+                primary.exception() is not None and not isinstance(primary.exception(), StopStream)
+            if collector.first_token is not None or (primary.done() and not failed) \
+                    or not hedger.acquire():
+                return await primary
+            # The alternate model gets the whole prompt: explicit caches are per model
+            hedge = collector.spawn()
+            hedge.hedged = True
+            hedge.policy = collector.policy
+            tasks.append(start(hedge, hedger.alternates[model], full_prompt, ''))
+            race = HedgeRace({collector: primary, hedge: tasks[1]})
+            collector.race = hedge.race = race
+            decided = asyncio.ensure_future(race.decided.wait())
+            tasks.append(decided)
+            waiting = {primary: collector, tasks[1]: hedge}
+            errors = []
+            while race.winner is None and waiting:
+                done, _ = await asyncio.wait(set(waiting) | {decided},
+                                             return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    member = waiting.pop(task, None)
+                    if member is None or task.cancelled():
+                        continue
+                    if task.exception() is None or isinstance(task.exception(), StopStream):
+                        race.claim(member)
+                    else:
+                        errors.append(task.exception())
+            if race.winner is None:
+                raise errors[0]
+            return await race.tasks[race.winner]
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            if hedge is not None:
+                await asyncio.gather(*tasks, return_exceptions=True)
+                settle_hedge(model, collector, hedge, race, variant, delay, failed)
+
+    def settle_hedge(model: str, collector: StreamCollector, hedge: StreamCollector,
+                     race: HedgeRace, variant: str, delay: float, failed: bool):
+        """Signal the hedge outcome, record the losing stream's metrics and
+        move a winning hedge's results into the job's collector."""
+        loser = collector if race.winner is hedge else hedge
+        if loser.started is not None:
+            metrics = loser.metrics()
+            task = race.tasks[loser]
+            if not task.cancelled() and task.exception() is not None \
+                    and not isinstance(task.exception(), StopStream):
+                metrics['error'] = True
+            elif race.winner is not None:
+                metrics['stopped'] = 'hedge_lost'
+            write_signal(signal_log, model, 'stream_metrics', metrics)
+        winner = {collector: 'primary', hedge: 'alternate'}.get(race.winner)
+        write_signal(signal_log, model, 'hedge', {
+            'role': collector.role, 'file': collector.file_path,
+            'primary': variant, 'alternate': hedger.alternates[model],
+            'reason': 'failed' if failed else 'slow', 'after_ms': round(delay * 1000),
+            'winner': winner,
+        })
+        collector.race = None
+        if race.winner is hedge:
+            collector.adopt(hedge)
+            collector.race = None
+
+    async def run_request(indices: list):
+        model, file_path = jobs[indices[0]]['model'], jobs[indices[0]]['file']
+        roles = [jobs[i]['role'] for i in indices]
+        content = read_file(file_path)
+        if isinstance(content, Exception):
+            outputs = [{'model': model, 'role': role, 'file': file_path,
+                        'error': str(content), 'findings': []} for role in roles]
+        else:
+            if file_path not in segment_cache:
+                segment_cache[file_path] = segment_file(file_path, content, segmenting)
+            outputs = await review_file(model, file_path, roles, content, segment_cache[file_path])
+        for index, output in zip(indices, outputs):
+            if jobs[index].get('output'):
+                write_output(jobs[index]['output'], output)
+            if cache_keys[index]:
+                review_cache.put(cache_keys[index], output)
+            results[index] = output
+
+    async def review_file(model: str, file_path: str, roles: list, content: str,
+                          segmented: tuple) -> list:
+        header, segments = segmented
+        cache_key = prompt_cache_key(file_path, content) if cache_enabled else ''
+        if len(roles) > 1:
+            prefix, suffix = build_multi_role_parts(file_path, content, roles)
+            collector = MultiRoleCollector(signal_log, model, file_path, roles)
+            await stream_one(model, collector, prefix, suffix, cache_key, (file_path, 0))
+            outputs = multi_role_outputs(model, file_path, collector)
+            for output in outputs:
+                output.update(stop_marker([collector]))
+        elif segments:
+            _, suffix = build_prompt_parts(file_path, '', roles[0], role_prompt_file(roles[0]))
+            collectors = [SegmentCollector(signal_log, model, file_path, roles[0], segment)
+                          for segment in segments]
+            await asyncio.gather(*(
+                stream_one(model, collector, build_segment_prefix(file_path, header, collector.segment),
+                           suffix, f"{cache_key}-s{collector.segment['index']}" if cache_key else '',
+                           (file_path, collector.segment['start']))
+                for collector in collectors))
+            findings, usage = merge_segment_results(collectors)
+            output = review_output(model, roles[0], file_path, findings, usage)
+            output['segments'] = [[c.segment['start'], c.segment['end']] for c in collectors]
+            output.update(stop_marker(collectors))
+            outputs = [output]
+        else:
+            prefix, suffix = build_prompt_parts(file_path, content, roles[0],
+                                                role_prompt_file(roles[0]))
+            collector = StreamCollector(signal_log, model, file_path, roles[0])
+            findings = await stream_one(model, collector, prefix, suffix, cache_key, (file_path, 0))
+            outputs = [review_output(model, roles[0], file_path, findings, collector.usage)]
+            outputs[0].update(stop_marker([collector]))
+        return outputs
+
+    try:
+        await asyncio.gather(*(run_request(indices) for indices in requests))
+        return results
+    finally:
+        if gemini_cache is not None:
+            await gemini_cache.close()
+        await _close_async_clients(clients)
+        if review_cache is not None:
+            review_cache.evict()
+            review_cache.report(signal_log)
+
+
+def load_manifest(path: str) -> list:
+    """Jobs from JSONL ({file, role, model, output?} per line); '-' is stdin."""
+    source = sys.stdin if path == '-' else open(path, 'r')
+    jobs = []
+    try:
+        for line in source:
+            if not line.strip():
+                continue
+            try:
+                job = json.loads(line)
+            except json.JSONDecodeError:
+                print(f"Warning: skipping invalid manifest line: {line.strip()[:80]}", file=sys.stderr)
+                continue
+            if job.get('model') not in ('codex', 'gemini') or not job.get('file') or not job.get('role'):
+                print(f"Warning: skipping incomplete job: {line.strip()[:80]}", file=sys.stderr)
+                continue
+            jobs.append(job)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    return jobs
+
+
+def cmd_multi(argv: list):
+    """Run a manifest of streaming reviews in one process.
+
+    Results for jobs without an "output" path are printed as JSONL.
+    """
+    import asyncio
+    parser = argparse.ArgumentParser(prog='stream-review.py multi')
+    parser.add_argument('manifest', help="JSONL job manifest ('-' for stdin)")
+    parser.add_argument('--config', default='', help='Config file path')
+    parser.add_argument('--session-dir', default=os.environ.get('SESSION_DIR', '/tmp/ai-review-arena'),
+                        help='Session directory')
+    args = parser.parse_args(argv)
+
+    jobs = load_manifest(args.manifest)
+    if not jobs:
+        return
+    os.makedirs(args.session_dir, exist_ok=True)
+    config = load_config(args.config)
+    configure_signal_log(config)
+    results = asyncio.run(run_multi(jobs, config, args.session_dir))
+    for job, output in zip(jobs, results):
+        if not job.get('output'):
+            print(json.dumps(output, ensure_ascii=False))
+
+
+# =============================================================================
+# Stream Metrics Report
+# =============================================================================
+
+TIMING_METRICS = ('queue_ms', 'connect_ms', 'ttft_ms', 'ttff_ms', 'total_ms',
+                  'output_tokens_per_s', 'parse_cpu_ms')
+COUNT_METRICS = ('prompt_tokens', 'cached_tokens', 'output_tokens', 'retries', 'findings')
+
+
+def percentile(values: list, q: float) -> float:
+    """q-th percentile (0-100) of sorted values, linearly interpolated."""
+    if not values:
+        return None
+    rank = (len(values) - 1) * q / 100.0
+    low = int(rank)
+    high = min(low + 1, len(values) - 1)
+    return round(values[low] + (values[high] - values[low]) * (rank - low), 1)
+
+
+def load_stream_metrics(paths: list) -> list:
+    """stream_metrics entries from signal logs (files or session directories)."""
+    entries = []
+    for path in paths:
+        if os.path.isdir(path):
+            path = os.path.join(path, 'signals.jsonl')
+        try:
+            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                for line in f:
+                    if '"stream_metrics"' not in line:
+                        continue
+                    try:
+                        signal = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if signal.get('type') == 'stream_metrics' and isinstance(signal.get('data'), dict):
+                        entries.append(signal['data'])
+        except OSError as e:
+            print(f"Warning: cannot read {path}: {e}", file=sys.stderr)
+    return entries
+
+
+def summarize_metrics(entries: list, group_by: tuple = ('provider', 'model', 'role')) -> list:
+    """Per-group request counts, token totals and p50/p90/p95/p99 timings."""
+    groups = {}
+    for entry in entries:
+        key = tuple(entry.get(field, '') for field in group_by)
+        groups.setdefault(key, []).append(entry)
+    summary = []
+    for key in sorted(groups):
+        members = groups[key]
+        row = dict(zip(group_by, key))
+        row['requests'] = len(members)
+        row['errors'] = sum(1 for m in members if m.get('error'))
+        for name in COUNT_METRICS:
+            row[name] = sum(m.get(name) or 0 for m in members)
+        for name in TIMING_METRICS:
+            values = sorted(m[name] for m in members if isinstance(m.get(name), (int, float)))
+            row[name] = {f'p{q}': percentile(values, q) for q in (50, 90, 95, 99)}
+            row[name]['n'] = len(values)
+        summary.append(row)
+    return summary
+
+
+def cmd_stats(argv: list):
+    """Aggregate stream_metrics signals into per-group percentiles."""
+    parser = argparse.ArgumentParser(prog='stream-review.py stats')
+    parser.add_argument('paths', nargs='*',
+                        help='signals.jsonl files or session directories (default: $SESSION_DIR)')
+    parser.add_argument('--by', default='provider,model,role',
+                        help='Comma-separated grouping fields (default: provider,model,role)')
+    parser.add_argument('--json', action='store_true', help='Print one JSON object per group')
+    args = parser.parse_args(argv)
+
+    paths = args.paths or [os.environ.get('SESSION_DIR', '/tmp/ai-review-arena')]
+    group_by = tuple(field.strip() for field in args.by.split(',') if field.strip())
+    summary = summarize_metrics(load_stream_metrics(paths), group_by)
+    if args.json:
+        for row in summary:
+            print(json.dumps(row, ensure_ascii=False))
+        return
+    if not summary:
+        print("No stream_metrics signals found.")
+        return
+    for row in summary:
+        label = ' / '.join(str(row[field]) for field in group_by)
+        print(f"{label}: {row['requests']} requests, {row['errors']} errors, {row['retries']} retries, "
+              f"tokens in {row['prompt_tokens']} (cached {row['cached_tokens']}) out {row['output_tokens']}")
+        print(f"  {'metric':<22}{'p50':>10}{'p90':>10}{'p95':>10}{'p99':>10}")
+        for name in TIMING_METRICS:
+            cells = ''.join(f"{'-' if row[name][q] is None else row[name][q]:>10}"
+                            for q in ('p50', 'p90', 'p95', 'p99'))
+            print(f"  {name:<22}{cells}")
+
+
+# =============================================================================
+# Parser Benchmark
+# =============================================================================
+
+def _synthetic_stream(count: int) -> str:
+    """A model-style response: prose, then a fenced JSON block of findings."""
+    findings = [{
+        'severity': ('critical', 'high', 'medium', 'low')[i % 4],
+        'confidence': 80,
+        'line': 10 + i,
+        'title': f'Finding {i}: unchecked input reaches query builder',
+        'description': 'User-controlled value flows into a string-built query '
+                       'without escaping; nested {braces} and "quotes" included. ' * 2,
+        'suggestion': 'Use parameterized queries.',
+        'evidence': {'path': ['handler', 'service', 'repo'], 'lines': [10 + i, 20 + i]},
+    } for i in range(count)]
+    return ("Here is my review.\n\n```json\n" +
+            json.dumps({'findings': findings, 'summary': 'done'}, indent=2) + "\n```\n")
+
+
+def _load_replay(path: str) -> list:
+    """Deltas from a recorded stream: JSONL with a "delta" (or "text") field
+    per line, or any other file read as raw text."""
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        raw = f.read()
+    deltas = []
+    for line in raw.splitlines():
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            return [raw[i:i + 8] for i in range(0, len(raw), 8)]
+        if not isinstance(entry, dict):
+            return [raw[i:i + 8] for i in range(0, len(raw), 8)]
+        deltas.append(entry.get('delta', entry.get('text', '')))
+    return deltas
+
+
+def _time_parsers(deltas: list, rescan: bool) -> dict:
+    started = time.perf_counter()
+    parser = FindingStreamParser()
+    count = 0
+    for delta in deltas:
+        count += len(parser.feed(delta))
+    count += len(parser.finish())
+    result = {'findings': count,
+              'incremental_ms': round((time.perf_counter() - started) * 1000, 2)}
+    if rescan:
+        # The previous approach: re-parse the whole buffer after every delta
+        started = time.perf_counter()
+        text = ''
+        for delta in deltas:
+            text += delta
+            extract_findings_from_text(text)
+        result['rescan_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    return result
+
+
+def cmd_bench_parse(argv: list):
+    """Replay streams through the parser and print one JSON line per stream.
+
+    Synthetic responses of growing size show how cost scales with response
+    length; --replay adds recorded streams. The old rescan-per-delta approach
+    is timed too, up to --rescan-max findings (it is quadratic).
+    """
+    parser = argparse.ArgumentParser(prog='stream-review.py bench-parse')
+    parser.add_argument('--sizes', default='25,50,100,200,400',
+                        help='Comma-separated finding counts for synthetic streams')
+    parser.add_argument('--delta-chars', type=int, default=8, help='Synthetic delta size')
+    parser.add_argument('--rescan-max', type=int, default=50,
+                        help='Largest synthetic stream to also time with the rescan approach')
+    parser.add_argument('--replay', action='append', default=[],
+                        help='Recorded stream file (repeatable)')
+    args = parser.parse_args(argv)
+
+    streams = []
+    for size in [int(s) for s in args.sizes.split(',') if s.strip()]:
+        text = _synthetic_stream(size)
+        deltas = [text[i:i + args.delta_chars] for i in range(0, len(text), args.delta_chars)]
+        streams.append((f'synthetic-{size}', deltas, size <= args.rescan_max))
+    for path in args.replay:
+        streams.append((path, _load_replay(path), True))
+
+    for name, deltas, rescan in streams:
+        size = sum(len(d) for d in deltas)
+        result = {'stream': name, 'bytes': size, 'deltas': len(deltas)}
+        result.update(_time_parsers(deltas, rescan))
+        result['incremental_us_per_kb'] = round(result['incremental_ms'] * 1000 / max(size / 1024, 1e-9), 1)
+        print(json.dumps(result))
 
 
 if __name__ == '__main__':
-    main()
+    if len(sys.argv) > 1 and sys.argv[1] == 'bench-parse':
+        cmd_bench_parse(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == 'multi':
+        cmd_multi(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1] == 'stats':
+        cmd_stats(sys.argv[2:])
+    else:
+        main()
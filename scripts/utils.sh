@@ -416,39 +416,34 @@ pipeline_memory_reset() {
 # Inspired by Hermes Agent's memory injection scanner.
 
 # Returns 0 if content is safe, 1 if injection detected.
+# Patterns come from config/cache-injection-patterns.txt, which
+# stream-review.py's review cache applies too.
 # Usage: validate_cache_content "$content" && echo "safe"
 validate_cache_content() {
   local content="$1"
+  local patterns_file="${UTILS_PLUGIN_DIR}/config/cache-injection-patterns.txt"
 
   if [ -z "$content" ]; then
     return 0
   fi
 
-  # Prompt injection patterns
-  if echo "$content" | grep -qiE 'ignore (previous|prior|above|all) (instructions|prompts|rules)'; then
-    log_warn "Injection scan: prompt override pattern detected"
-    return 1
-  fi
-  if echo "$content" | grep -qiE 'you are now|new (system|base) prompt|override (system|your)'; then
-    log_warn "Injection scan: identity override pattern detected"
-    return 1
-  fi
-  if echo "$content" | grep -qiE 'system prompt[:\s]|<\|im_start\|>system|<system>'; then
-    log_warn "Injection scan: system prompt injection pattern detected"
-    return 1
-  fi
-
-  # Data exfiltration patterns
-  if echo "$content" | grep -qiE '(curl|wget|fetch|nc|ncat)\s+https?://[^ ]*\.(txt|log|env|key|pem|json)'; then
-    log_warn "Injection scan: data exfiltration pattern detected"
+  if [ ! -r "$patterns_file" ]; then
+    log_warn "Injection scan: pattern file not readable: $patterns_file"
     return 1
   fi
 
-  # Invisible unicode (zero-width chars used to hide instructions)
-  if echo "$content" | grep -qP '[\x{200B}\x{200C}\x{200D}\x{FEFF}\x{2060}]' 2>/dev/null; then
-    log_warn "Injection scan: invisible unicode characters detected"
-    return 1
-  fi
+  # <grep mode>\t<name>\t<regex>; grep without -P fails on P patterns (not a match)
+  local mode name pattern
+  while IFS=$'\t' read -r mode name pattern; do
+    case "$mode" in
+      E|P) ;;
+      *) continue ;;
+    esac
+    if echo "$content" | grep -qi"$mode" -- "$pattern" 2>/dev/null; then
+      log_warn "Injection scan: $name pattern detected"
+      return 1
+    fi
+  done < "$patterns_file"
 
   return 0
 }
@@ -0,0 +1,112 @@
+#!/usr/bin/env bash
+# =============================================================================
+# Integration Test: WebSocket debate against the offline mock Responses server
+#
+# Runs openai-ws-debate.py and debate-load-test.py against
+# mock-responses-server.py to verify:
+# - The RFC 6455 mock speaks the debate client's event protocol
+# - Verdicts stream into the session signal log
+# - The load harness reports rounds, throughput and reconnects
+# - Injected disconnects are retried on fresh pooled connections
+#
+# Needs websocket-client; skipped when it is not installed.
+# =============================================================================
+
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+source "$SCRIPT_DIR/../test-helpers.sh"
+
+PLUGIN_DIR="$(cd "$SCRIPT_DIR/../.." && pwd)"
+MOCK_SERVER="$PLUGIN_DIR/scripts/mock-responses-server.py"
+WS_DEBATE="$PLUGIN_DIR/scripts/openai-ws-debate.py"
+LOAD_TEST="$PLUGIN_DIR/scripts/debate-load-test.py"
+
+# --- Setup ---
+setup_temp_dir
+
+# --- Prerequisite check ---
+if ! python3 -c "import websocket" &>/dev/null; then
+  skip "websocket-client not installed"
+  print_summary
+  exit 0
+fi
+
+if ! command -v jq &>/dev/null; then
+  skip "jq not available"
+  print_summary
+  exit 0
+fi
+
+# =============================================================================
+# Test 1: Debate over the standalone mock server streams verdict signals
+# =============================================================================
+test_begin "mock server: WebSocket debate runs end to end offline"
+
+python3 "$MOCK_SERVER" --latency-ms 5 > "$TEMP_DIR/server.out" 2>/dev/null &
+SERVER_PID=$!
+WS_URL=""
+for _ in $(seq 1 50); do
+  WS_URL=$(awk '/^listening/ {print $2}' "$TEMP_DIR/server.out" 2>/dev/null)
+  [ -n "$WS_URL" ] && break
+  sleep 0.1
+done
+HTTP_URL=$(awk '/^listening/ {print $3}' "$TEMP_DIR/server.out")
+
+mkdir -p "$TEMP_DIR/session"
+RESULT=$(jq -n --arg url "$WS_URL" --arg session "$TEMP_DIR/session" '{
+  findings: [range(6) | {file: "src/f\(. % 2).py", line: (. * 10), title: "Finding \(.)",
+                         models: ["codex"], confidence: 70}],
+  config: {websocket: {url: $url, model: "mock-model"}},
+  session_dir: $session
+}' | DEBATE_ALLOW_LOCAL_URL=1 OPENAI_BASE_URL="$HTTP_URL" OPENAI_API_KEY=mock-key \
+  DEBATE_CACHE_DIR="" python3 "$WS_DEBATE" 2>/dev/null)
+STATS=$(python3 -c 'import sys, urllib.request; print(urllib.request.urlopen(sys.argv[1] + "/stats").read().decode())' \
+  "${HTTP_URL%/v1}" 2>/dev/null)
+kill "$SERVER_PID" 2>/dev/null
+wait "$SERVER_PID" 2>/dev/null
+
+assert_json_valid "$RESULT" "Output should be valid JSON"
+assert_eq "$(echo "$RESULT" | jq '[.accepted, .rejected, .disputed] | map(length) | add')" "6" \
+  "Every finding is categorized"
+assert_eq "$(echo "$RESULT" | jq -r '.ws_fallback // "none"')" "none" "Debate used the WebSocket transport"
+assert_eq "$(echo "$STATS" | jq '.round1')" "2" "One round-1 request per file shard"
+assert_eq "$(jq -s '[.[] | select(.type == "debate_verdict")] | length' "$TEMP_DIR/session/signals.jsonl")" "6" \
+  "Each finding's verdict is signalled once"
+
+test_end
+
+# =============================================================================
+# Test 2: Load harness reports throughput and per-round latency percentiles
+# =============================================================================
+test_begin "load harness: concurrent debates over the pool"
+
+REPORT=$(python3 "$LOAD_TEST" --debates 6 --findings 4 --pool-size 3 --latency-ms 5 --json 2>/dev/null)
+
+assert_json_valid "$REPORT" "Report should be valid JSON"
+assert_eq "$(echo "$REPORT" | jq '.failed_debates')" "0" "No debate failed"
+assert_eq "$(echo "$REPORT" | jq '.rounds.round1.n == .shards and .rounds.all.p99_ms != null')" "true" \
+  "Round latencies are recorded for every shard"
+assert_eq "$(echo "$REPORT" | jq '.pool.opened <= 3 and .server.connections == .pool.opened')" "true" \
+  "Debates share at most pool_size connections"
+
+test_end
+
+# =============================================================================
+# Test 3: Injected disconnects are retried on fresh connections
+# =============================================================================
+test_begin "load harness: mid-stream disconnects trigger reconnects"
+
+# Seed 1 makes the first response drop (its first fault roll is 0.13)
+REPORT=$(python3 "$LOAD_TEST" --debates 3 --findings 2 --pool-size 3 --latency-ms 5 \
+  --disconnect-rate 0.3 --seed 1 --json 2>/dev/null)
+
+assert_json_valid "$REPORT" "Report should be valid JSON"
+assert_eq "$(echo "$REPORT" | jq '.server.disconnects_injected > 0 and .pool.discarded > 0')" "true" \
+  "Dropped connections are discarded"
+assert_eq "$(echo "$REPORT" | jq '.rounds.round1.n > .shards')" "true" \
+  "Interrupted debates are retried on fresh connections"
+
+test_end
+
+# --- Cleanup ---
+cleanup
+print_summary
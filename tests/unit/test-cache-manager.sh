@@ -24,6 +24,8 @@ mkdir -p "$FAKE_PLUGIN/scripts" "$FAKE_PLUGIN/cache" "$FAKE_PLUGIN/config"
 # Copy utils.sh to fake plugin so cache-manager can source it
 cp "$REPO_DIR/scripts/utils.sh" "$FAKE_PLUGIN/scripts/"
 cp "$REPO_DIR/scripts/cache-manager.sh" "$FAKE_PLUGIN/scripts/"
+# Writes are scanned against the shipped injection patterns
+cp "$REPO_DIR/config/cache-injection-patterns.txt" "$FAKE_PLUGIN/config/"
 
 # Create a minimal default config
 cat > "$FAKE_PLUGIN/config/default-config.json" <<'EOF'
@@ -22,6 +22,8 @@ mkdir -p "$FAKE_PLUGIN/scripts" "$FAKE_PLUGIN/cache" "$FAKE_PLUGIN/config"
 
 cp "$REPO_DIR/scripts/utils.sh" "$FAKE_PLUGIN/scripts/"
 cp "$REPO_DIR/scripts/cache-manager.sh" "$FAKE_PLUGIN/scripts/"
+# Cache writes are scanned against the shipped injection patterns
+cp "$REPO_DIR/config/cache-injection-patterns.txt" "$FAKE_PLUGIN/config/"
 cp "$REPO_DIR/scripts/check-model-updates.sh" "$FAKE_PLUGIN/scripts/"
 
 SCRIPT="$FAKE_PLUGIN/scripts/check-model-updates.sh"
@@ -292,4 +292,36 @@ stderr_out=$(cd "$TEMP_DIR" && echo "$TEMP_DIR/src/big-auth.ts" | bash "$SCRIPT"
 # Should log project context loading
 assert_contains "$stderr_out" "Project context loaded" "budget deduction: context logged"
 
+# =========================================================================
+# Test: emitted line ranges are passed to RAG as --changed-file/--changed-lines
+# =========================================================================
+
+# Run a copy of the filter next to a stub rag-retrieve.sh that records its arguments
+mkdir -p "$TEMP_DIR/cf-scripts"
+cp "$SCRIPT" "$REPO_DIR/scripts/utils.sh" "$TEMP_DIR/cf-scripts/"
+cat > "$TEMP_DIR/cf-scripts/rag-retrieve.sh" <<'REOF'
+#!/usr/bin/env bash
+printf '%s\n' "$@" > "$RAG_ARGS_FILE"
+REOF
+chmod +x "$TEMP_DIR/cf-scripts/rag-retrieve.sh"
+jq '.rag.enabled = true' "$CONFIG" > "$TEMP_DIR/config-rag.json"
+
+printf "%s\n%s\n" "$TEMP_DIR/src/auth.ts" "$TEMP_DIR/src/utils.ts" | \
+  RAG_ARGS_FILE="$TEMP_DIR/rag-args.txt" bash "$TEMP_DIR/cf-scripts/context-filter.sh" \
+  general-reviewer "$TEMP_DIR/config-rag.json" --budget 8000 >/dev/null 2>&1
+rag_args=$(grep -A1 -- '^--changed-' "$TEMP_DIR/rag-args.txt" 2>/dev/null | grep -v -- '^--$' | tr '\n' '|')
+assert_eq "$rag_args" "--changed-file|$TEMP_DIR/src/auth.ts|--changed-lines|1-13|--changed-file|$TEMP_DIR/src/utils.ts|--changed-lines|1-7|" \
+  "rag pass-through: each emitted file and its line ranges reach rag-retrieve.sh"
+
+# nl prints lines that are only "\:" section delimiters without numbers, so
+# this file is emitted with no line ranges and must not be passed to RAG
+printf '%s\n' '\:\:' '\:' > "$TEMP_DIR/src/sections.txt"
+rm -f "$TEMP_DIR/rag-args.txt"
+printf "%s\n%s\n" "$TEMP_DIR/src/sections.txt" "$TEMP_DIR/src/utils.ts" | \
+  RAG_ARGS_FILE="$TEMP_DIR/rag-args.txt" bash "$TEMP_DIR/cf-scripts/context-filter.sh" \
+  general-reviewer "$TEMP_DIR/config-rag.json" --budget 8000 >/dev/null 2>&1
+rag_args=$(grep -A1 -- '^--changed-' "$TEMP_DIR/rag-args.txt" 2>/dev/null | grep -v -- '^--$' | tr '\n' '|')
+assert_eq "$rag_args" "--changed-file|$TEMP_DIR/src/utils.ts|--changed-lines|1-7|" \
+  "rag pass-through: a file emitted without line ranges adds no --changed-file"
+
 print_summary
@@ -0,0 +1,366 @@
+#!/usr/bin/env bash
+# =============================================================================
+# Tests for scripts/rag-engine.py (offline parts: no API keys; chromadb only
+# for the index round trip)
+# =============================================================================
+
+set -uo pipefail
+
+TESTS_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/.." && pwd)"
+REPO_DIR="$(cd "$TESTS_DIR/.." && pwd)"
+
+source "$TESTS_DIR/test-helpers.sh"
+
+SCRIPT="$REPO_DIR/scripts/rag-engine.py"
+
+echo "=== test-rag-engine.sh ==="
+
+setup_temp_dir
+
+# Run a Python snippet with the engine loaded as `rag` (sys.argv[1] is the
+# script, further arguments follow it)
+run_rag() {
+  local code="$1"
+  shift
+  python3 -c '
+import importlib.util, sys
+spec = importlib.util.spec_from_file_location("rag_engine", sys.argv[1])
+rag = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(rag)
+exec(sys.argv[2])
+' "$SCRIPT" "$code" "$@"
+}
+
+# =========================================================================
+# Test: chunk IDs are stable and suffixed for repeated content
+# =========================================================================
+
+result=$(run_rag '
+def chunks():
+    return [{"file": "a.py", "content": "x = 1"}, {"file": "a.py", "content": "y = 2"},
+            {"file": "a.py", "content": "x = 1"}, {"file": "b.py", "content": "x = 1"}]
+first, second = rag.assign_chunk_ids(chunks()), rag.assign_chunk_ids(chunks())
+ids = [c["id"] for c in first]
+print(ids == [c["id"] for c in second], ids[2] == ids[0] + "_1", ids[3] != ids[0],
+      len(set(ids)), ids[0].startswith("c_"))
+' 2>&1)
+assert_eq "$result" "True True True 4 True" \
+  "chunk ids: stable across runs, occurrence suffix, keyed on file"
+
+# =========================================================================
+# Test: embedding cache counts hits/misses and evicts by age then LRU
+# =========================================================================
+
+result=$(run_rag '
+import os, time
+cache = rag.EmbeddingCache(os.path.join(sys.argv[3], "embed.sqlite"), "local:hashing-2")
+print(cache.get_many(["a", "b"]))
+cache.put_many(["a", "b", "c"], [[1.0, 0.0], [0.0, 1.0], [0.5, 0.5]])
+print(cache.get_many(["a", "z"]))
+stats = cache.stats()
+print(stats["hits"], stats["misses"], stats["entries"])
+now = time.time()
+for text, age in (("a", 40 * 86400), ("b", 20), ("c", 10)):
+    cache._db.execute("UPDATE embeddings SET last_used = ? WHERE key = ?", (now - age, cache.key(text)))
+cache._db.commit()
+print(cache.prune(10 ** 6, 30), cache.get_many(["a"]))
+print(cache.prune(72, 30), cache.get_many(["b", "c"]))
+cache.close()
+' "$TEMP_DIR" 2>&1 | tr '\n' '|')
+assert_eq "$result" "[None, None]|[[1.0, 0.0], None]|1 3 3|1 [None]|1 [None, [0.5, 0.5]]|" \
+  "embedding cache: hit/miss counts, TTL eviction, then least recently used"
+
+# =========================================================================
+# Test: lexical tokens split camelCase and snake_case identifiers
+# =========================================================================
+
+result=$(run_rag '
+print(" ".join(rag.lexical_tokens("getUserById")))
+print(" ".join(rag.lexical_tokens("get_user_by_id = 42")))
+print(" ".join(rag.lexical_tokens("parseHTTPResponse")))
+' 2>&1 | tr '\n' '|')
+assert_eq "$result" "getuserbyid get user by id|get_user_by_id get user by id 42|parsehttpresponse parse http response|" \
+  "lexical tokens: identifiers plus their camelCase/snake_case parts"
+
+# =========================================================================
+# Test: BM25 ranks rare-term matches first and finds split identifiers
+# =========================================================================
+
+result=$(run_rag '
+import os
+index = rag.LexicalIndex(os.path.join(sys.argv[3], "lexical.sqlite"))
+index.add([
+    {"id": "c1", "file": "users.py", "content": "def get_user_by_id(user_id): return db.fetch(user_id)",
+     "symbol": "get_user_by_id", "start_line": 1, "end_line": 2},
+    {"id": "c2", "file": "orders.py", "content": "def list_orders(): return db.fetch_all()",
+     "symbol": "list_orders", "start_line": 1, "end_line": 2},
+    {"id": "c3", "file": "api.ts", "content": "const user = getUserById(req.params.id);",
+     "start_line": 8, "end_line": 8},
+])
+print(index.count(), [r["file"] for r in index.search("getUserById", 5)])
+print([r["file"] for r in index.search("orders", 5)], index.search("nothing_matches_here", 5))
+print([r["id"] for r in index.defining(["list_orders", "missing"], 5)])
+index.delete(["c2"])
+print(index.count(), index.search("orders", 5))
+index.close()
+' "$TEMP_DIR" 2>&1 | tr '\n' '|')
+assert_eq "$result" "3 ['api.ts', 'users.py']|['orders.py'] []|['c2']|2 []|" \
+  "lexical index: BM25 search across identifier styles, symbols, delete"
+
+# =========================================================================
+# Test: reciprocal rank fusion
+# =========================================================================
+
+result=$(run_rag '
+def r(i):
+    return {"id": i, "file": i + ".py", "content": "", "score": 0.0, "bm25": 1.0}
+fused = rag.fuse_rankings([[r("a"), r("b")], [r("b"), r("c")]], 3)
+print([f["file"] for f in fused], "id" in fused[0] or "bm25" in fused[0])
+print(rag.fuse_rankings([[r("a")], [r("a")]], 5)[0]["score"], len(rag.fuse_rankings([[r("a"), r("b")]], 1)))
+' 2>&1 | tr '\n' '|')
+assert_eq "$result" "['b.py', 'a.py', 'c.py'] False|1.0 1|" \
+  "fuse_rankings: shared hits rank first, top score normalized to 1, top_k cut"
+
+# =========================================================================
+# Test: changed ranges, overlap checks and referenced symbols
+# =========================================================================
+
+cat > "$TEMP_DIR/changed.py" <<'EOF'
+import os
+
+def handler(request):
+    token = parse_token(request.headers)
+    return validate_session(token, request)
+EOF
+
+result=$(run_rag '
+changed = rag.load_changed_ranges(sys.argv[4])
+print(sorted(changed.items()))
+print(rag.load_changed_ranges("not json"), rag.load_changed_ranges(""))
+path = sys.argv[3]
+print(rag.overlaps_changed({"file": path, "start_line": 5, "end_line": 9}, {path: [[3, 5]]}),
+      rag.overlaps_changed({"file": path, "start_line": 6, "end_line": 9}, {path: [[3, 5]]}),
+      rag.overlaps_changed({"file": "src/b.py", "start_line": 1, "end_line": 2}, {"/repo/src/b.py": []}),
+      rag.overlaps_changed({"file": "src/bb.py", "start_line": 1, "end_line": 2}, {"b.py": []}))
+print(rag.changed_symbols({path: [[4, 5]]}))
+' "$TEMP_DIR/changed.py" '{"./src/a.py": [[3, 5]], "b.py": []}' 2>/dev/null | tr '\n' '|')
+assert_eq "$result" "[('b.py', []), ('src/a.py', [[3, 5]])]|{} {}|True False True False|['token', 'request', 'parse_token', 'headers', 'validate_session']|" \
+  "diff context: ranges parsed, overlap by line and path suffix, changed-line symbols"
+
+# =========================================================================
+# Test: adaptive limiter halves on rate limits and grows back
+# =========================================================================
+
+result=$(run_rag '
+limiter = rag.AdaptiveLimiter(8, 100)
+limiter.on_rate_limit(0)
+print(limiter.jobs, limiter.batch_size)
+limiter.on_rate_limit(0)
+limiter.on_rate_limit(0)
+limiter.on_rate_limit(0)
+print(limiter.jobs, limiter.batch_size, limiter.rate_limited)
+for _ in range(2):
+    limiter.on_success()
+print(limiter.jobs, limiter.batch_size)
+for _ in range(100):
+    limiter.on_success()
+print(limiter.jobs, limiter.batch_size)
+' 2>&1 | tr '\n' '|')
+assert_eq "$result" "4 50|1 8 4|2 16|8 100|" \
+  "adaptive limiter: halves jobs and batch on 429, grows back to the caps"
+
+# =========================================================================
+# Test: index progress commits a file's hash only once its chunks are stored
+# =========================================================================
+
+result=$(run_rag '
+import json, os
+class Store:
+    def __init__(self):
+        self.deleted, self.updated = [], []
+    def update(self, ids, metadatas):
+        self.updated += ids
+    def delete(self, ids):
+        self.deleted += ids
+    def update_metadata(self, chunks):
+        pass
+store, lexical = Store(), Store()
+hash_file = os.path.join(sys.argv[3], "hashes.json")
+existing = {"old_a": {"file": "a.py"}, "keep_b": {"file": "b.py"}, "gone": {"file": "gone.py"}}
+progress = rag.IndexProgress(store, lexical, hash_file, {"a.py": {"hash": "a0"}, "gone.py": {"hash": "g0"}},
+                             existing, ["gone.py"], interval=3600)
+progress.begin_file("a.py", {"hash": "a1"}, {"new_a1", "new_a2"}, 2, 0, [])
+progress.begin_file("b.py", {"hash": "b1"}, {"keep_b"}, 0, 1, [])
+progress.begin_file("c.py", {"hash": "c1"}, {"new_c"}, 1, 0, [])
+progress.stored([{"file": "a.py"}])
+progress.failed_batch([{"file": "c.py"}])
+progress.checkpoint()
+print(json.load(open(hash_file)), sorted(store.deleted))
+progress.stored([{"file": "a.py"}])
+progress.checkpoint()
+print(json.load(open(hash_file)), sorted(store.deleted), store.deleted == lexical.deleted, sorted(progress.failed))
+' "$TEMP_DIR" 2>&1 | tr '\n' '|')
+assert_eq "$result" "{'a.py': {'hash': 'a0'}, 'b.py': {'hash': 'b1'}} ['gone']|{'a.py': {'hash': 'a1'}, 'b.py': {'hash': 'b1'}} ['gone', 'old_a'] True ['c.py']|" \
+  "index progress: per-file commit, interrupted files keep their old hash"
+
+# =========================================================================
+# Test: hashing embedder is deterministic and normalized
+# =========================================================================
+
+result=$(run_rag '
+import math
+a = rag.get_embedder("local:hashing-64")
+b = rag.HashingEmbedder(64)
+first, second = a.embed(["def getUserById(id): pass", "x"]), b.embed(["def getUserById(id): pass", "x"])
+print(a.model, len(first[0]), first == second, round(math.sqrt(sum(v * v for v in first[0])), 4),
+      first[0] != first[1], rag.get_embedder("local:hashing").dims)
+' 2>&1)
+assert_eq "$result" "local:hashing-64 64 True 1.0 True 512" \
+  "hashing embedder: deterministic, unit length, dims from the model name"
+
+# =========================================================================
+# Test: unchanged stat signatures skip re-hashing
+# =========================================================================
+
+mkdir -p "$TEMP_DIR/proj" "$TEMP_DIR/sig-index"
+echo 'def main(): pass' > "$TEMP_DIR/proj/main.py"
+echo "$TEMP_DIR/proj/main.py" > "$TEMP_DIR/sig-files.txt"
+# A matching signature with a wrong hash proves the file was not re-hashed
+run_rag '
+import json
+path, hash_file = sys.argv[3], sys.argv[4]
+json.dump({path: dict(rag.file_signature(path), hash="stale")}, open(hash_file, "w"))
+' "$TEMP_DIR/proj/main.py" "$TEMP_DIR/sig-hashes.json"
+output=$(RAG_INDEX_DIR="$TEMP_DIR/sig-index" RAG_FILE_LIST="$TEMP_DIR/sig-files.txt" \
+  RAG_HASH_FILE="$TEMP_DIR/sig-hashes.json" RAG_EMBEDDING_MODEL=local:hashing \
+  python3 "$SCRIPT" index 2>&1)
+assert_contains "$output" "No changes detected" "hash cache: matching stat signature skips hashing"
+
+# Legacy bare-hash entries load, are re-hashed once and gain a signature
+result=$(run_rag '
+import json
+path, hash_file = sys.argv[3], sys.argv[4]
+json.dump({path: rag.compute_file_hash(path)}, open(hash_file, "w"))
+print(sorted(rag.load_hash_cache(hash_file)[path]))
+' "$TEMP_DIR/proj/main.py" "$TEMP_DIR/sig-hashes.json" 2>&1)
+assert_eq "$result" "['hash']" "hash cache: legacy entries load as {hash}"
+RAG_INDEX_DIR="$TEMP_DIR/sig-index" RAG_FILE_LIST="$TEMP_DIR/sig-files.txt" \
+  RAG_HASH_FILE="$TEMP_DIR/sig-hashes.json" RAG_EMBEDDING_MODEL=local:hashing \
+  python3 "$SCRIPT" index >/dev/null 2>&1
+assert_eq "$(jq -r '.[] | keys | join(",")' "$TEMP_DIR/sig-hashes.json")" "hash,ino,mtime_ns,size" \
+  "hash cache: re-hashed unchanged files get their stat signature saved"
+
+# Without RAG_HASH_FILE a no-change run has no cache to refresh
+result=$(cd "$TEMP_DIR/sig-index" && RAG_INDEX_DIR="$TEMP_DIR/sig-index" RAG_FILE_LIST="$TEMP_DIR/sig-files.txt" \
+  RAG_HASH_FILE="" RAG_EMBEDDING_MODEL=local:hashing run_rag '
+rag.compute_file_hash = lambda path: ""
+rag.cmd_index()
+' 2>&1; echo "exit=$?"; ls -A "$TEMP_DIR/sig-index" | grep -c '\.tmp$')
+assert_eq "$(echo "$result" | tail -2 | tr '\n' '|')" "exit=0|0|" \
+  "hash cache: a no-change run without RAG_HASH_FILE writes no cache"
+
+# =========================================================================
+# Test: index --jobs without a positive integer is a usage error
+# =========================================================================
+
+result=$(for value in "" "many" "0"; do
+  python3 "$SCRIPT" index --jobs $value 2>&1 | head -1
+  echo "exit=${PIPESTATUS[0]}"
+done | tr '\n' '|')
+assert_eq "$result" "$(printf 'Error: --jobs requires a positive integer|exit=1|%.0s' 1 2 3)" \
+  "index --jobs: missing or invalid values print the usage error"
+
+# =========================================================================
+# Test: lexical-only retrieve answers offline from lexical.sqlite
+# =========================================================================
+
+mkdir -p "$TEMP_DIR/lex-index"
+run_rag '
+import os
+index = rag.LexicalIndex(os.path.join(sys.argv[3], "lexical.sqlite"))
+index.add([
+    {"id": "c1", "file": "src/session.py", "content": "def validate_session(token): return token in SESSIONS",
+     "symbol": "validate_session", "start_line": 1, "end_line": 2},
+    {"id": "c2", "file": "src/math.py", "content": "def add(a, b): return a + b", "start_line": 1, "end_line": 1},
+])
+index.close()
+' "$TEMP_DIR/lex-index"
+result=$(RAG_INDEX_DIR="$TEMP_DIR/lex-index" RAG_QUERY="session token validation" RAG_TOP_K=2 \
+  RAG_RETRIEVE_MODE=lexical RAG_EMBEDDING_MODEL=local:hashing python3 "$SCRIPT" retrieve 2>/dev/null)
+assert_eq "$(echo "$result" | jq -rs 'map(.file) | join(",")')" "src/session.py" \
+  "retrieve (lexical): BM25 results without embeddings or chromadb"
+result=$(RAG_INDEX_DIR="$TEMP_DIR/lex-index" RAG_QUERY="session token validation" RAG_TOP_K=2 \
+  RAG_RETRIEVE_MODE=lexical RAG_CHANGED_RANGES='{"src/session.py": [[1, 1]]}' \
+  python3 "$SCRIPT" retrieve 2>/dev/null)
+assert_eq "$result" "" "retrieve (lexical): chunks inside the changed lines are left out"
+
+# =========================================================================
+# Test: the daemon reopens lexical.sqlite after an index run replaces it
+# =========================================================================
+
+mkdir -p "$TEMP_DIR/daemon-index"
+result=$(run_rag '
+import os
+index_dir = sys.argv[3]
+service = rag.RetrieveService(index_dir, "local:hashing", 8)
+print(service.lexical())
+def build(content):
+    tmp = os.path.join(index_dir, "lexical.sqlite.new")
+    index = rag.LexicalIndex(tmp)
+    index.add([{"id": "c1", "file": "a.py", "content": content}])
+    index.close()
+    os.replace(tmp, os.path.join(index_dir, "lexical.sqlite"))
+build("def render_report(): pass")
+first = service.lexical()
+print(len(first.search("report", 5)), service.lexical() is first)
+build("def parse_config(): pass")
+print(len(service.lexical().search("report", 5)), len(service.lexical().search("config", 5)))
+' "$TEMP_DIR/daemon-index" 2>&1 | tr '\n' '|')
+assert_eq "$result" "None|1 True|0 1|" "retrieve daemon: lexical index reopened when the file changes"
+
+# =========================================================================
+# Test: socket-path reports the daemon socket, short-pathed for long indexes
+# =========================================================================
+
+long_index="$TEMP_DIR/$(printf 'x%.0s' $(seq 1 100))/rag-index"
+assert_eq "$(RAG_INDEX_DIR="$TEMP_DIR/lex-index" python3 "$SCRIPT" socket-path)" \
+  "$TEMP_DIR/lex-index/retrieve.sock" "socket-path: socket inside a short index dir"
+result=$(RAG_INDEX_DIR="$long_index" python3 "$SCRIPT" socket-path)
+assert_eq "$(dirname "$result")|$(basename "$result" | cut -c1-20)" \
+  "$(python3 -c 'import tempfile; print(tempfile.gettempdir())')|ai-review-arena-rag-" \
+  "socket-path: long index paths use a socket under the temp dir"
+
+# =========================================================================
+# Test: offline index -> retrieve round trip (local:hashing)
+# =========================================================================
+
+if python3 -c "import chromadb" &>/dev/null; then
+  mkdir -p "$TEMP_DIR/rt-index" "$TEMP_DIR/rt/src"
+  cat > "$TEMP_DIR/rt/src/session.py" <<'EOF'
+def validate_session(token):
+    """Reject expired or unknown session tokens."""
+    return token in ACTIVE_SESSIONS and not is_expired(token)
+EOF
+  cat > "$TEMP_DIR/rt/src/report.py" <<'EOF'
+def render_report(rows):
+    return "\n".join(str(row) for row in rows)
+EOF
+  printf '%s\n' "$TEMP_DIR/rt/src/session.py" "$TEMP_DIR/rt/src/report.py" > "$TEMP_DIR/rt-files.txt"
+  RAG_ENV=(RAG_INDEX_DIR="$TEMP_DIR/rt-index" RAG_FILE_LIST="$TEMP_DIR/rt-files.txt"
+           RAG_HASH_FILE="$TEMP_DIR/rt-hashes.json" RAG_EMBEDDING_MODEL=local:hashing)
+  env "${RAG_ENV[@]}" python3 "$SCRIPT" index >/dev/null 2>&1
+  assert_file_exists "$TEMP_DIR/rt-index/lexical.sqlite" "round trip: index writes the lexical index"
+  result=$(env "${RAG_ENV[@]}" RAG_QUERY="session token expiry" RAG_TOP_K=1 RAG_RETRIEVE_MODE=lexical \
+    python3 "$SCRIPT" retrieve 2>/dev/null)
+  assert_contains "$(echo "$result" | jq -r '.file')" "session.py" "round trip: lexical retrieve finds the indexed chunk"
+  output=$(env "${RAG_ENV[@]}" python3 "$SCRIPT" index 2>&1)
+  assert_contains "$output" "No changes detected" "round trip: second index run is a no-op"
+else
+  skip "chromadb not installed; index round trip skipped"
+fi
+
+# =========================================================================
+# Summary
+# =========================================================================
+
+print_summary
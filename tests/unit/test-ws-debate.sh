@@ -0,0 +1,278 @@
+#!/usr/bin/env bash
+# =============================================================================
+# Tests for scripts/openai-ws-debate.py (offline parts: no network or API keys)
+# =============================================================================
+
+set -uo pipefail
+
+TESTS_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/.." && pwd)"
+REPO_DIR="$(cd "$TESTS_DIR/.." && pwd)"
+
+source "$TESTS_DIR/test-helpers.sh"
+
+SCRIPT="$REPO_DIR/scripts/openai-ws-debate.py"
+
+echo "=== test-ws-debate.sh ==="
+
+setup_temp_dir
+
+# =========================================================================
+# Test: connection pool reuses idle connections and recycles aging ones
+# =========================================================================
+
+result=$(python3 -c '
+import importlib.util, sys, time
+spec = importlib.util.spec_from_file_location("ws_debate", sys.argv[1])
+wd = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(wd)
+
+class FakeWS:
+    def close(self):
+        pass
+
+pool = wd.ConnectionPool("key", "wss://api.openai.com/v1/responses", 5, size=2,
+                         max_connection_minutes=1, recycle_before_seconds=10)
+pool._open = lambda: (pool._count("opened"), wd.PooledConnection(FakeWS(), pool.max_age))[1]
+a, b = pool.acquire(), pool.acquire()
+pool.release(a)
+pool.release(b, broken=True)
+c = pool.acquire()
+c.expires_at = time.time() + 5
+pool.release(c)
+d = pool.acquire()
+print(c is a, d is not c, pool.stats)
+' "$SCRIPT" 2>&1)
+assert_eq "$result" "True True {'opened': 3, 'reused': 1, 'recycled': 1, 'discarded': 1}" \
+  "pool: reuse idle, discard broken, recycle near max_connection_minutes"
+
+# =========================================================================
+# Test: per-file debates run concurrently and merge into one categorization
+# =========================================================================
+
+result=$(python3 -c '
+import importlib.util, sys, time
+from concurrent.futures import ThreadPoolExecutor
+spec = importlib.util.spec_from_file_location("ws_debate", sys.argv[1])
+wd = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(wd)
+
+def fake_ws(findings, *args, indices=None, **kwargs):
+    time.sleep(0.3)
+    if findings[indices[0]]["file"] == "broken.py":
+        raise RuntimeError("socket closed")
+    for i in indices:
+        findings[i]["debate_status"] = "challenged"
+        findings[i]["confidence"] = 10
+
+def fake_http(findings, *args, **kwargs):
+    raise RuntimeError("http down")
+
+wd.run_debate_ws, wd.run_debate_http = fake_ws, fake_http
+findings = [{"file": f"f{i % 4}.py", "title": str(i), "models": ["codex"], "confidence": 50} for i in range(8)]
+findings.append({"file": "broken.py", "title": "b", "models": ["codex"], "confidence": 50})
+findings.append({"file": "agreed.py", "title": "a", "models": ["codex", "gemini"], "confidence": 90})
+settings = wd.debate_settings({"websocket": {"model": "m"}})
+start = time.time()
+with ThreadPoolExecutor(max_workers=8) as executor:
+    result = wd.debate_findings(findings, {}, settings, "key", None, executor)
+print(round(time.time() - start) == 0, result["debates"], len(result["rejected"]),
+      sorted(f["title"] for f in result["accepted"]), result["error"].startswith("All transports failed"))
+' "$SCRIPT" 2>&1)
+assert_eq "$result" "True 5 8 ['a', 'b'] True" \
+  "debates: concurrent per-file debates, failed debate accepted as-is"
+
+# =========================================================================
+# Test: shards are bounded and prompts carry only the shard's inputs
+# =========================================================================
+
+result=$(python3 -c '
+import importlib.util, json, sys
+spec = importlib.util.spec_from_file_location("ws_debate", sys.argv[1])
+wd = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(wd)
+
+findings = [{"file": "a.py", "title": f"t{i}"} for i in range(5)]
+findings += [{"file": "b.py", "title": "SQL injection in query builder"},
+             {"file": "c.py", "title": "SQL injection in query parser"},
+             {"file": "d.py", "title": "Unused import"}]
+print(wd.shard_findings(findings, range(8), "file", 2))
+print(wd.shard_findings(findings, [5, 6, 7], "similarity", 8, 0.3))
+text, code = wd._shard_prompt_inputs(findings, {"a.py": "x", "c.py": "y"}, [6])
+print(json.loads(text), json.loads(code), "\", \"" not in text)
+' "$SCRIPT" 2>&1)
+assert_eq "$result" "[[0, 1], [2, 3], [4], [5], [6], [7]]
+[[5, 6], [7]]
+[{'finding_index': 6, 'file': 'c.py', 'title': 'SQL injection in query parser'}] {'c.py': 'y'} True" \
+  "sharding: file chunks, similarity clusters, compact per-shard prompt inputs"
+
+# =========================================================================
+# Test: verdict array elements are parsed as their closing brace streams in
+# =========================================================================
+
+result=$(python3 -c '
+import importlib.util, sys
+spec = importlib.util.spec_from_file_location("ws_debate", sys.argv[1])
+wd = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(wd)
+
+text = "Sure:\n```json\n" + """{"notes": [{"finding_index": 9}], "challenges": [
+  {"finding_index": 0, "agree": true, "evidence": "a \\"}\\" b", "x": {"y": [1]}},
+  {"finding_index": 1, "agree": false}]}""" + "\n```"
+parser = wd.VerdictStreamParser("challenges")
+for i in range(0, len(text), 5):
+    for item in parser.feed(text[i:i + 5]):
+        print(i, item["finding_index"], item.get("evidence"))
+' "$SCRIPT" 2>&1)
+assert_eq "$result" "140 0 a \"}\" b
+180 1 None" \
+  "stream parser: emits each challenge at its closing brace, skips other arrays"
+
+# =========================================================================
+# Test: high-confidence round-1 confirmations commit early and skip rounds 2-3
+# =========================================================================
+
+result=$(python3 -c '
+import importlib.util, json, os, sys
+spec = importlib.util.spec_from_file_location("ws_debate", sys.argv[1])
+wd = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(wd)
+log = os.path.join(sys.argv[2], "signals.jsonl")
+
+class ScriptedWS:
+    """Replays one canned answer per round, noting signals seen before completion."""
+    answers = [{"challenges": [{"finding_index": 0, "agree": True, "confidence_adjustment": 10},
+                               {"finding_index": 1, "agree": False, "confidence_adjustment": -20}]},
+               {"final_assessments": [{"finding_index": 1, "final_agree": False}]},
+               {"synthesis": [{"finding_index": 1, "final_confidence": 10, "verdict": "rejected"}]}]
+    def __init__(self):
+        self.prompts, self.events, self.before_complete = [], [], []
+    def settimeout(self, t):
+        pass
+    def send(self, data):
+        self.prompts.append(json.loads(data)["response"]["input"][0]["content"])
+        text = json.dumps(self.answers[len(self.prompts) - 1])
+        self.events = [{"type": "response.output_text.delta", "delta": text[i:i + 20]}
+                       for i in range(0, len(text), 20)]
+        self.events.append({"type": "response.completed", "response": {"id": f"r{len(self.prompts)}"}})
+    def recv(self):
+        event = self.events.pop(0)
+        if event["type"] == "response.completed":
+            self.before_complete.append(sum(1 for _ in open(log)) if os.path.exists(log) else 0)
+        return json.dumps(event)
+
+findings = [{"file": "a.py", "title": "t0", "models": ["codex"], "confidence": 80},
+            {"file": "a.py", "title": "t1", "models": ["codex"], "confidence": 70}]
+tracker = wd.VerdictTracker(80, 85, log)
+ws = ScriptedWS()
+result = wd._run_debate_rounds(ws, findings, {}, "m", False, 5, 3, 60, 80, tracker=tracker)
+print(len(ws.prompts), ws.before_complete, "[1]" in ws.prompts[2], tracker.early)
+for line in open(log):
+    d = json.loads(line)["data"]
+    print(d["finding_index"], d["status"], d["round"], d["early"])
+print(" ".join(f["title"] for f in result["accepted"]), "|", " ".join(f["title"] for f in result["disputed"]))
+' "$SCRIPT" "$TEMP_DIR" 2>&1)
+assert_eq "$result" "3 [1, 1, 2] True 1
+0 accepted 1 True
+1 disputed 3 False
+t0 | t1" \
+  "early commit: confirmed finding signalled mid-stream, later rounds only debate the rest"
+
+# =========================================================================
+# Test: cached verdicts settle unchanged findings without a debate
+# =========================================================================
+
+result=$(python3 -c '
+import importlib.util, sys
+from concurrent.futures import ThreadPoolExecutor
+spec = importlib.util.spec_from_file_location("ws_debate", sys.argv[1])
+wd = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(wd)
+debated = []
+
+def fake_ws(findings, *args, indices=None, **kwargs):
+    debated.extend(findings[i]["title"] for i in indices)
+    for i in indices:
+        findings[i]["debate_status"] = "challenged"
+        findings[i]["confidence"] -= 30
+
+wd.run_debate_ws = fake_ws
+settings = wd.debate_settings({"websocket": {"model": "m"}})
+
+def run(code, line=3):
+    findings = [{"file": "a.py", "line": line, "title": "Null  deref", "description": "d", "models": ["codex"], "confidence": 70},
+                {"file": "b.py", "line": 9, "title": "Leak", "description": "d", "models": ["codex"], "confidence": 70}]
+    cache = wd.VerdictCache(sys.argv[2], 3600, 1 << 20)
+    del debated[:]
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        result = wd.debate_findings(findings, {"a.py": code, "b.py": "y"}, settings, "key", None, executor, cache=cache)
+    print(result["debates"], "/".join(debated), [(f["confidence"], f.get("verdict_cached", False)) for f in findings],
+          result["verdict_cache"]["hit_rate"])
+
+run("x")
+run("x", line=7)
+run("x2")
+print(wd.VerdictCache(sys.argv[2], 3600, 1).key({"file": "missing.py"}, {}, "m"))
+' "$SCRIPT" "$TEMP_DIR/verdicts" 2>&1)
+assert_eq "$result" "2 Null  deref/Leak [(40, False), (40, False)] 0.0
+0  [(40, True), (40, True)] 1.0
+1 Null  deref [(40, False), (40, True)] 0.5
+None" \
+  "verdict cache: hits skip the debate, line shifts within a bucket hit, code edits miss"
+
+# =========================================================================
+# Test: a loopback websocket.url needs the DEBATE_ALLOW_LOCAL_URL opt-in
+# =========================================================================
+
+result=$(python3 -c '
+import importlib.util, os, sys
+spec = importlib.util.spec_from_file_location("ws_debate", sys.argv[1])
+wd = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(wd)
+
+def url(value):
+    return wd.debate_settings({"websocket": {"url": value}})["ws_url"]
+
+print(url("ws://127.0.0.1:8765/v1/responses"))
+os.environ["DEBATE_ALLOW_LOCAL_URL"] = "1"
+print(url("ws://127.0.0.1:8765/v1/responses"))
+print(url("ws://example.com/v1/responses"))
+' "$SCRIPT" 2>&1)
+assert_eq "$result" "wss://api.openai.com/v1/responses
+ws://127.0.0.1:8765/v1/responses
+wss://api.openai.com/v1/responses" \
+  "url: loopback mock only with the environment opt-in, other hosts never"
+
+# =========================================================================
+# Test: the mock server's URLs follow its bind address
+# =========================================================================
+
+MOCK_URLS_PY='
+import importlib.util, os, sys
+spec = importlib.util.spec_from_file_location("mock_server", sys.argv[1])
+mock = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(mock)
+spec = importlib.util.spec_from_file_location("ws_debate", sys.argv[2])
+wd = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(wd)
+os.environ["DEBATE_ALLOW_LOCAL_URL"] = "1"
+server = mock.MockResponsesServer((sys.argv[3], 0))
+port = str(server.server_address[1])
+accepted = wd.debate_settings({"websocket": {"url": server.ws_url}})["ws_url"] == server.ws_url
+print(server.ws_url.replace(port, "PORT"), server.http_url.replace(port, "PORT"), accepted)
+server.server_close()
+'
+MOCK_SERVER="$REPO_DIR/scripts/mock-responses-server.py"
+result=$(for host in 127.0.0.1 0.0.0.0; do python3 -c "$MOCK_URLS_PY" "$MOCK_SERVER" "$SCRIPT" "$host" 2>&1; done)
+assert_eq "$result" "ws://127.0.0.1:PORT/v1/responses http://127.0.0.1:PORT/v1 True
+ws://127.0.0.1:PORT/v1/responses http://127.0.0.1:PORT/v1 True" \
+  "mock urls: IPv4 and wildcard binds advertise loopback"
+
+if python3 -c 'import socket; socket.socket(socket.AF_INET6).bind(("::1", 0))' &>/dev/null; then
+  result=$(python3 -c "$MOCK_URLS_PY" "$MOCK_SERVER" "$SCRIPT" "::1" 2>&1)
+  assert_eq "$result" "ws://[::1]:PORT/v1/responses http://[::1]:PORT/v1 True" \
+    "mock urls: IPv6 binds are bracketed"
+else
+  skip "IPv6 loopback unavailable; bracketed mock URL test skipped"
+fi
+
+print_summary